@@ -0,0 +1,212 @@
+import sys
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.append(str(BENCH_DIR.parent / "src"))
+sys.path.append(str(BENCH_DIR))
+
+from pipelines.api_client import TokenBucket
+from pipelines.raw_store import iter_raw_records
+from synthetic_listings import generate_listings
+
+# Local stand-in for the two RentCast endpoints the pipelines call:
+#   GET /v1/listings/sale        (zipCode, status, limit, offset)
+#   GET /v1/avm/rent/long-term   (address, propertyType, bedrooms, bathrooms, squareFootage)
+# Listings come from a recorded snapshot (--fixture) or are synthesized per zip.
+# Latency, error rate and 429 rate limiting are configurable, so the client paths
+# (pagination, concurrency, retries, caching) can be load-tested offline.
+#
+#   python benchmarks/mock_rentcast.py --port 8765 --latency-ms 80 --rate-limit 20
+#   RENTCAST_BASE_URL=http://127.0.0.1:8765 python main.py
+
+DEFAULT_PORT = 8765
+MAX_PAGE_SIZE = 500            # Same cap as the real API
+DEFAULT_LISTINGS_PER_ZIP = 250
+
+class MockConfig:
+    """Behaviour knobs of the mock server (all optional)."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit=None,
+                 retry_after=1.0, listings_per_zip=DEFAULT_LISTINGS_PER_ZIP, fixture=None,
+                 api_key=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit        # Requests/second before answering 429 (None = unlimited)
+        self.retry_after = retry_after      # Seconds sent in the Retry-After header
+        self.listings_per_zip = listings_per_zip
+        self.fixture = fixture              # Raw snapshot to serve instead of synthetic listings
+        self.api_key = api_key              # If set, requests without this X-Api-Key get a 401
+        self.seed = seed
+
+class ListingSource:
+    """Listings per zip: from the fixture if one was given, otherwise synthesized (and memoized)."""
+
+    def __init__(self, config):
+        self.config = config
+        self.by_zip = {}
+        self.lock = threading.Lock()
+        if config.fixture:
+            for listing in iter_raw_records(config.fixture):
+                self.by_zip.setdefault(str(listing.get("zipCode")), []).append(listing)
+
+    def listings(self, zip_code):
+        with self.lock:
+            if zip_code not in self.by_zip:
+                if self.config.fixture:
+                    return []
+                seed = self.config.seed + zlib.crc32(zip_code.encode())
+                listings = generate_listings(self.config.listings_per_zip, seed=seed)
+                for listing in listings:
+                    listing["zipCode"] = zip_code
+                    listing["id"] = f"{listing['id']}-{zip_code}"
+                self.by_zip[zip_code] = listings
+            return self.by_zip[zip_code]
+
+def mock_rent(params):
+    """Deterministic rent estimate for a property (about 1% of a typical price, scaled by size)."""
+    key = "|".join(str(params.get(name, "")) for name in ("address", "propertyType", "bedrooms", "bathrooms"))
+    base = 700 + zlib.crc32(key.encode()) % 900
+    try:
+        square_footage = float(params.get("squareFootage") or 0)
+    except ValueError:
+        square_footage = 0
+    return int(base + square_footage * 0.15)
+
+class MockRentCastHandler(BaseHTTPRequestHandler):
+    server_version = "MockRentCast/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Keep load tests quiet
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        config = server.config
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        server.count_request(url.path)
+
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + server.rng_uniform(-config.jitter_ms, config.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000)
+
+        if config.api_key and self.headers.get("X-Api-Key") != config.api_key:
+            server.count_status(401)
+            return self._send_json(401, {"message": "Invalid API key"})
+        if server.limiter is not None and not server.limiter.try_acquire():
+            server.count_status(429)
+            return self._send_json(429, {"message": "Too many requests"},
+                                   {"Retry-After": f"{config.retry_after:g}"})
+        if config.error_rate and server.rng_uniform(0, 1) < config.error_rate:
+            server.count_status(500)
+            return self._send_json(500, {"message": "Simulated server error"})
+
+        if url.path == "/v1/listings/sale":
+            status, payload = 200, self._listings(params)
+        elif url.path == "/v1/avm/rent/long-term":
+            status, payload = 200, {"rent": mock_rent(params), "rentRangeLow": None,
+                                    "rentRangeHigh": None, "comparables": []}
+        else:
+            status, payload = 404, {"message": f"Unknown endpoint {url.path}"}
+        server.count_status(status)
+        self._send_json(status, payload)
+
+    def _listings(self, params):
+        limit = min(int(params.get("limit", 50)), MAX_PAGE_SIZE)
+        offset = int(params.get("offset", 0))
+        listings = self.server.source.listings(str(params.get("zipCode", "")))
+        status = params.get("status")
+        if status:
+            listings = [listing for listing in listings if listing.get("status") == status]
+        return listings[offset:offset + limit]
+
+class MockRentCastServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockRentCastHandler)
+        self.config = config
+        self.source = ListingSource(config)
+        self.limiter = TokenBucket(config.rate_limit) if config.rate_limit else None
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.requests = {}   # path -> count
+        self.statuses = {}   # status -> count
+
+    def rng_uniform(self, low, high):
+        with self.lock:
+            return self.rng.uniform(low, high)
+
+    def count_request(self, path):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def count_status(self, status):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """Starts the mock in a background thread (port=0 picks a free port). Returns the server."""
+    server = MockRentCastServer((host, port), config or MockConfig())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local RentCast stand-in for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests/second before answering 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on a 429")
+    parser.add_argument("--listings-per-zip", type=int, default=DEFAULT_LISTINGS_PER_ZIP)
+    parser.add_argument("--fixture", default=None, help="Raw snapshot (.json / .ndjson.gz) to serve")
+    parser.add_argument("--api-key", default=None, help="Require this X-Api-Key")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    config = MockConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, retry_after=args.retry_after, listings_per_zip=args.listings_per_zip,
+        fixture=args.fixture, api_key=args.api_key, seed=args.seed
+    )
+    server = MockRentCastServer((args.host, args.port), config)
+    print(f"🧪 Mock RentCast listening on {server.base_url}")
+    print(f"   RENTCAST_BASE_URL={server.base_url} python main.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 Requests: {server.requests}  Statuses: {server.statuses}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.append(str(BENCH_DIR.parent / "src"))
+sys.path.append(str(BENCH_DIR))
+
+from mock_rentcast import MockConfig, start_server
+from pipelines.api_client import create_session, HostConcurrencyLimiter
+from pipelines.extraction_pipeline import fetch_all_listings, MAX_HOST_CONCURRENCY, PAGE_PREFETCH, MAX_ZIP_WORKERS
+from pipelines.preprocessing_pipeline import normalize_listings, clean_data
+from pipelines.enrichment_pipeline import enrich_listings, MAX_WORKERS
+from pipelines.metrics import METRICS
+
+# End-to-end client benchmark against the local mock RentCast server:
+# paginated extraction over many zips, then concurrent AVM enrichment,
+# with configurable latency / errors / 429s. No network or API key needed.
+#
+#   python benchmarks/run_api_benchmark.py --zips 20 --listings-per-zip 1200 --latency-ms 50 --rate-limit 30
+
+def extract(zip_codes):
+    """Drains every zip the way run_extraction does (pooled session, host limit, page prefetch)."""
+    session = create_session(pool_size=MAX_HOST_CONCURRENCY)
+    host_limiter = HostConcurrencyLimiter(MAX_HOST_CONCURRENCY)
+    zip_workers = max(1, min(MAX_ZIP_WORKERS, len(zip_codes)))
+    try:
+        with ThreadPoolExecutor(max_workers=zip_workers * PAGE_PREFETCH) as page_pool, \
+             ThreadPoolExecutor(max_workers=zip_workers) as zip_pool:
+            results = list(zip_pool.map(
+                lambda z: fetch_all_listings(z, session, host_limiter, page_pool), zip_codes
+            ))
+    finally:
+        session.close()
+    return [listing for listings, _ in results for listing in listings]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extraction + enrichment throughput against the mock API")
+    parser.add_argument("--zips", type=int, default=10)
+    parser.add_argument("--listings-per-zip", type=int, default=1200, help="> 500 exercises pagination")
+    parser.add_argument("--rent-calls", type=int, default=200, help="AVM calls to make in the enrichment step")
+    parser.add_argument("--rate-per-sec", type=float, default=50.0, help="Client-side AVM rate limit")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Server-side requests/second before 429s")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    config = MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        rate_limit=args.rate_limit, retry_after=0.5, listings_per_zip=args.listings_per_zip)
+    server = start_server(config)
+    os.environ["RENTCAST_BASE_URL"] = server.base_url
+    METRICS.reset()
+    print(f"🧪 Mock RentCast on {server.base_url}")
+
+    zip_codes = [str(47000 + i) for i in range(args.zips)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.source.listings(zip_codes[0])  # Warm the generator outside the timed section
+        for zip_code in zip_codes[1:]:
+            server.source.listings(zip_code)
+
+        start = time.perf_counter()
+        listings = extract(zip_codes)
+        extract_seconds = time.perf_counter() - start
+
+        df = clean_data(normalize_listings(listings)[0])
+        start = time.perf_counter()
+        enriched = enrich_listings(df, max_calls=args.rent_calls, max_workers=MAX_WORKERS,
+                                   rate_per_sec=args.rate_per_sec)
+        enrich_seconds = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+
+    print(f"   Extraction: {len(listings):,} listings from {args.zips} zips in {extract_seconds:.2f}s "
+          f"({len(listings) / extract_seconds:,.0f} listings/s)")
+    print(f"   Enrichment: {len(enriched)} rents in {enrich_seconds:.2f}s "
+          f"({args.rent_calls / enrich_seconds:,.1f} calls/s)")
+    print(f"   Server saw: {server.requests}  statuses: {server.statuses}")
+    for line in METRICS.report_lines():
+        if line["type"] == "api":
+            latency = line["latency"]
+            print(f"   {line['endpoint']}: {latency['count']} calls, mean {latency['mean_ms']} ms, "
+                  f"p95 <= {latency['p95_ms_le']} ms, retries {line['retries']}, statuses {line['status_codes']}")
+
+if __name__ == "__main__":
+    main()
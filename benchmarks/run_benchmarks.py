@@ -0,0 +1,191 @@
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from pathlib import Path
+from datetime import datetime
+
+import matplotlib
+matplotlib.use("Agg")  # Benchmarks never open a window
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+sys.path.append(str(BENCH_DIR))
+
+from pipelines.raw_store import RawSnapshotWriter, raw_extension
+from pipelines.preprocessing_pipeline import run_preprocessing
+from pipelines.feature_eng_pipeline import compute_features, load_market_config
+from pipelines.scoring_pipeline import calculate_scores, load_config
+from pipelines.market_stats import update_market_stats
+from pipelines.scenario_pipeline import expand_grid, score_matrix, rank_matrix
+from pipelines.visualization_pipeline import create_yield_risk_matrix
+from synthetic_listings import iter_listing_chunks, synthetic_rent
+
+# Throughput benchmarks for every pipeline stage on synthetic listings.
+# Usage:
+#   python benchmarks/run_benchmarks.py --sizes 1k,100k      # compare against the baseline
+#   python benchmarks/run_benchmarks.py --save-baseline      # store this run as the new baseline
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+DATA_DIR = BENCH_DIR / "data"         # Generated raw snapshots (reused between runs)
+RESULTS_DIR = BENCH_DIR / "results"   # One JSON file per benchmark run
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+TOLERANCE = 0.25                      # Allowed slowdown / memory growth vs. the baseline
+MIN_SECONDS = 0.05                    # Timing differences below this are noise
+SWEEP_GRID = {                        # 100 scenarios for the scenario-engine stage
+    "weights.rent_to_cost": [round(0.1 + 0.05 * i, 2) for i in range(10)],
+    "scaling.target_yield": [round(0.008 + 0.001 * i, 3) for i in range(10)],
+}
+
+def synthetic_snapshot(n, seed=0):
+    """Raw NDJSON snapshot with n synthetic listings, generated once and reused."""
+    path = DATA_DIR / f"synthetic_{n}_{seed}{raw_extension()}"
+    if not path.exists():
+        print(f"   Generating {n:,} synthetic listings -> {path.name}")
+        tmp_path = path.with_name(f"tmp_{path.name}")
+        with RawSnapshotWriter(tmp_path) as writer:
+            for chunk in iter_listing_chunks(n, seed=seed):
+                writer.write_many(chunk)
+        tmp_path.replace(path)
+    return path
+
+def update_stats(rankings):
+    """The post-scoring market stats update, on a fresh table outside data/ (never reused)."""
+    with tempfile.TemporaryDirectory() as stats_dir:
+        update_market_stats(rankings, rankings, stats_dir=stats_dir)
+    return rankings
+
+def measure(fn, trace_memory=True):
+    """
+    Runs fn() and returns (result, seconds, peak_mb).
+    Timing and memory come from separate runs: tracemalloc slows Python code down,
+    so the timed run is untraced and a second, traced run reports the peak.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+
+        peak_mb = None
+        if trace_memory:
+            tracemalloc.start()
+            fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    return result, seconds, peak_mb
+
+def benchmark_size(label, n, trace_memory=True, figure_path=None):
+    """Times preprocessing -> features -> scoring -> market stats -> 100-scenario sweep -> visualization on n listings."""
+    snapshot = synthetic_snapshot(n)
+    market_config = load_market_config()
+    model_config = load_config()
+    figure_path = figure_path or DATA_DIR / "benchmark_chart.png"
+
+    def score(df):
+        return df.assign(deal_score=calculate_scores(df, model_config)).sort_values('deal_score', ascending=False)
+
+    def sweep(df):
+        configs = [config for _, config in expand_grid(model_config, SWEEP_GRID)]
+        rank_matrix(score_matrix(df, configs))
+        return df
+
+    stages = [
+        ("preprocess", lambda _: run_preprocessing(data=snapshot, save=False)),
+        ("features", lambda df: compute_features(df.assign(rent_estimate=synthetic_rent(df)), market_config)),
+        ("scoring", score),
+        ("market_stats", update_stats),
+        ("scenarios", sweep),
+        ("visualization", lambda df: create_yield_risk_matrix(df, figure_path) or df),
+    ]
+
+    results = []
+    data = None
+    for stage, fn in stages:
+        rows_in = n if data is None else len(data)
+        output, seconds, peak_mb = measure(lambda: fn(data), trace_memory)
+        data = output
+        results.append({
+            "stage": stage,
+            "size": label,
+            "rows_in": rows_in,
+            "rows_out": len(output),
+            "seconds": round(seconds, 4),
+            "peak_mb": None if peak_mb is None else round(peak_mb, 1)
+        })
+        memory = "" if peak_mb is None else f", peak {peak_mb:,.1f} MB"
+        print(f"   {stage:<14} {label:>5}: {seconds:8.3f}s ({rows_in / seconds:,.0f} rows/s){memory}")
+    return results
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Lists the (stage, size) pairs that got slower or hungrier than the baseline
+    by more than 'tolerance'. Returns a list of human-readable regressions.
+    """
+    previous = {(r["stage"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        base = previous.get((r["stage"], r["size"]))
+        if base is None:
+            continue
+        if r["seconds"] > base["seconds"] * (1 + tolerance) and r["seconds"] - base["seconds"] > MIN_SECONDS:
+            regressions.append(f"{r['stage']} @ {r['size']}: {base['seconds']:.3f}s -> {r['seconds']:.3f}s")
+        if r.get("peak_mb") and base.get("peak_mb") and r["peak_mb"] > base["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{r['stage']} @ {r['size']}: {base['peak_mb']:.1f} MB -> {r['peak_mb']:.1f} MB")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline throughput benchmarks on synthetic listings")
+    parser.add_argument("--sizes", default="1k,100k,1M", help=f"Comma-separated subset of {', '.join(SIZES)}")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed regression vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that measures peak memory")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    labels = [label.strip() for label in args.sizes.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        raise SystemExit(f"Unknown size(s): {', '.join(unknown)}. Use: {', '.join(SIZES)}")
+
+    print("⏱️  Running pipeline benchmarks...")
+    results = []
+    for label in labels:
+        results.extend(benchmark_size(label, SIZES[label], trace_memory=not args.no_memory))
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    results_path = RESULTS_DIR / f"bench_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    results_path.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Results saved to {results_path}")
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(report, indent=2))
+        print(f"📌 Baseline updated: {BASELINE_PATH}")
+        return
+
+    if not BASELINE_PATH.exists():
+        print("⚠️  No baseline yet. Run with --save-baseline to store one.")
+        return
+
+    regressions = compare(results, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%} of the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import numpy as np
+
+# Synthetic RentCast sale listings with the same schema as the snapshots in data/01-raw
+# (nested listingAgent / listingOffice / history, optional hoa, and no
+# bedrooms/bathrooms/squareFootage/yearBuilt on Land listings).
+
+PROPERTY_TYPES = ['Single Family', 'Land', 'Multi-Family', 'Manufactured', 'Condo', 'Townhouse']
+PROPERTY_WEIGHTS = [0.53, 0.35, 0.06, 0.02, 0.02, 0.02]
+STRUCTURE_FIELDS = ['bedrooms', 'bathrooms', 'squareFootage', 'yearBuilt']
+ZIP_CODES = ['46901', '46902']
+STREETS = ['N Lindsay St', 'W Sycamore St', 'S Washington St', 'E Markland Ave', 'N Main St', 'W Defenbaugh St']
+# Obviously fake contact details (never taken from real listings)
+AGENTS = [(f"Agent {i}", f"555-01{i:02d}", f"agent{i}@example.com") for i in range(1, 4)]
+OFFICE = {
+    "name": "Example Realty",
+    "phone": "555-0100",
+    "email": "office@example.com",
+    "website": "https://www.example.com/"
+}
+HOA_SHARE = 0.2
+HISTORY_MAX_EVENTS = 3
+RUN_DATE = np.datetime64("2025-12-30")
+EVENT_SPACING_DAYS = 120  # Days between relistings in the synthetic history
+
+def _dates(days):
+    """Day offsets -> 'YYYY-MM-DD' strings (vectorized)."""
+    return np.datetime_as_string(days.astype("timedelta64[D]") + RUN_DATE, unit="D")
+
+def _iso(date):
+    return f"{date}T00:00:00.000Z"
+
+def generate_listings(n, seed=0, offset=0):
+    """
+    n synthetic raw listings (list of dicts). Columns are drawn vectorized,
+    then assembled into RentCast-shaped records.
+    offset shifts the ids so consecutive chunks never collide.
+    """
+    rng = np.random.default_rng(seed)
+
+    property_type = rng.choice(PROPERTY_TYPES, size=n, p=PROPERTY_WEIGHTS)
+    zip_code = rng.choice(ZIP_CODES, size=n)
+    street = rng.choice(STREETS, size=n)
+    house_number = rng.integers(100, 4000, size=n)
+    bedrooms = rng.integers(1, 6, size=n)
+    bathrooms = rng.integers(1, 4, size=n)
+    square_footage = rng.integers(600, 3500, size=n)
+    year_built = rng.integers(1880, 2024, size=n)
+    lot_size = rng.integers(2000, 20000, size=n)
+    price = (rng.lognormal(mean=11.7, sigma=0.5, size=n) // 100 * 100).astype(int)
+    days_on_market = rng.integers(1, 500, size=n)
+    latitude = rng.uniform(40.44, 40.52, size=n).round(6)
+    longitude = rng.uniform(-86.19, -86.09, size=n).round(6)
+    agent = rng.integers(0, len(AGENTS), size=n)
+    has_hoa = rng.random(size=n) < HOA_SHARE
+    hoa_fee = rng.integers(2, 40, size=n) * 10
+    history_events = rng.integers(1, HISTORY_MAX_EVENTS + 1, size=n)
+
+    # Event k (0 = current listing) starts EVENT_SPACING_DAYS * k days before the current one
+    event_dates = [_dates(-days_on_market - EVENT_SPACING_DAYS * k) for k in range(HISTORY_MAX_EVENTS)]
+    removed_dates = [_dates(-days_on_market - EVENT_SPACING_DAYS * k + 60) for k in range(HISTORY_MAX_EVENTS)]
+    created_dates = _dates(-days_on_market + 1)
+
+    listings = []
+    for i in range(n):
+        address_line = f"{house_number[i]} {street[i]}"
+        listed_date = event_dates[0][i]
+        record = {
+            "id": f"{address_line.replace(' ', '-')},-Kokomo,-IN-{zip_code[i]}-{offset + i}",
+            "formattedAddress": f"{address_line}, Kokomo, IN {zip_code[i]}",
+            "addressLine1": address_line,
+            "addressLine2": None,
+            "city": "Kokomo",
+            "state": "IN",
+            "stateFips": "18",
+            "zipCode": str(zip_code[i]),
+            "county": "Howard",
+            "countyFips": "067",
+            "latitude": float(latitude[i]),
+            "longitude": float(longitude[i]),
+            "propertyType": str(property_type[i]),
+            "bedrooms": int(bedrooms[i]),
+            "bathrooms": int(bathrooms[i]),
+            "squareFootage": int(square_footage[i]),
+            "lotSize": int(lot_size[i]),
+            "yearBuilt": int(year_built[i]),
+            "status": "Active",
+            "price": int(price[i]),
+            "listingType": "Standard",
+            "listedDate": _iso(listed_date),
+            "removedDate": None,
+            "createdDate": _iso(created_dates[i]),
+            "lastSeenDate": "2025-12-30T05:58:53.076Z",
+            "daysOnMarket": int(days_on_market[i]),
+            "mlsName": "IRMLS",
+            "mlsNumber": str(202400000 + offset + i),
+            "listingAgent": dict(zip(("name", "phone", "email"), AGENTS[agent[i]])),
+            "listingOffice": dict(OFFICE),
+            "history": {}
+        }
+        if record["propertyType"] == "Land":
+            for field in STRUCTURE_FIELDS:
+                del record[field]
+        if has_hoa[i]:
+            record["hoa"] = {"fee": int(hoa_fee[i])}
+
+        # Oldest events first; the last one is the current listing
+        for k in range(history_events[i] - 1, -1, -1):
+            event_date = str(event_dates[k][i])
+            record["history"][event_date] = {
+                "event": "Sale Listing",
+                "price": int(price[i] * (1 + 0.05 * k)),
+                "listingType": "Standard",
+                "listedDate": _iso(event_date),
+                "removedDate": None if k == 0 else _iso(removed_dates[k][i]),
+                "daysOnMarket": int(days_on_market[i]) if k == 0 else 60
+            }
+        listings.append(record)
+    return listings
+
+def iter_listing_chunks(n, chunk_size=50000, seed=0):
+    """Yields n synthetic listings in chunks, so 1M rows never sit in memory as dicts."""
+    for start in range(0, n, chunk_size):
+        size = min(chunk_size, n - start)
+        yield generate_listings(size, seed=seed + start, offset=start)
+
+def synthetic_rent(df, seed=0):
+    """Stand-in for the AVM: rent around 1% of price, as enrichment would add it."""
+    rng = np.random.default_rng(seed)
+    return (df['price'].to_numpy(dtype=float) * rng.uniform(0.006, 0.014, size=len(df))).round(0)
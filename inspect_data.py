@@ -1,36 +1,50 @@
-import json
+import sys
 import pandas as pd
 from pathlib import Path
-import os
 
-# 1. Find the latest Raw JSON file
+# Add the 'src' folder to the python path so imports work correctly
+sys.path.append(str(Path(__file__).resolve().parent / "src"))
+
+from pipelines.raw_store import get_latest_raw_snapshot, iter_raw_chunks
+
+# 1. Find the latest Raw snapshot (NDJSON or legacy JSON)
 PROJECT_ROOT = Path(__file__).resolve().parent
 RAW_DIR = PROJECT_ROOT / "data" / "01-raw"
-files = list(RAW_DIR.glob("*.json"))
-latest_file = max(files, key=os.path.getmtime)
+latest_file = get_latest_raw_snapshot(RAW_DIR)
 
 print(f"🕵️‍♀️ Inspecting file: {latest_file.name}")
 
-# 2. Load it into a DataFrame
-with open(latest_file, 'r') as f:
-    data = json.load(f)
+# 2. Stream it chunk by chunk (constant memory, even for whole-state snapshots)
+columns = {}
+property_types = {}
+sample = None
+rows = 0
+
+for chunk in iter_raw_chunks(latest_file):
+    df = pd.json_normalize(chunk)
+    rows += len(df)
+    columns.update(dict.fromkeys(df.columns))
+    if 'propertyType' in df.columns:
+        property_types.update(dict.fromkeys(df['propertyType'].dropna().unique()))
+    if sample is None:
+        sample = df
 
-df = pd.json_normalize(data)
+print(f"\n📦 {rows} listings")
 
 # 3. Show me the EXACT column names
 print("\n📋 ALL COLUMN NAMES:")
-print(df.columns.tolist())
+print(list(columns))
 
 # 4. Show me the EXACT values for Property Type
-if 'propertyType' in df.columns:
+if property_types:
     print("\n🏠 UNIQUE PROPERTY TYPES (Copy-Paste these!):")
-    print(df['propertyType'].unique())
+    print(list(property_types))
 else:
     print("\n❌ 'propertyType' column not found. Check the column list above.")
 
 # 5. Show me a sample of the 'rentEstimate' structure (to see if it's a number or dict)
 # We check for columns starting with 'rentEstimate'
-rent_cols = [c for c in df.columns if 'rent' in c.lower()]
+rent_cols = [c for c in columns if 'rent' in c.lower()]
 print(f"\n💰 RENT COLUMNS FOUND: {rent_cols}")
-if rent_cols:
-    print(df[rent_cols].head())
\ No newline at end of file
+if rent_cols and sample is not None:
+    print(sample[[c for c in rent_cols if c in sample.columns]].head())
@@ -1,62 +1,261 @@
 import sys
 import time
+import argparse
+import importlib
 from pathlib import Path
 
 # Add the 'src' folder to the python path so imports work correctly
 sys.path.append(str(Path(__file__).resolve().parent / "src"))
 
-from pipelines.extraction_pipeline import run_extraction
-from pipelines.preprocessing_pipeline import run_preprocessing
-from pipelines.enrichment_pipeline import run_enrichment
-from pipelines.feature_eng_pipeline import run_feature_engineering
-from pipelines.scoring_pipeline import run_scoring
-from pipelines.visualization_pipeline import run_visualization
+# Pipeline modules are imported lazily: a command only pays for the stages it runs
+# (e.g. 'score' never imports requests, seaborn or matplotlib).
+
+# Single-stage commands: (module, entry point)
+STAGES = {
+    "extract": ("pipelines.extraction_pipeline", "run_extraction"),
+    "preprocess": ("pipelines.preprocessing_pipeline", "run_preprocessing"),
+    "enrich": ("pipelines.enrichment_pipeline", "run_enrichment"),
+    "features": ("pipelines.feature_eng_pipeline", "run_feature_engineering"),
+    "score": ("pipelines.scoring_pipeline", "run_scoring"),
+    "visualize": ("pipelines.visualization_pipeline", "run_visualization"),
+}
+COMMANDS = list(STAGES) + ["all", "prune"]
+
+def load_stage(command):
+    """Imports the module behind a single-stage command and returns its entry point."""
+    module_name, function_name = STAGES[command]
+    return getattr(importlib.import_module(module_name), function_name)
 
 def print_separator(step_name):
     print("\n" + "="*60)
     print(f"🚦 STEP: {step_name}")
     print("="*60)
 
-def main():
-    print("🏗️  STARTING REAL ESTATE YIELD OPTIMIZER PIPELINE")
-    start_time = time.time()
-    
-    try:
-        # 1. Extraction (Get Raw Data)
-        print_separator("EXTRACTION")
-        run_extraction()
-        
-        # 2. Preprocessing (Clean Data)
-        print_separator("PREPROCESSING")
-        run_preprocessing()
-        
-        # 3. Enrichment (Get Rent Estimates)
-        print_separator("ENRICHMENT (Top 5 Candidates)")
-        run_enrichment()
-        
-        # 4. Feature Engineering (Calculate Yield & Risk)
-        print_separator("FEATURE ENGINEERING")
-        run_feature_engineering()
-        
-        # 5. Scoring (Rank Deals)
-        print_separator("SCORING & RANKING")
-        run_scoring()
+def run_full_chain(raw, checkpoint=True, stage_cache=None, incomplete_zips=(), small_multiples=False):
+    """
+    Stages 2-6, handing DataFrames straight from one stage to the next.
+    raw is what run_extraction returned: the listings themselves, or the path of
+    this run's raw snapshot (streamed in chunks).
+    Nothing is picked up from disk, so two overlapping runs never read each other's files.
+    checkpoint=False skips the intermediate writes (final rankings + chart are always saved).
+    stage_cache: a StageCache; stages whose inputs, config and code are unchanged reuse their last output.
+    Enrichment always runs (it has its own rent cache, and a rerun may enrich more listings).
+    The market stats are updated once, after scoring, so every stage of a run sees the same table.
+    incomplete_zips: zips whose extraction failed part-way; their missing listings are not delisted.
+    small_multiples: also draw the per-zip chart panels.
+    """
+    from pipelines.market_stats import update_market_stats
+    run_preprocessing = load_stage("preprocess")
+    run_enrichment = load_stage("enrich")
+    run_feature_engineering = load_stage("features")
+    run_scoring = load_stage("score")
+    run_visualization = load_stage("visualize")
+
+    # 2. Preprocessing (Clean Data)
+    print_separator("PREPROCESSING")
+    listings = run_preprocessing(data=raw, save=checkpoint, stage_cache=stage_cache)
+
+    # 3. Enrichment (Get Rent Estimates)
+    print_separator("ENRICHMENT (Top 5 Candidates)")
+    df = run_enrichment(listings, save=checkpoint)
+    if df.empty:
+        raise RuntimeError("No listings were enriched, nothing to score.")
+
+    # 4. Feature Engineering (Calculate Yield & Risk)
+    print_separator("FEATURE ENGINEERING")
+    # Listings outside the enrichment budget get local comparable rents
+    df = run_feature_engineering(df, save=checkpoint, stage_cache=stage_cache, listings=listings)
+
+    # 5. Scoring (Rank Deals)
+    print_separator("SCORING & RANKING")
+    df = run_scoring(df, save=True, stage_cache=stage_cache)
+    update_market_stats(listings, df, incomplete_zips=incomplete_zips)
+
+    # 6. Visualization (Generate Report)
+    print_separator("VISUALIZATION")
+    run_visualization(df, stage_cache=stage_cache, small_multiples=small_multiples)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Real Estate Yield Optimizer pipeline",
+        epilog="Without a command, 'all' runs (so 'python main.py --delta' still works)."
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--profile", default="",
+        help="Run these stages under cProfile, e.g. 'features,scoring' or 'all' (stats go to the run report folder)"
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    for command, help_text in [
+        ("extract", "Pull listings from RentCast into a raw snapshot"),
+        ("preprocess", "Clean the latest raw snapshot"),
+        ("enrich", "Add rent estimates to the latest clean listings"),
+        ("features", "Compute the investor metrics for the latest enriched listings"),
+        ("score", "Rank the latest features"),
+        ("visualize", "Draw the yield-risk chart for the latest rankings"),
+    ]:
+        sub = subparsers.add_parser(command, parents=[common], help=help_text)
+        if command != "visualize":
+            sub.add_argument("--market", default=None, help="Work on this market's partition (slug, e.g. 'kokomo-in')")
+        if command == "visualize":
+            sub.add_argument(
+                "--small-multiples", action="store_true",
+                help="Also draw one chart panel per zip (per market for cross-market rankings)"
+            )
+        if command == "extract":
+            sub.add_argument(
+                "--delta", action="store_true",
+                help="Also write the added/changed/removed listings since the previous snapshot"
+            )
+
+    full = subparsers.add_parser("all", parents=[common], help="Run every stage (default)")
+    full.add_argument(
+        "--delta", action="store_true",
+        help="Only reprocess listings that were added/changed since the previous snapshot"
+    )
+    full.add_argument(
+        "--in-memory", action="store_true",
+        help="Pass data between stages in memory without writing intermediate datasets"
+    )
+    full.add_argument(
+        "--checkpoint", action="store_true",
+        help="With --in-memory: still write every intermediate dataset"
+    )
+    full.add_argument(
+        "--force", action="store_true",
+        help="Recompute every stage even if its inputs, config and code are unchanged"
+    )
+    full.add_argument(
+        "--small-multiples", action="store_true",
+        help="Also draw one chart panel per zip (per market for cross-market rankings)"
+    )
+    full.add_argument(
+        "--workers", type=int, default=None,
+        help="Processes used when several target markets are configured (default: one per CPU)"
+    )
+
+    prune = subparsers.add_parser("prune", help="Delete old snapshots under data/ (retention policy)")
+    prune.add_argument("--keep", type=int, default=3, help="Snapshots kept per stage folder (default: 3)")
+    prune.add_argument(
+        "--older-than", type=float, default=None, metavar="DAYS",
+        help="Only delete snapshots older than this many days"
+    )
+    prune.add_argument("--dry-run", action="store_true", help="List what would be deleted without deleting it")
+    return parser
+
+def parse_args(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "all")
+    return build_parser().parse_args(argv)
+
+def resolve_market(slug):
+    """'kokomo-in' -> the matching target market from the investor profile (None -> None)."""
+    if slug is None:
+        return None
+    from pipelines.markets import load_target_markets, market_slug
+    markets = {market_slug(m): m for m in load_target_markets()}
+    if slug not in markets:
+        raise ValueError(f"Unknown market '{slug}'. Use one of: {', '.join(markets)}")
+    return markets[slug]
+
+def finish(start_time, label="PIPELINE"):
+    end_time = time.time()
+    duration = end_time - start_time
+
+    print("\n" + "="*60)
+    print(f"✅ {label} COMPLETE in {duration:.2f} seconds")
+    print("="*60)
+    print("Check 'data/04-predictions' for your final report.")
+
+def run_all(args, start_time):
+    from pipelines.markets import load_target_markets
+    run_visualization = load_stage("visualize")
+
+    markets = load_target_markets()
+    if len(markets) > 1:
+        if args.delta:
+            raise ValueError("--delta supports a single target market only.")
+        from pipelines.market_orchestrator import run_all_markets
+        # 1-5. One process per market, merged into a cross-market ranking
+        print_separator(f"MULTI-MARKET ({len(markets)} markets)")
+        rankings = run_all_markets(
+            markets, max_workers=args.workers, checkpoint=args.checkpoint or not args.in_memory,
+            force=args.force
+        )
 
         # 6. Visualization (Generate Report)
         print_separator("VISUALIZATION")
-        run_visualization()
-        
-        end_time = time.time()
-        duration = end_time - start_time
-        
-        print("\n" + "="*60)
-        print(f"✅ PIPELINE COMPLETE in {duration:.2f} seconds")
-        print("="*60)
-        print("Check 'data/04-predictions' for your final report.")
+        run_visualization(rankings, small_multiples=args.small_multiples)
+        return finish(start_time)
+
+    # 1. Extraction (Get Raw Data)
+    print_separator("EXTRACTION")
+    # In-memory mode keeps the listings; otherwise preprocessing streams this run's snapshot
+    extraction = {}
+    raw = load_stage("extract")(delta=args.delta, keep_listings=args.in_memory, report=extraction)
+
+    if args.delta:
+        from pipelines.delta_pipeline import run_delta_pipeline
+        # 2-5. Only the changed rows, merged into the previous results
+        print_separator("DELTA (Preprocess -> Enrich -> Features -> Score)")
+        rankings = run_delta_pipeline()
+
+        # 6. Visualization (Generate Report)
+        print_separator("VISUALIZATION")
+        run_visualization(rankings, small_multiples=args.small_multiples)
+    else:
+        from pipelines.stage_cache import StageCache
+        stage_cache = StageCache(force=args.force)
+        run_full_chain(raw, checkpoint=args.checkpoint or not args.in_memory, stage_cache=stage_cache,
+                       incomplete_zips=extraction['incomplete_zips'], small_multiples=args.small_multiples)
+        stage_cache.report()
+
+    finish(start_time)
+
+def run_single_stage(args, start_time):
+    run_stage = load_stage(args.command)
+    kwargs = {}
+    if args.command != "visualize":
+        kwargs["market"] = resolve_market(args.market)
+    if args.command == "extract":
+        kwargs.update(delta=args.delta, keep_listings=False)
+    if args.command == "visualize":
+        kwargs["small_multiples"] = args.small_multiples
+    print_separator(args.command.upper())
+    run_stage(**kwargs)
+    finish(start_time, label=f"STAGE '{args.command}'")
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "prune":
+        from pipelines.artifact_index import run_prune
+        run_prune(keep=args.keep, older_than_days=args.older_than, dry_run=args.dry_run)
+        return
+
+    # .env first: storage format, compression, profiling and the API key may come from it
+    from pipelines.env import load_env
+    load_env()
+    from pipelines.metrics import METRICS, PROFILE_STAGES
+
+    PROFILE_STAGES.update(s.strip() for s in args.profile.split(",") if s.strip())
+    METRICS.reset()
+    print("🏗️  STARTING REAL ESTATE YIELD OPTIMIZER PIPELINE")
+    start_time = time.time()
+
+    try:
+        if args.command == "all":
+            run_all(args, start_time)
+        else:
+            run_single_stage(args, start_time)
 
     except Exception as e:
         print(f"\n❌ PIPELINE FAILED: {e}")
         sys.exit(1)
+    finally:
+        print(f"📈 Run report: {METRICS.write_report()}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+from pipelines.metrics import METRICS
+
+# Shared HTTP plumbing for the RentCast pipelines (extraction + enrichment)
+
+DEFAULT_TIMEOUT = 30      # seconds per request
+MAX_429_RETRIES = 5       # how often we retry a rate-limited call before giving up
+DEFAULT_RETRY_AFTER = 1.0 # seconds to wait when a 429 has no Retry-After header
+DEFAULT_BASE_URL = "https://api.rentcast.io"
+
+def api_url(path):
+    """
+    Full URL for a RentCast endpoint. Set RENTCAST_BASE_URL (e.g. http://127.0.0.1:8765
+    for the local mock server in benchmarks/) to point the pipelines somewhere else.
+    """
+    base_url = os.getenv("RENTCAST_BASE_URL") or DEFAULT_BASE_URL
+    return base_url.rstrip("/") + path
+
+def create_session(pool_size=10):
+    """
+    One pooled session per pipeline run.
+    Keeps TCP/TLS connections alive instead of reconnecting on every call.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    'rate' tokens are added per second, up to 'capacity' (the allowed burst).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Takes a token if one is available right now; never waits."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return False
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def pause(self, seconds):
+        """Stops handing out tokens for 'seconds' (used when the API answers 429)."""
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0
+            self.updated_at = self.paused_until
+
+class CallBudget:
+    """
+    Hard cap on the number of paid API calls, shared between worker threads.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def remaining(self):
+        with self.lock:
+            return self.limit - self.used
+
+class HostConcurrencyLimiter:
+    """
+    Caps the number of in-flight requests per host, no matter how many
+    worker threads are running.
+    Usage: with host_limiter.slot(url): session.get(url, ...)
+    """
+
+    def __init__(self, max_per_host):
+        self.max_per_host = max_per_host
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def slot(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self.semaphores[host]
+
+def parse_retry_after(value):
+    """
+    Retry-After can be a number of seconds or an HTTP date.
+    Returns the delay in seconds (falls back to DEFAULT_RETRY_AFTER).
+    """
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+def get_with_retry(session, url, headers=None, params=None, limiter=None,
+                   max_retries=MAX_429_RETRIES, timeout=DEFAULT_TIMEOUT, host_limiter=None):
+    """
+    GET through the shared session.
+    Waits for the rate limiter before every attempt and honours 429/Retry-After.
+    Rate-limited attempts are rejected by the API before any work is done,
+    so they are retried without touching the caller's call budget.
+    An optional host_limiter caps how many requests are in flight per host.
+    Latency (including retries and back-off), final status and retry count are
+    recorded per endpoint in the run metrics.
+    """
+    endpoint = urlparse(url).path
+    start = time.perf_counter()
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+
+        try:
+            if host_limiter is not None:
+                with host_limiter.slot(url):
+                    response = session.get(url, headers=headers, params=params, timeout=timeout)
+            else:
+                response = session.get(url, headers=headers, params=params, timeout=timeout)
+        except requests.exceptions.RequestException:
+            METRICS.record_request(endpoint, None, time.perf_counter() - start, retries=attempt)
+            raise
+        if response.status_code != 429 or attempt == max_retries:
+            METRICS.record_request(endpoint, response.status_code, time.perf_counter() - start, retries=attempt)
+            return response
+
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if limiter is not None:
+            # Everyone backs off, not just this thread
+            limiter.pause(delay)
+        else:
+            time.sleep(delay)
+
+    return response
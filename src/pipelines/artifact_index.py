@@ -0,0 +1,323 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from pipelines.metrics import METRICS
+
+# Artifact index (data/cache/artifacts.sqlite): one row per snapshot the pipeline writes
+# under data/ -- run id, stage, market, content hash, row count and schema.
+# "Latest output of a stage" and "everything run R wrote" are index lookups instead of
+# a glob + stat over every old snapshot, identical content is stored once (hard links),
+# and old snapshots can be pruned by retention policy.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DATA_ROOT = PROJECT_ROOT / "data"                      # Only files under here are indexed
+UNINDEXED_FOLDERS = ("timeseries",)                    # Append-only stores: every part file is kept
+INDEX_PATH = DATA_ROOT / "cache" / "artifacts.sqlite"
+DEFAULT_KEEP = 3                                       # Snapshots kept per stage by prune()
+
+# 'clean_listings_2025-12-30_15-39-30' -> 'clean_listings', 'features_1a2b3c4d5e6f7a8b' -> 'features'
+SNAPSHOT_SUFFIX = re.compile(r"_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}|[0-9a-f]{16})$")
+# Every file name the pipeline writes a snapshot under
+ARTIFACT_EXTENSIONS = [".parquet", ".feather", ".csv", ".ndjson.gz", ".ndjson.zst", ".ndjson", ".json"]
+# Plain '.json' files are snapshots only under these names (manifests and stats are not)
+JSON_SNAPSHOT_PREFIXES = ("raw_listings_", "delta_")
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def split_name(path):
+    """'.../clean_listings_<ts>.parquet' -> ('clean_listings_<ts>', '.parquet')."""
+    name = Path(path).name
+    for ext in ARTIFACT_EXTENSIONS:
+        if name.endswith(ext):
+            return name[:-len(ext)], ext
+    return Path(name).stem, Path(name).suffix
+
+def stage_name(path):
+    """The snapshot's stage: its file name without extension and timestamp/fingerprint."""
+    return SNAPSHOT_SUFFIX.sub("", split_name(path)[0])
+
+def market_of(directory):
+    """'data/03-features/market=kokomo-in' -> 'kokomo-in' ('' for the classic layout)."""
+    name = Path(directory).name
+    return name.split("=", 1)[1] if name.startswith("market=") else ""
+
+def is_indexed(directory):
+    """Snapshots are indexed only inside the pipeline's data folder (not tests, benchmarks or exports)."""
+    directory, root = Path(directory).resolve(), Path(DATA_ROOT).resolve()
+    if not directory.is_relative_to(root):
+        return False
+    parts = directory.relative_to(root).parts
+    return not (parts and parts[0] in UNINDEXED_FOLDERS)
+
+def get_index(path=None):
+    """The process's ArtifactIndex (one connection per process: worker processes open their own)."""
+    path = Path(path or INDEX_PATH)
+    key = (str(path), os.getpid())
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = ArtifactIndex(path)
+        return _indexes[key]
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+class ArtifactIndex:
+    """SQLite-backed run manifest for every snapshot written under data/."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # Stages, worker threads and market processes all write here
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " path TEXT PRIMARY KEY,"
+            " directory TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " market TEXT NOT NULL,"
+            " run_id TEXT,"
+            " content_hash TEXT NOT NULL,"
+            " rows INTEGER,"
+            " schema TEXT,"
+            " bytes INTEGER,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_directory ON artifacts (directory, created_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_stage ON artifacts (stage, market, created_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_run ON artifacts (run_id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_hash ON artifacts (content_hash)")
+        self.conn.commit()
+
+    def record(self, path, content_hash, rows=None, schema=None, run_id=None, created_at=None, dedupe=True):
+        """
+        Adds (or replaces) the row for a freshly written snapshot.
+        dedupe=True: if an indexed file already holds the same content, path becomes a
+        hard link to it, so the bytes are stored once. Returns the number of bytes saved.
+        """
+        path = Path(path).resolve()
+        name, _ = split_name(path)
+        saved = 0
+        with self.lock:
+            if dedupe:
+                saved = self._link_duplicate(path, content_hash)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO artifacts "
+                "(path, directory, name, stage, market, run_id, content_hash, rows, schema, bytes, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(path), str(path.parent), name, stage_name(path), market_of(path.parent),
+                 run_id if run_id is not None else METRICS.run_id, content_hash, rows,
+                 json.dumps(schema) if schema is not None else None, path.stat().st_size,
+                 created_at if created_at is not None else time.time())
+            )
+            self.conn.commit()
+        return saved
+
+    def _link_duplicate(self, path, content_hash):
+        """Replaces path by a hard link to an indexed file with the same content (same suffix)."""
+        _, ext = split_name(path)
+        candidates = self.conn.execute(
+            "SELECT path FROM artifacts WHERE content_hash = ? AND path != ? ORDER BY created_at DESC, name DESC",
+            (content_hash, str(path))
+        ).fetchall()
+        for (existing,) in candidates:
+            existing = Path(existing)
+            if split_name(existing)[1] != ext or not existing.exists():
+                continue
+            if existing.samefile(path):
+                return 0
+            size = path.stat().st_size
+            tmp_path = path.with_name(f".{path.name}.link")
+            try:
+                os.link(existing, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError:
+                # Different filesystem / no hard links: keep the copy
+                _remove(tmp_path)
+                return 0
+            os.utime(path)  # Newest again, so the glob fallback still finds it first
+            return size
+        return 0
+
+    def _first_existing(self, query, params):
+        """First row path of query that still exists on disk; rows of vanished files are dropped."""
+        with self.lock:
+            while True:
+                row = self.conn.execute(query + " LIMIT 1", params).fetchone()
+                if row is None:
+                    return None
+                if os.path.exists(row[0]):
+                    return Path(row[0])
+                self.conn.execute("DELETE FROM artifacts WHERE path = ?", row)
+                self.conn.commit()
+
+    def latest(self, directory, prefix=""):
+        """Newest indexed snapshot in a folder whose name starts with prefix (None if none is indexed)."""
+        return self._first_existing(
+            "SELECT path FROM artifacts WHERE directory = ? AND substr(name, 1, ?) = ? "
+            "ORDER BY created_at DESC, name DESC",
+            (str(Path(directory).resolve()), len(prefix), prefix)
+        )
+
+    def recent(self, directory, prefix="", since=None, limit=None):
+        """
+        Indexed snapshots in a folder, newest first, one per content hash (a deduplicated or
+        re-written copy of the same data is listed once). since: only snapshots created at or
+        after this Unix time; limit: at most this many. Files that vanished are skipped.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, content_hash FROM artifacts WHERE directory = ? AND substr(name, 1, ?) = ? "
+                "AND created_at >= ? ORDER BY created_at DESC, name DESC",
+                (str(Path(directory).resolve()), len(prefix), prefix, since or 0)
+            ).fetchall()
+        paths, hashes = [], set()
+        for path, content_hash in rows:
+            if content_hash in hashes or not os.path.exists(path):
+                continue
+            hashes.add(content_hash)
+            paths.append(Path(path))
+            if limit is not None and len(paths) >= limit:
+                break
+        return paths
+
+    def latest_for_stage(self, stage, market=""):
+        """Newest snapshot of a stage, e.g. latest_for_stage('final_rankings', 'kokomo-in')."""
+        return self._first_existing(
+            "SELECT path FROM artifacts WHERE stage = ? AND market = ? ORDER BY created_at DESC, name DESC",
+            (stage, market or "")
+        )
+
+    def run_artifacts(self, run_id):
+        """Every snapshot a run wrote, oldest first, as dicts."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "SELECT path, stage, market, content_hash, rows, schema, bytes, created_at "
+                "FROM artifacts WHERE run_id = ? ORDER BY created_at", (run_id,)
+            )
+            columns = [c[0] for c in cursor.description]
+            artifacts = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for artifact in artifacts:
+            if artifact["schema"] is not None:
+                artifact["schema"] = json.loads(artifact["schema"])
+        return artifacts
+
+    def scan(self, root=None, dedupe=True):
+        """
+        Indexes snapshots under root that predate the index (or were copied in by hand),
+        oldest first so duplicates link to the earliest copy. Returns (indexed, bytes_saved).
+        """
+        from pipelines.raw_store import RAW_EXTENSIONS, raw_content_hash
+        from pipelines.stage_cache import file_digest
+
+        root = Path(root or DATA_ROOT)
+        with self.lock:
+            known = {path for (path,) in self.conn.execute("SELECT path FROM artifacts")}
+        found = []
+        for ext in ARTIFACT_EXTENSIONS:
+            for path in root.rglob(f"*{ext}"):
+                name, suffix = split_name(path)
+                if path.name.startswith(".") or suffix != ext or str(path.resolve()) in known:
+                    continue
+                if not is_indexed(path.parent):
+                    continue
+                if ext == ".json" and not name.startswith(JSON_SNAPSHOT_PREFIXES):
+                    continue
+                if ext == ".csv" and any(path.with_name(name + typed).exists() for typed in (".parquet", ".feather")):
+                    continue  # CSV export of a typed snapshot
+                found.append(path.resolve())
+
+        saved = 0
+        for path in sorted(found, key=lambda p: p.stat().st_mtime):
+            mtime = path.stat().st_mtime
+            raw = split_name(path)[0].startswith("raw_listings_") and split_name(path)[1] in RAW_EXTENSIONS
+            content_hash = raw_content_hash(path) if raw else file_digest(path)
+            saved += self.record(path, content_hash, run_id="scan", created_at=mtime, dedupe=dedupe)
+            os.utime(path, (mtime, mtime))
+        return len(found), saved
+
+    def prune(self, keep=DEFAULT_KEEP, older_than_days=None, dry_run=False):
+        """
+        Retention: keeps the newest `keep` snapshots of every stage folder and deletes the rest
+        (only those older than older_than_days, if given), plus their CSV exports.
+        Rows of files that no longer exist are dropped. Returns the list of deleted paths.
+        """
+        if keep < 1:
+            raise ValueError("keep must be at least 1 (the latest snapshot of a stage is never pruned).")
+        cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, directory, stage, created_at FROM artifacts "
+                "ORDER BY directory, stage, created_at DESC, name DESC"
+            ).fetchall()
+
+        deleted, seen = [], {}
+        for path, directory, stage, created_at in rows:
+            if not os.path.exists(path):
+                deleted.append(Path(path))
+                continue
+            rank = seen[(directory, stage)] = seen.get((directory, stage), 0) + 1
+            if rank <= keep or (cutoff is not None and created_at >= cutoff):
+                continue
+            deleted.append(Path(path))
+
+        if dry_run:
+            return [p for p in deleted if p.exists()]
+
+        removed = []
+        for path in deleted:
+            if _remove(path):
+                removed.append(path)
+            # Human-readable exports written next to the snapshot
+            export = path.with_name(f"{split_name(path)[0]}.csv")
+            if export != path and _remove(export):
+                removed.append(export)
+        with self.lock:
+            self.conn.executemany("DELETE FROM artifacts WHERE path = ?", [(str(p),) for p in deleted])
+            self.conn.commit()
+        return removed
+
+    def compact(self):
+        """Reclaims the space of deleted rows."""
+        with self.lock:
+            self.conn.execute("VACUUM")
+
+    def __len__(self):
+        with self.lock:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()
+        return count
+
+    def close(self):
+        self.conn.close()
+
+def run_prune(keep=DEFAULT_KEEP, older_than_days=None, dry_run=False, index=None):
+    """The 'prune' command: index untracked snapshots, dedupe them, apply retention, compact."""
+    index = index if index is not None else get_index()
+    print(f"🧹 Pruning snapshots under {DATA_ROOT} (keeping {keep} per stage"
+          + (f", anything newer than {older_than_days} days" if older_than_days is not None else "") + ")")
+
+    # A dry run still indexes untracked snapshots (metadata only), but links no duplicates
+    scanned, saved = index.scan(dedupe=not dry_run)
+    if scanned:
+        print(f"   🗂️  Indexed {scanned} untracked snapshot(s), {saved / 2**20:.2f} MB deduplicated")
+
+    removed = index.prune(keep=keep, older_than_days=older_than_days, dry_run=dry_run)
+    for path in removed:
+        shown = path.relative_to(PROJECT_ROOT) if path.is_relative_to(PROJECT_ROOT) else path
+        print(f"   {'would delete' if dry_run else '🗑️ '} {shown}")
+    if not dry_run:
+        index.compact()
+    print(f"✅ {len(removed)} file(s) {'to delete' if dry_run else 'deleted'}, {len(index)} snapshot(s) indexed")
+    return removed
@@ -0,0 +1,137 @@
+import sys
+import json
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.preprocessing_pipeline import (
+    clean_data, normalize_listings, get_latest_history_file, PROCESSED_DIR, HISTORY_DIR
+)
+from pipelines.enrichment_pipeline import (
+    enrich_listings, load_rent_prior, get_latest_preprocessed_file, ENRICHED_DIR,
+    MAX_CALLS, CACHE_TTL_DAYS, CACHE_MAX_ENTRIES, CACHE_NEGATIVE_TTL_DAYS
+)
+from pipelines.rent_cache import RentCache
+from pipelines.storage import save_dataset, load_dataset
+from pipelines.markets import market_slug, default_market, partition_dir
+from pipelines.feature_eng_pipeline import run_feature_engineering, get_latest_enriched_file, FEATURES_DIR
+from pipelines.scoring_pipeline import run_scoring, get_latest_features_file, get_latest_rankings_file, PREDICTIONS_DIR
+from pipelines.metrics import track_stage
+from pipelines.listing_timeseries import load_listing_timeseries
+from pipelines.market_stats import update_market_stats
+from pipelines.listing_delta import compute_listing_delta, save_delta, get_latest_delta_file
+
+# Define Paths
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+def merge_results(previous_df, updated_df, drop_ids, key='id'):
+    """
+    Replaces the rows of previous_df whose id is in drop_ids with updated_df.
+    drop_ids should cover removed + changed listings.
+    """
+    if previous_df is None or previous_df.empty:
+        return updated_df.reset_index(drop=True)
+    kept = previous_df[~previous_df[key].isin(set(drop_ids))]
+    if updated_df.empty:
+        return kept.reset_index(drop=True)
+    return pd.concat([kept, updated_df], ignore_index=True, sort=False)
+
+def _load_previous(get_latest_file):
+    """Previous output of a stage, or None if the stage never ran."""
+    try:
+        return load_dataset(get_latest_file())
+    except FileNotFoundError:
+        return None
+
+def _save_stage(df, directory, prefix, timestamp, export_csv=False):
+    save_path = save_dataset(df, directory, f"{prefix}_{timestamp}", export_csv=export_csv)
+    print(f"   💾 {prefix}: {len(df)} rows -> {save_path.name}")
+    return save_path
+
+@track_stage("delta")
+def run_delta_pipeline(delta_path=None, use_cache=True, market=None):
+    """
+    Runs preprocessing -> enrichment -> features -> scoring on the added/changed
+    listings only, and merges them into the previous output of every stage.
+    Features and scores come from the same stage functions as a full run (comparable
+    rents, zip stats, change columns, market yield targets), just on fewer rows.
+    market: read/write that market's partition instead of the stage folder.
+    """
+    print("🚀 Starting Delta Pipeline...")
+
+    # 1. Load the Delta
+    delta_path = Path(delta_path) if delta_path else get_latest_delta_file()
+    print(f"📂 Loading: {delta_path.name}")
+    with open(delta_path, "r") as f:
+        changes = json.load(f)
+
+    touched = changes['added'] + changes['changed']
+    drop_ids = [listing['id'] for listing in touched] + changes['removed']
+    if not drop_ids:
+        print("✅ Nothing changed since the last snapshot. Previous results are still current.")
+        return None
+
+    # Previous results of every stage (read BEFORE we write new ones)
+    previous_clean = _load_previous(lambda: get_latest_preprocessed_file(market))
+    previous_history = _load_previous(lambda: get_latest_history_file(market))
+    previous_enriched = _load_previous(lambda: get_latest_enriched_file(market))
+    previous_features = _load_previous(lambda: get_latest_features_file(market))
+    previous_rankings = _load_previous(lambda: get_latest_rankings_file(market))
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+    # 2. Preprocess just the touched listings
+    if touched:
+        new_listings, new_history = normalize_listings(touched)
+        new_clean = clean_data(new_listings)
+        new_history = new_history[new_history['id'].isin(new_clean['id'])]
+    else:
+        new_clean = pd.DataFrame(columns=['id'])
+        new_history = pd.DataFrame(columns=['id'])
+    clean = merge_results(previous_clean, new_clean, drop_ids)
+    _save_stage(clean, partition_dir(PROCESSED_DIR, market), "clean_listings", timestamp)
+    history = merge_results(previous_history, new_history, drop_ids)
+    _save_stage(history, partition_dir(HISTORY_DIR, market), "listing_history", timestamp)
+
+    # 3. Enrich just the touched listings (unchanged houses are cache hits anyway)
+    if not new_clean.empty:
+        cache = RentCache(ttl_days=CACHE_TTL_DAYS, max_entries=CACHE_MAX_ENTRIES,
+                          negative_ttl_days=CACHE_NEGATIVE_TTL_DAYS) if use_cache else None
+        try:
+            new_enriched = enrich_listings(new_clean, max_calls=MAX_CALLS, cache=cache,
+                                           rent_params=load_rent_prior(market))
+        finally:
+            if cache is not None:
+                cache.close()
+    else:
+        new_enriched = new_clean
+    enriched = merge_results(previous_enriched, new_enriched, drop_ids)
+    _save_stage(enriched, partition_dir(ENRICHED_DIR, market), "enriched_listings", timestamp)
+
+    # 4-5. Features (touched listings without an API rent get comparable rents) and scores
+    if not new_clean.empty:
+        new_features = run_feature_engineering(new_enriched, save=False, market=market, listings=new_clean)
+        new_rankings = run_scoring(new_features, save=False, market=market)
+    else:
+        new_features = new_rankings = new_clean
+    features = merge_results(previous_features, new_features, drop_ids)
+    slug = market_slug(market or default_market())
+    _save_stage(features, partition_dir(FEATURES_DIR, market), f"features_{slug}", timestamp)
+
+    rankings = merge_results(previous_rankings, new_rankings, drop_ids)
+    if 'deal_score' in rankings.columns:
+        rankings = rankings.sort_values(by='deal_score', ascending=False)
+    _save_stage(rankings, partition_dir(PREDICTIONS_DIR, market), "final_rankings", timestamp, export_csv=True)
+    # Only the reprocessed listings are new observations; unchanged ones were recorded before
+    if not new_rankings.empty:
+        load_listing_timeseries(market).append(new_rankings)
+    if 'rent_to_cost_ratio' in rankings.columns:
+        update_market_stats(clean, rankings, market=market)
+
+    print(f"\n✅ Delta Complete! Reprocessed {len(touched)} listings, removed {len(changes['removed'])}.")
+    return rankings
+
+if __name__ == "__main__":
+    run_delta_pipeline()
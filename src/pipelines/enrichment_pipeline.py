@@ -1,36 +1,65 @@
-import os
+import sys
 import requests
 import pandas as pd
-import time
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.api_client import create_session, get_with_retry, api_url, TokenBucket, CallBudget
+from pipelines.rent_cache import RentCache, make_cache_key
+from pipelines.storage import save_dataset, load_dataset, get_latest_dataset
+from pipelines.markets import partition_dir
+from pipelines.prescoring import prescore, fit_rent_prior, select_top_k, STRATEGIES
+from pipelines.scoring_pipeline import load_config as load_model_config
+from pipelines.metrics import track_stage
+from pipelines.env import api_key
 
 # 1. Setup Paths & Config
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 PREPROCESSED_DIR = PROJECT_ROOT / "data" / "02-preprocessed"
 ENRICHED_DIR = PROJECT_ROOT / "data" / "02-enriched" # New folder for this step
-env_path = PROJECT_ROOT / ".env"
-load_dotenv(dotenv_path=env_path)
 
-API_KEY = os.getenv("RENTCAST_API_KEY")
+# Enrichment Settings
+MAX_CALLS = 5             # HARD LIMIT on paid AVM calls per run (protects your wallet)
+MAX_WORKERS = 8           # Concurrent requests in concurrent mode
+RATE_LIMIT_PER_SEC = 2.0  # Token-bucket refill rate (same pace as the old 0.5s sleep)
+CACHE_TTL_DAYS = 30       # How long a cached rent estimate stays valid
+CACHE_NEGATIVE_TTL_DAYS = 7  # How long a cached "no rent data" answer stays valid
+CACHE_MAX_ENTRIES = 50000 # Size bound for the on-disk rent cache
+
+def load_rent_prior(market=None):
+    """
+    Rent prior for candidate selection: the model_params.yaml defaults,
+    refit on the previous enriched dataset when it holds enough estimates.
+    """
+    defaults = load_model_config()['rent_prior']
+    latest_file = get_latest_dataset(partition_dir(ENRICHED_DIR, market))
+    if latest_file is None:
+        return defaults
+    return fit_rent_prior(load_dataset(latest_file), defaults)
 
-def get_latest_preprocessed_file():
-    files = list(PREPROCESSED_DIR.glob("*.csv"))
-    if not files:
+def get_latest_preprocessed_file(market=None):
+    latest_file = get_latest_dataset(partition_dir(PREPROCESSED_DIR, market))
+    if latest_file is None:
         raise FileNotFoundError("No clean data found! Run preprocessing_pipeline.py first.")
-    return max(files, key=os.path.getmtime)
+    return latest_file
 
-def fetch_rent_estimate(address, property_type, bedrooms, bathrooms, square_footage):
+def fetch_rent_estimate(address, property_type, bedrooms, bathrooms, square_footage,
+                        session=None, limiter=None):
     """
     Calls the RentCast AVM Endpoint (The 'Sniper' Shot).
     We pass extra details (beds/baths) to make the estimate more accurate.
+    Pass a shared session/limiter to reuse pooled connections and respect the rate limit.
+    Returns the rent, 0 if the AVM answered without one, or None if the call failed.
     """
-    url = "https://api.rentcast.io/v1/avm/rent/long-term"
+    url = api_url("/v1/avm/rent/long-term")
     
     headers = {
         "accept": "application/json",
-        "X-Api-Key": API_KEY
+        "X-Api-Key": api_key()
     }
     
     params = {
@@ -42,87 +71,197 @@ def fetch_rent_estimate(address, property_type, bedrooms, bathrooms, square_foot
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        if session is None:
+            response = requests.get(url, headers=headers, params=params)
+        else:
+            response = get_with_retry(session, url, headers=headers, params=params, limiter=limiter)
         response.raise_for_status()
         data = response.json()
         
         # We only care about the 'rent' value for now
-        return data.get("rent", 0)
+        return data.get("rent") or 0
         
     except requests.exceptions.RequestException as e:
         print(f"   ❌ API Error for {address[:15]}...: {e}")
-        return 0
+        return None
 
+def _fetch_for_row(row, session, limiter, budget):
+    """Worker task: one paid AVM call for one listing (None if the budget is spent)."""
+    if not budget.try_acquire():
+        return None
+    return fetch_rent_estimate(
+        address=row['formattedAddress'],
+        property_type=row['propertyType'],
+        bedrooms=row['bedrooms'],
+        bathrooms=row['bathrooms'],
+        square_footage=row['squareFootage'],
+        session=session,
+        limiter=limiter
+    )
 
-def run_enrichment():
-    print("🚀 Starting Enrichment Pipeline (Safety Mode)...")
-    
-    # 0. Ensure Output Directory Exists
-    ENRICHED_DIR.mkdir(parents=True, exist_ok=True)
+def _row_cache_key(row):
+    return make_cache_key(
+        row['formattedAddress'], row['propertyType'],
+        row['bedrooms'], row['bathrooms'], row['squareFootage']
+    )
 
-    # 1. Load Clean Data
-    file_path = get_latest_preprocessed_file()
-    print(f"📂 Loading: {file_path.name}")
-    df = pd.read_csv(file_path)
-    
+def pick_paid_calls(df_sorted, uncached, max_calls, strategy=None, rent_params=None):
+    """
+    Which uncached listings (positions in df_sorted, cheapest first) get a paid call.
+    'expected' / 'upper_bound': heap top-K on the pre-scored deal_score (rent prior
+    instead of a real estimate), so the budget lands on likely top deals;
+    'cheapest': the first max_calls positions.
+    """
+    model_config = load_model_config()
+    selection = model_config.get('candidate_selection', {})
+    strategy = strategy or selection.get('strategy', 'expected')
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown selection strategy '{strategy}'. Use one of: {', '.join(STRATEGIES)}")
+    if max_calls <= 0 or not uncached:
+        return set()
+    if strategy == 'cheapest' or len(uncached) <= max_calls:
+        return set(uncached[:max_calls])
+
+    scores = prescore(df_sorted, model_config=model_config, rent_params=rent_params)
+    priority = scores['expected_deal_score' if strategy == 'expected' else 'upper_deal_score'].to_numpy()
+    picked = select_top_k(uncached, priority, max_calls, tiebreak=scores['price_per_sqft'].to_numpy())
+    if not picked:
+        return set()
+    print(f"   🎯 Candidate selection ({strategy}): {len(picked)} of {len(uncached)} uncached listings, "
+          f"pre-score {priority[picked].min():.1f}-{priority[picked].max():.1f}")
+    return set(picked)
+
+def enrich_listings(df, max_calls=MAX_CALLS, concurrent=True, max_workers=MAX_WORKERS,
+                    rate_per_sec=RATE_LIMIT_PER_SEC, cache=None, strategy=None, rent_params=None):
+    """
+    The 'Sniper' loop: fetches rent for the listings most likely to be top deals.
+    Cached estimates are free, so they never count against max_calls;
+    the budget is spent on the max_calls uncached listings with the best pre-score
+    (see pick_paid_calls; strategy='cheapest' restores cheapest-first).
+    rent_params overrides the rent prior from model_params.yaml.
+    Returns only the listings that came back with a rent estimate, cheapest first.
+    Serial and concurrent modes make the same calls and return identical frames.
+    """
     # --- INTELLIGENT FILTERING ---
     df_sorted = df.sort_values(by='price', ascending=True)
+    all_rows = [row for _, row in df_sorted.iterrows()]
     
-    # 2. Loop and Enrich (WITH SAFETY BRAKE)
-    rents = []
-    enriched_rows = []
+    # 1. Resolve cache hits first (free), then pick the paid calls
+    cached = {}
+    keys = []
+    if cache is not None:
+        keys = [_row_cache_key(row) for row in all_rows]
+        cached = cache.get_many(keys)
     
-    # HARD LIMIT: Stop after exactly 5 calls to protect your wallet
-    MAX_CALLS = 5 
-    call_count = 0
+    uncached = [i for i in range(len(all_rows)) if not keys or keys[i] not in cached]
+    paid_positions = pick_paid_calls(df_sorted, uncached, max_calls, strategy, rent_params)
     
-    # We loop through the sorted list, but the 'break' below ensures we stop at MAX_CALLS
-    for index, row in df_sorted.iterrows():
-        
-        if call_count >= MAX_CALLS:
-            print(f"🛑 SAFETY LIMIT REACHED: Stopped after {MAX_CALLS} API calls.")
-            break
-            
-        print(f"   [{call_count + 1}/{MAX_CALLS}] 🔎 Fetching rent for: {row['addressLine1']} (${row['price']:,.0f})")
-        
-        estimated_rent = fetch_rent_estimate(
-            address=row['formattedAddress'],
-            property_type=row['propertyType'],
-            bedrooms=row['bedrooms'],
-            bathrooms=row['bathrooms'],
-            square_footage=row['squareFootage']
-        )
-        
-        # Only increment our counter if we actually made a call
-        call_count += 1
+    selected = []   # (row, cached_rent or None)
+    for i, row in enumerate(all_rows):
+        key = keys[i] if keys else None
+        if key in cached:
+            selected.append((row, cached[key]))
+        elif i in paid_positions:
+            selected.append((row, None))
+    
+    rows = [row for row, rent in selected if rent is None]
+    total = len(rows)
+    
+    # One pooled session + one token bucket shared by every call of this run
+    session = create_session(pool_size=max_workers)
+    limiter = TokenBucket(rate_per_sec)
+    budget = CallBudget(max_calls)
+    
+    try:
+        if concurrent and total > 1:
+            print(f"   ⚡ Concurrent mode: {total} calls, {max_workers} workers, {rate_per_sec}/s")
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                # map() keeps results in the original (price-sorted) order
+                rents = list(pool.map(lambda r: _fetch_for_row(r, session, limiter, budget), rows))
+        else:
+            rents = []
+            for i, row in enumerate(rows):
+                print(f"   [{i + 1}/{total}] 🔎 Fetching rent for: {row['addressLine1']} (${row['price']:,.0f})")
+                rents.append(_fetch_for_row(row, session, limiter, budget))
+    finally:
+        session.close()
+    
+    if len(all_rows) - len(cached) > total:
+        print(f"🛑 SAFETY LIMIT REACHED: Stopped after {budget.used} API calls.")
+    
+    # 2. Remember what we paid for: estimates and "no data" answers (not errors)
+    fetched = iter(rents)
+    new_entries = {}
+    enriched_rows = []
+    for row, cached_rent in selected:
+        if cached_rent is None:
+            estimated_rent = next(fetched)
+            if cache is not None and estimated_rent is not None:
+                new_entries[_row_cache_key(row)] = estimated_rent
+            estimated_rent = estimated_rent or 0
+        else:
+            estimated_rent = cached_rent
         
         if estimated_rent > 0:
-            print(f"      ✅ Rent Estimate: ${estimated_rent}")
-            # Add to our results list
+            source = "cache" if cached_rent is not None else "API"
+            print(f"      ✅ {row['addressLine1']}: Rent Estimate ${estimated_rent} ({source})")
+            row = row.copy()
             row['rent_estimate'] = estimated_rent
             enriched_rows.append(row)
         else:
-            print(f"      ⚠️ No rent data found.")
             # Even if we found nothing, we still paid for the API call, so we skip adding it to the final list
-            # unless you want to keep it with rent=0
-        
-        time.sleep(0.5)
+            print(f"      ⚠️ {row['addressLine1']}: No rent data found.")
+    
+    if cache is not None:
+        if new_entries:
+            cache.put_many(new_entries)
+        stats = cache.stats()
+        print(f"   💾 Rent cache: {stats['hits']} hits ({stats['negative_hits']} without rent data), "
+              f"{stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate, {stats['entries']} entries)")
+    
+    if not enriched_rows:
+        return pd.DataFrame(columns=df.columns)
+    return pd.DataFrame(enriched_rows)
 
-    # 3. Create DataFrame from the successful hits
-    if enriched_rows:
-        final_df = pd.DataFrame(enriched_rows)
-        
+
+@track_stage("enrichment")
+def run_enrichment(df=None, concurrent=True, use_cache=True, save=True, market=None):
+    """
+    df: clean listings from run_preprocessing. If None, the latest preprocessed dataset is used.
+    save: write the enriched dataset to 02-enriched.
+    market: read/write that market's partition instead of the stage folder.
+    Returns the enriched DataFrame (only listings that got a rent estimate).
+    """
+    print("🚀 Starting Enrichment Pipeline (Safety Mode)...")
+
+    # 1. Load Clean Data
+    if df is None:
+        file_path = get_latest_preprocessed_file(market)
+        print(f"📂 Loading: {file_path.name}")
+        df = load_dataset(file_path)
+    
+    # 2. Enrich (WITH SAFETY BRAKE: never more than MAX_CALLS paid calls)
+    cache = RentCache(ttl_days=CACHE_TTL_DAYS, max_entries=CACHE_MAX_ENTRIES,
+                      negative_ttl_days=CACHE_NEGATIVE_TTL_DAYS) if use_cache else None
+    try:
+        final_df = enrich_listings(df, max_calls=MAX_CALLS, concurrent=concurrent, cache=cache,
+                                   rent_params=load_rent_prior(market))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    # 3. Save the successful hits
+    if final_df.empty:
+        print("\n⚠️ No data was enriched. Check your API key or data source.")
+    elif save:
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = f"enriched_listings_{timestamp}.csv"
-        save_path = ENRICHED_DIR / filename
-        
-        final_df.to_csv(save_path, index=False)
+        save_path = save_dataset(final_df, partition_dir(ENRICHED_DIR, market), f"enriched_listings_{timestamp}")
         
         print(f"\n✅ Enrichment Complete! Saved {len(final_df)} listings to:")
         print(f"   {save_path}")
-    else:
-        print("\n⚠️ No data was enriched. Check your API key or data source.")
+    
+    return final_df
 
 if __name__ == "__main__":
     run_enrichment()
-        
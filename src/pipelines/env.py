@@ -0,0 +1,24 @@
+import os
+from pathlib import Path
+
+# Environment settings (.env) loaded on demand instead of at import time,
+# so importing a stage module never touches the filesystem or python-dotenv.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+ENV_PATH = PROJECT_ROOT / ".env"
+
+_loaded = False
+
+def load_env(path=ENV_PATH):
+    """Loads the project's .env once (existing environment variables win)."""
+    global _loaded
+    if _loaded:
+        return
+    from dotenv import load_dotenv  # Only entry points that need settings pay for the import
+    load_dotenv(dotenv_path=path)
+    _loaded = True
+
+def api_key():
+    """The RentCast API key (RENTCAST_API_KEY, from the environment or .env)."""
+    load_env()
+    return os.getenv("RENTCAST_API_KEY")
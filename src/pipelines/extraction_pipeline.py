@@ -1,19 +1,34 @@
-import os
-import json
+import sys
+import time
+import threading
 import requests
 import yaml
 import pandas as pd
 from datetime import datetime
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# 1. Load Environment Variables (Robust Method)
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.api_client import create_session, get_with_retry, api_url, HostConcurrencyLimiter
+from pipelines.listing_delta import compute_listing_delta, save_delta
+from pipelines.raw_store import RawSnapshotWriter, iter_raw_records, get_latest_raw_snapshot, raw_extension
+from pipelines.listing_dedup import ListingDeduper, dedupe_listings
+from pipelines.markets import load_target_markets, partition_dir
+from pipelines.metrics import track_stage
+from pipelines.env import api_key
+
+# 1. Paths (the API key comes from .env via pipelines.env, loaded on first use)
 # This finds the 'Real_Estate_Yield_Optimizer' root folder automatically
 project_root = Path(__file__).resolve().parents[2]
-env_path = project_root / ".env"
-load_dotenv(dotenv_path=env_path)
+RAW_DIR = project_root / "data" / "01-raw"
 
-API_KEY = os.getenv("RENTCAST_API_KEY")
+# Extraction Settings
+PAGE_SIZE = 500             # RentCast maximum 'limit' per request
+PAGE_PREFETCH = 2           # Pages requested at once per zip (a short page ends the zip)
+MAX_HOST_CONCURRENCY = 4    # In-flight requests allowed against the API host
+MAX_ZIP_WORKERS = 16        # Zips drained in parallel
 
 def load_config():
     """Loads the zip codes and settings from the YAML config file."""
@@ -22,77 +37,185 @@ def load_config():
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
-def fetch_listings(zip_code):
+def fetch_listings(zip_code, limit=PAGE_SIZE, offset=0, session=None, host_limiter=None):
     """
-    Connects to RentCast API to get active sale listings for a specific zip.
+    Connects to RentCast API to get one page of active sale listings for a specific zip.
     """
-    url = "https://api.rentcast.io/v1/listings/sale"
+    url = api_url("/v1/listings/sale")
     
     # Original Method: Send Key in the Header (Cleaner)
     headers = {
         "accept": "application/json",
-        "X-Api-Key": API_KEY
+        "X-Api-Key": api_key()
     }
     
     # Parameters for the API call
     params = {
         "zipCode": zip_code,
         "status": "Active",
-        "limit": 50  # Get up to 50 houses per zip
+        "limit": limit,
+        "offset": offset
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        if session is None:
+            response = requests.get(url, headers=headers, params=params)
+        else:
+            response = get_with_retry(session, url, headers=headers, params=params, host_limiter=host_limiter)
         response.raise_for_status() # Check for errors
         return response.json()
     except requests.exceptions.RequestException as e:
-        print(f"❌ Error fetching data for {zip_code}: {e}")
+        print(f"❌ Error fetching data for {zip_code} (offset {offset}): {e}")
+        return None
+
+def extract_listings(data):
+    """The API sometimes returns a list directly, sometimes it's inside a key."""
+    if data is None:
         return []
+    if isinstance(data, list):
+        return data
+    return data.get("listings", [])
+
+def fetch_all_listings(zip_code, session, host_limiter, page_pool, page_size=PAGE_SIZE, prefetch=PAGE_PREFETCH,
+                       on_page=None):
+    """
+    Drains every page for one zip (offset-based pagination).
+    The first page goes out alone (most zips fit in one page); after a full page
+    the next ones are requested 'prefetch' at a time. The first short page ends the zip.
+    If on_page is given, every page is handed to it as it arrives instead of being collected.
+    A failed page also ends the zip; stats['complete'] is then False, so callers know
+    the zip's listings are partial.
+    Returns (listings, stats).
+    """
+    start = time.perf_counter()
+    listings = []
+    count = 0
+    pages = 0
+    offset = 0
+    wave = 1
+    done = False
+    complete = True
+    
+    while not done:
+        offsets = [offset + i * page_size for i in range(wave)]
+        futures = [
+            page_pool.submit(fetch_listings, zip_code, page_size, o, session, host_limiter)
+            for o in offsets
+        ]
+        for future in futures:
+            data = future.result()
+            page = extract_listings(data)
+            if data is not None:
+                pages += 1
+            # Keep pages in offset order; anything after a short page is empty
+            if not done and page:
+                count += len(page)
+                if on_page is not None:
+                    on_page(page)
+                else:
+                    listings.extend(page)
+            if data is None and not done:
+                complete = False
+            if data is None or len(page) < page_size:
+                done = True
+        offset += wave * page_size
+        wave = prefetch
+    
+    stats = {
+        "zip_code": zip_code,
+        "listings": count,
+        "pages": pages,
+        "complete": complete,
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+    return listings, stats
 
-def run_extraction():
+@track_stage("extraction")
+def run_extraction(delta=False, keep_listings=True, market=None, report=None):
     """
     Main orchestration function:
     1. Reads Config
-    2. Loops through Zips
-    3. Saves Raw Data
+    2. Drains every zip (all pages, zips in parallel), streaming each page
+       straight into a compressed NDJSON snapshot. Listings already seen in another
+       page or zip (same id, or same address) are dropped on the way; the latest
+       observation of a house is the one kept.
+    3. (delta=True) Saves what changed since the previous snapshot. Listings of a zip
+       whose pages failed are never reported as removed.
+    Returns the raw listings (keep_listings=True) so the next stage can use them
+    without re-reading the file, or the snapshot path (keep_listings=False) so
+    preprocessing reads it back in chunks instead of holding every raw listing as a dict.
+    market: one entry of 'target_markets'; its snapshot goes to 01-raw/market=<slug>/.
+    Defaults to the first configured market, saved directly in 01-raw.
+    report: optional dict that receives 'incomplete_zips' (zips whose pages failed),
+    so later stages don't take their missing listings for delisted ones.
     """
     print("🚀 Starting Extraction Pipeline...")
     
     # A. Load Config
     config = load_config()
-    target_zips = config["target_market"]["zip_codes"]
-    city = config["target_market"]["city"]
+    raw_dir = partition_dir(RAW_DIR, market)
+    market = market or load_target_markets(config)[0]
+    target_zips = market["zip_codes"]
+    city = market["city"]
     
     all_listings = []
+    collect_lock = threading.Lock()
+    previous_snapshot = get_latest_raw_snapshot(raw_dir) if delta else None
     
-    # B. Loop through Zip Codes
-    for zip_code in target_zips:
-        print(f"   Searching {zip_code}...")
-        data = fetch_listings(zip_code)
-        
-        # Check if we got listings back
-        if isinstance(data, list):
-            listings = data # Sometimes it returns a list directly
-        else:
-            listings = data.get("listings", []) # Sometimes it's inside a key
-            
-        print(f"   Found {len(listings)} listings in {zip_code}")
-        all_listings.extend(listings)
-    
-    # C. Save Raw Data
     # Create a filename with the timestamp so we never overwrite old data
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"raw_listings_{city}_{timestamp}.json"
+    save_path = raw_dir / f"raw_listings_{city}_{timestamp}{raw_extension()}"
+    deduper = ListingDeduper()
+    writer = RawSnapshotWriter(save_path, deduper=deduper)
     
-    # Construct the full path to the save location
-    save_path = project_root / "data" / "01-raw" / filename
+    def on_page(page):
+        page = writer.write_many(page)
+        if keep_listings:
+            with collect_lock:
+                all_listings.extend(page)
     
-    # Save the file
-    with open(save_path, "w") as f:
-        json.dump(all_listings, f, indent=4)
-        
-    print(f"\n✅ Success! Saved {len(all_listings)} listings to:")
+    # B. Fetch Zip Codes concurrently over one pooled session
+    start = time.perf_counter()
+    session = create_session(pool_size=MAX_HOST_CONCURRENCY)
+    host_limiter = HostConcurrencyLimiter(MAX_HOST_CONCURRENCY)
+    zip_workers = max(1, min(MAX_ZIP_WORKERS, len(target_zips)))
+    
+    try:
+        with ThreadPoolExecutor(max_workers=zip_workers * PAGE_PREFETCH) as page_pool, \
+             ThreadPoolExecutor(max_workers=zip_workers) as zip_pool:
+            results = list(zip_pool.map(
+                lambda z: fetch_all_listings(z, session, host_limiter, page_pool, on_page=on_page),
+                target_zips
+            ))
+    finally:
+        session.close()
+        writer.close()
+    
+    for _, stats in results:
+        print(f"   Found {stats['listings']} listings in {stats['zip_code']} "
+              f"({stats['pages']} pages, {stats['seconds']:.2f}s)")
+    incomplete_zips = [stats['zip_code'] for _, stats in results if not stats['complete']]
+    if incomplete_zips:
+        print(f"   ⚠️ Incomplete zips (a page failed): {', '.join(incomplete_zips)}")
+    if report is not None:
+        report['incomplete_zips'] = incomplete_zips
+    
+    print(f"   ⏱️  {len(target_zips)} zips fetched in {time.perf_counter() - start:.2f}s")
+    print(f"   {deduper.summary()}")
+    if keep_listings and deduper.superseded:
+        # Copies replaced by a newer observation were already collected
+        all_listings = dedupe_listings(all_listings)
+    print(f"\n✅ Success! Saved {writer.count} listings to:")
     print(f"   {save_path}")
+    
+    # C. Delta against the previous snapshot (both streamed from disk)
+    if delta:
+        previous_listings = iter_raw_records(previous_snapshot) if previous_snapshot is not None else []
+        changes = compute_listing_delta(previous_listings, iter_raw_records(save_path),
+                                        incomplete_zips=incomplete_zips)
+        save_delta(changes, city, timestamp)
+    
+    return all_listings if keep_listings else save_path
 
 if __name__ == "__main__":
     run_extraction()
\ No newline at end of file
@@ -1,9 +1,21 @@
+import sys
 import pandas as pd
 import yaml
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.storage import save_dataset, load_dataset, get_latest_dataset
+from pipelines.markets import partition_dir, market_slug, default_market
+from pipelines.stage_cache import frame_digest, make_fingerprint
+from pipelines.metrics import track_stage
+from pipelines import rent_model, market_stats, listing_timeseries, storage
+from pipelines.market_stats import load_market_stats, zip_values
+from pipelines.listing_timeseries import load_listing_timeseries, CHANGE_COLUMNS
+
 # Define Paths
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 # CRITICAL UPDATE: We now pull from the Enriched folder, not Preprocessed
@@ -16,12 +28,45 @@ def load_market_config():
     with open(CONFIG_PATH, "r") as f:
         return yaml.safe_load(f)
 
-def get_latest_enriched_file():
-    """Finds the most recent CSV in the 02-enriched folder."""
-    files = list(ENRICHED_DIR.glob("*.csv"))
-    if not files:
+def get_latest_enriched_file(market=None):
+    """Finds the most recent dataset in the 02-enriched folder."""
+    latest_file = get_latest_dataset(partition_dir(ENRICHED_DIR, market))
+    if latest_file is None:
         raise FileNotFoundError("No enriched data found! Run enrichment_pipeline.py first.")
-    return max(files, key=lambda f: f.stat().st_mtime)
+    return latest_file
+
+def get_market_info(zip_code, market_data, market=None):
+    """
+    Market settings for one listing.
+    market: the listing's market slug ('springfield-il', see listing_market).
+    Lookup order: the zip itself -> the market's default -> the global 'default'.
+    """
+    markets = market_data['markets']
+    if zip_code in markets:
+        return markets[zip_code]
+    market_defaults = market_data.get('market_defaults') or {}
+    if market is not None and market in market_defaults:
+        return market_defaults[market]
+    return markets['default']
+
+def listing_market(city, state=None):
+    """Market slug of a listing from its city and state (None without a city)."""
+    if city is None or pd.isna(city) or not str(city).strip():
+        return None
+    state = "" if state is None or pd.isna(state) else str(state)
+    return market_slug({'city': str(city), 'state': state}) or None
+
+def listing_markets(df):
+    """listing_market() for every row of df (an object array), or None if df has no city column."""
+    if 'city' not in df.columns:
+        return None
+    def text(col):
+        values = df[col].astype(object) if col in df.columns else pd.Series("", index=df.index, dtype=object)
+        return values.where(values.notna(), "").astype(str)
+    # Each DISTINCT (city, state) once, broadcast back to the rows
+    codes, uniques = pd.factorize(text('city') + "\x1f" + text('state'))
+    slugs = np.array([listing_market(*key.split("\x1f")) for key in uniques], dtype=object)
+    return slugs[codes]
 
 def calculate_maintenance_risk(row, market_data):
     """
@@ -36,8 +81,8 @@ def calculate_maintenance_risk(row, market_data):
     
     # 2. Get Labor Index for this Zip
     zip_code = str(row['zipCode'])
-    # Fallback to default if zip not in config
-    market_info = market_data['markets'].get(zip_code, market_data['markets']['default'])
+    # Fallback to the market's default, then the global default, if zip not in config
+    market_info = get_market_info(zip_code, market_data, listing_market(row.get('city'), row.get('state')))
     labor_index = market_info['labor_cost_index']
     
     # 3. The Math
@@ -51,7 +96,7 @@ def calculate_vacancy_adjusted_revenue(row, market_data):
     Formula: Gross_Rent * (1 - Vacancy_Rate)
     """
     zip_code = str(row['zipCode'])
-    market_info = market_data['markets'].get(zip_code, market_data['markets']['default'])
+    market_info = get_market_info(zip_code, market_data, listing_market(row.get('city'), row.get('state')))
     vacancy_rate = market_info['vacancy_rate']
     
     gross_rent = row['rent_estimate']
@@ -62,44 +107,143 @@ def calculate_vacancy_adjusted_revenue(row, market_data):
         
     return gross_rent * (1 - vacancy_rate)
 
-def run_feature_engineering():
+def lookup_market_arrays(zip_codes, market_data, markets=None):
+    """
+    Joins the per-zip market config onto a column of zip codes.
+    Returns (labor_cost_index, vacancy_rate) as float arrays aligned with zip_codes.
+    Zips that are not in the config fall back to their market's default
+    (if market slugs are given, see listing_markets), then to the 'default' market.
+    """
+    default = market_data['markets']['default']
+
+    # Look up each DISTINCT (zip, market) once, then broadcast back to the rows
+    zips = pd.Series(zip_codes).astype(str).reset_index(drop=True)
+    if markets is None:
+        keys = zips
+    else:
+        market_values = pd.Series(markets).astype(object).reset_index(drop=True)
+        keys = zips + "\x1f" + market_values.where(market_values.notna(), "").astype(str)
+    codes, uniques = pd.factorize(keys)
+    labor = np.empty(len(uniques), dtype=float)
+    vacancy = np.empty(len(uniques), dtype=float)
+    for i, key in enumerate(uniques):
+        zip_code, _, market = key.partition("\x1f")
+        market_info = get_market_info(zip_code, market_data, market or None)
+        labor[i] = market_info.get('labor_cost_index', default.get('labor_cost_index', np.nan))
+        vacancy[i] = market_info.get('vacancy_rate', default.get('vacancy_rate', np.nan))
+
+    return labor[codes], vacancy[codes]
+
+def compute_features(df, market_data, current_year=None):
+    """
+    Columnar version of the three investor metrics.
+    Produces the same numbers as the row-wise helpers above, in one vectorized pass.
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+
+    price = pd.to_numeric(df['price'], errors='coerce').to_numpy(dtype=float)
+    rent = pd.to_numeric(df['rent_estimate'], errors='coerce').to_numpy(dtype=float)
+    sqft = pd.to_numeric(df['squareFootage'], errors='coerce').to_numpy(dtype=float)
+    year_built = pd.to_numeric(df['yearBuilt'], errors='coerce').to_numpy(dtype=float)
+
+    labor_index, vacancy_rate = lookup_market_arrays(df['zipCode'], market_data, listing_markets(df))
+
+    # 1. Rent to Cost Ratio (0 when price is missing or not positive)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rent_to_cost = np.where(price > 0, rent / price, 0.0)
+
+    # 2. Maintenance Risk (missing yearBuilt -> 1980)
+    age = current_year - np.where(np.isnan(year_built), 1980, year_built)
+    risk_score = (age * sqft * labor_index) / 1000
+
+    # 3. Vacancy Adjusted Revenue (0 when rent is missing or zero)
+    has_rent = ~np.isnan(rent) & (rent != 0)
+    adjusted_revenue = np.where(has_rent, rent * (1 - vacancy_rate), 0.0)
+
+    df = df.copy()
+    df['rent_to_cost_ratio'] = rent_to_cost
+    df['maintenance_risk_score'] = risk_score
+    df['vacancy_adjusted_revenue'] = adjusted_revenue
+    return df
+
+@track_stage("features")
+def run_feature_engineering(df=None, save=True, market=None, stage_cache=None, listings=None):
+    """
+    df: enriched listings from run_enrichment. If None, the latest enriched dataset is used.
+    listings: all clean listings of the market (optional). Those without an API rent get a
+              local comparable estimate (rent_source / rent_confidence columns), so the whole
+              market is ranked instead of only the enriched few.
+    save: write the features dataset to 03-features.
+    market: read/write that market's partition instead of the stage folder.
+    stage_cache: a StageCache; the previous output is reused if the input, market_data.yaml, code and year are unchanged.
+    Returns the DataFrame with the three investor metrics added (plus price_per_sqft_vs_zip
+    from the market stats table and the price/score change columns from the listing time series).
+    """
     print("🚀 Starting Feature Engineering Pipeline...")
     
-    # Ensure output folder exists
-    FEATURES_DIR.mkdir(parents=True, exist_ok=True)
-    
     # 1. Load Data & Config
-    file_path = get_latest_enriched_file()
-    print(f"📂 Loading: {file_path.name}")
-    df = pd.read_csv(file_path)
+    if df is None:
+        file_path = get_latest_enriched_file(market)
+        print(f"📂 Loading: {file_path.name}")
+        df = load_dataset(file_path)
+    
+    comparables = None
+    if listings is not None:
+        comparables = rent_model.load_comparables(ENRICHED_DIR, market, extra=df)
+    
+    stats = load_market_stats(market)
+    series = load_listing_timeseries(market)
+    state = series.state()
+    # Ages (maintenance risk) depend on the year: part of the fingerprint, so a new year recomputes
+    current_year = datetime.now().year
+    
+    if stage_cache is not None:
+        ids = set(df['id'].astype(str)) | (set(listings['id'].astype(str)) if listings is not None else set())
+        params = {'current_year': current_year,
+                  'market_stats': stats.version(('price_per_sqft',)),
+                  'timeseries': frame_digest(state[state['id'].astype(str).isin(ids)].drop(
+                      columns=['first_seen', 'last_seen', 'observations']))}
+        if comparables is not None:
+            params.update(listings=frame_digest(listings), comparables=frame_digest(comparables))
+        fingerprint = make_fingerprint(frame_digest(df), config_paths=[CONFIG_PATH],
+                                       code_paths=[__file__, rent_model.__file__, market_stats.__file__,
+                                                   listing_timeseries.__file__, storage.__file__],
+                                       params=params)
+        cached = stage_cache.load("features", fingerprint)
+        if cached is not None:
+            return cached
     
     market_config = load_market_config()
     
-    # 2. Apply "Rent to Cost Ratio" (The 1% Rule)
-    # Avoid division by zero
-    df['rent_to_cost_ratio'] = df.apply(
-        lambda x: (x['rent_estimate'] / x['price']) if x['price'] > 0 else 0, axis=1
-    )
+    # 1b. Local rents for every listing the API budget didn't reach
+    if comparables is not None:
+        df = rent_model.estimate_missing_rents(listings, df, comparables)
     
-    # 3. Apply "Maintenance Risk Score"
-    df['maintenance_risk_score'] = df.apply(
-        lambda row: calculate_maintenance_risk(row, market_config), axis=1
-    )
+    # 2-4. "Rent to Cost Ratio" (The 1% Rule), "Maintenance Risk Score"
+    # and "Vacancy Adjusted Revenue" -- computed column-wise in a single pass
+    df = compute_features(df, market_config, current_year=current_year)
     
-    # 4. Apply "Vacancy Adjusted Revenue"
-    df['vacancy_adjusted_revenue'] = df.apply(
-        lambda row: calculate_vacancy_adjusted_revenue(row, market_config), axis=1
-    )
+    # 4b. Price per sqft against the zip's live median (1.0 = typical for the zip)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_per_sqft = pd.to_numeric(df['price'], errors='coerce') / pd.to_numeric(df['squareFootage'], errors='coerce')
+        df['price_per_sqft_vs_zip'] = price_per_sqft.to_numpy(dtype=float) / zip_values(
+            df['zipCode'], stats, 'median_price_per_sqft')
     
-    # 5. Save Enriched Data
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"features_kokomo_{timestamp}.csv"
-    save_path = FEATURES_DIR / filename
+    # 4c. Price / score changes since earlier runs (a join on the time-series state, no history rescan)
+    df[CHANGE_COLUMNS] = series.change_features(df, state)
     
-    df.to_csv(save_path, index=False)
+    # 5. Save Enriched Data
+    if save:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        slug = market_slug(market or default_market())
+        save_path = save_dataset(df, partition_dir(FEATURES_DIR, market), f"features_{slug}_{timestamp}")
+        
+        print(f"✅ Success! Calculated metrics saved to:")
+        print(f"   {save_path}")
     
-    print(f"✅ Success! Calculated metrics saved to:")
-    print(f"   {save_path}")
+    if stage_cache is not None:
+        stage_cache.record("features", fingerprint, save_path if save else None, df)
     
     # Preview the "Secret Sauce" columns
     # We round the columns for cleaner display
@@ -107,6 +251,8 @@ def run_feature_engineering():
     
     print("\n📊 Investor Metrics Preview:")
     print(df[display_cols].round(4).head())
+    
+    return df
 
 if __name__ == "__main__":
     run_feature_engineering()
\ No newline at end of file
@@ -0,0 +1,93 @@
+from pipelines.rent_cache import normalize_address
+
+# Streaming listing dedup. Overlapping zip queries (and listings near zip borders)
+# return the same house more than once. A hash index on the listing id, with the
+# normalized formattedAddress as fallback key, drops repeats as pages arrive;
+# when a repeat is a newer observation it wins over the copy already kept.
+
+# Observation time of a listing: the first of these fields that is set (ISO dates sort as text)
+OBSERVED_FIELDS = ('lastSeenDate', 'listedDate')
+
+def observed_at(record):
+    for field in OBSERVED_FIELDS:
+        value = record.get(field)
+        if value:
+            return str(value)
+    return ""
+
+def address_key(record):
+    """Normalized formattedAddress, or None if the listing has no address."""
+    address = record.get('formattedAddress')
+    return normalize_address(address) if address else None
+
+class ListingDeduper:
+    """
+    Hash index over every listing admitted so far: id -> slot and address -> slot,
+    where a slot is [ordinal, observed_at] of the copy currently kept.
+    The id is looked up first; the address catches id-less and re-listed houses.
+    A repeat replaces the kept copy only if it was observed strictly later
+    (ties keep the first copy). Replaced copies are collected in `superseded`
+    (their ordinals) so a writer can drop them.
+    """
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_address = {}
+        self.unique = 0
+        self.duplicates = {'id': 0, 'address': 0}
+        self.superseded = set()
+
+    def admit(self, records, start=0):
+        """
+        Returns the records to keep, in order. The i-th kept record gets ordinal start + i
+        (its position in the output stream, e.g. the line number in a raw snapshot).
+        """
+        kept = []
+        for record in records:
+            listing_id = record.get('id')
+            address = address_key(record)
+            seen = observed_at(record)
+
+            slot = self.by_id.get(listing_id) if listing_id else None
+            matched = 'id'
+            if slot is None and address:
+                slot = self.by_address.get(address)
+                matched = 'address'
+
+            if slot is None:
+                slot = [start + len(kept), seen]
+                kept.append(record)
+                self.unique += 1
+            else:
+                self.duplicates[matched] += 1
+                if seen > slot[1]:
+                    # Latest observation wins: the copy kept so far is dropped
+                    self.superseded.add(slot[0])
+                    slot[0], slot[1] = start + len(kept), seen
+                    kept.append(record)
+
+            if listing_id:
+                self.by_id[listing_id] = slot
+            if address:
+                self.by_address[address] = slot
+        return kept
+
+    def stats(self):
+        return {
+            'unique': self.unique,
+            'duplicates_by_id': self.duplicates['id'],
+            'duplicates_by_address': self.duplicates['address'],
+            'replaced_by_newer': len(self.superseded),
+        }
+
+    def summary(self):
+        total = self.duplicates['id'] + self.duplicates['address']
+        return (f"🧬 Dedup: {self.unique} unique listings, {total} duplicates dropped "
+                f"({self.duplicates['id']} by id, {self.duplicates['address']} by address; "
+                f"{len(self.superseded)} replaced by a newer observation)")
+
+def dedupe_listings(records):
+    """The deduplicated listings (latest observation of every house), in arrival order."""
+    deduper = ListingDeduper()
+    kept = deduper.admit(records)
+    return [record for i, record in enumerate(kept) if i not in deduper.superseded]
@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+
+from pipelines.stage_cache import file_digest
+from pipelines import artifact_index
+
+# Listing deltas between two raw snapshots (data/01-raw/deltas).
+# Kept apart from delta_pipeline so extraction can write a delta without
+# importing every downstream stage.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DELTA_DIR = PROJECT_ROOT / "data" / "01-raw" / "deltas"
+
+# A listing counts as "changed" when any of these fields moved
+DELTA_FIELDS = ['price', 'status', 'lastSeenDate']
+
+def listing_signature(listing):
+    return tuple(listing.get(field) for field in DELTA_FIELDS)
+
+def compute_listing_delta(previous, current, incomplete_zips=()):
+    """
+    Compares two raw snapshots by 'id'.
+    incomplete_zips: zips whose pages failed while fetching current. Their missing
+    listings may still be on the market, so they are not reported as removed.
+    Returns {'added': [...], 'changed': [...], 'removed': [ids], 'unchanged': count, 'incomplete_zips': [...]}.
+    """
+    incomplete_zips = sorted({str(z) for z in incomplete_zips})
+    previous_index = {}
+    kept_ids = set()   # Listings of incomplete zips: never removed
+    for listing in previous:
+        previous_index[listing['id']] = listing_signature(listing)
+        if incomplete_zips and str(listing.get('zipCode')) in incomplete_zips:
+            kept_ids.add(listing['id'])
+    current_ids = set()
+
+    added, changed = [], []
+    unchanged = 0
+    for listing in current:
+        listing_id = listing['id']
+        current_ids.add(listing_id)
+        if listing_id not in previous_index:
+            added.append(listing)
+        elif previous_index[listing_id] != listing_signature(listing):
+            changed.append(listing)
+        else:
+            unchanged += 1
+
+    removed = [listing_id for listing_id in previous_index
+               if listing_id not in current_ids and listing_id not in kept_ids]
+
+    return {'added': added, 'changed': changed, 'removed': removed, 'unchanged': unchanged,
+            'incomplete_zips': incomplete_zips}
+
+def save_delta(changes, city, timestamp):
+    """Writes the delta next to the raw snapshots (data/01-raw/deltas)."""
+    DELTA_DIR.mkdir(parents=True, exist_ok=True)
+    save_path = DELTA_DIR / f"delta_{city}_{timestamp}.json"
+    with open(save_path, "w") as f:
+        json.dump(changes, f)
+    if artifact_index.is_indexed(DELTA_DIR):
+        artifact_index.get_index().record(
+            save_path, file_digest(save_path),
+            rows=len(changes['added']) + len(changes['changed']) + len(changes['removed'])
+        )
+
+    total = len(changes['added']) + len(changes['changed']) + changes['unchanged']
+    touched = len(changes['added']) + len(changes['changed'])
+    share = touched / total if total else 0
+    print(f"🔁 Delta: +{len(changes['added'])} added, ~{len(changes['changed'])} changed, "
+          f"-{len(changes['removed'])} removed, {changes['unchanged']} unchanged "
+          f"({share:.1%} of listings to reprocess)")
+    if changes.get('incomplete_zips'):
+        print(f"   ⚠️ No removals for incomplete zips: {', '.join(changes['incomplete_zips'])}")
+    print(f"   {save_path}")
+    return save_path
+
+def get_latest_delta_file():
+    if artifact_index.is_indexed(DELTA_DIR):
+        indexed = artifact_index.get_index().latest(DELTA_DIR, prefix="delta_")
+        if indexed is not None:
+            return indexed
+    files = list(DELTA_DIR.glob("*.json"))
+    if not files:
+        raise FileNotFoundError("No delta found! Run extraction with delta=True first.")
+    return max(files, key=lambda f: f.stat().st_mtime)
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from datetime import date, datetime
+
+from pipelines.storage import save_dataset, load_dataset, list_datasets, get_latest_dataset, apply_schema
+from pipelines.markets import partition_dir
+
+# Append-only listing time series (data/timeseries): one row per listing per run,
+# partitioned by observation date (date=YYYY-MM-DD/), each run adding one columnar part.
+# A small per-listing state table (first / last observation) is updated on every append,
+# so change features are a join against it instead of a rescan of history.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+TIMESERIES_DIR = PROJECT_ROOT / "data" / "timeseries"
+
+OBSERVATION_COLUMNS = ['price', 'status', 'daysOnMarket', 'rent_estimate', 'deal_score']
+STATE_COLUMNS = ['id', 'first_seen', 'first_price', 'last_seen', 'last_price', 'last_score', 'prev_score',
+                 'observations']
+STATE_NAME = "state"
+DATE_COLUMNS = ['observed_at', 'first_seen', 'last_seen']
+# Feature columns added by change_features
+CHANGE_COLUMNS = ['price_change_pct', 'price_change_total_pct', 'score_change']
+
+def _parse_dates(df):
+    """CSV storage reads timestamps back as text."""
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+def _as_date(value):
+    return None if value is None else pd.Timestamp(value).date()
+
+class ListingTimeSeries:
+    """The observation store of one market partition."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def partitions(self, start=None, end=None):
+        """Date partition folders between start and end (inclusive dates), oldest first."""
+        start, end = _as_date(start), _as_date(end)
+        folders = []
+        for folder in sorted(self.root.glob("date=*")):
+            day = date.fromisoformat(folder.name.split("=", 1)[1])
+            if (start is None or day >= start) and (end is None or day <= end):
+                folders.append(folder)
+        return folders
+
+    def state(self):
+        """One row per listing ever observed: first/last price and seen time, last two scores."""
+        path = get_latest_dataset(self.root, prefix=STATE_NAME)
+        if path is None:
+            return pd.DataFrame(columns=STATE_COLUMNS)
+        return _parse_dates(load_dataset(path))
+
+    def append(self, df, observed_at=None):
+        """
+        Appends one observation per listing of df (rankings: id + OBSERVATION_COLUMNS) as a new
+        part file in the observation date's partition, and folds it into the state table.
+        Returns the path of the new part.
+        """
+        observed_at = pd.Timestamp(observed_at if observed_at is not None else datetime.now())
+        obs = pd.DataFrame({'id': df['id'].astype(str).to_numpy()})
+        obs['observed_at'] = observed_at
+        for col in OBSERVATION_COLUMNS:
+            obs[col] = df[col].to_numpy() if col in df.columns else np.nan
+        # Sorted by id, so id lookups can skip whole row groups
+        obs = obs.drop_duplicates('id', keep='last').sort_values('id', kind='stable').reset_index(drop=True)
+
+        part_path = save_dataset(obs, self.root / f"date={observed_at.date().isoformat()}",
+                                 f"observations_{observed_at:%H-%M-%S_%f}")
+        self._update_state(obs)
+        return part_path
+
+    def _update_state(self, obs):
+        state = self.state().set_index('id')
+        new = obs.set_index('id')
+        state = state.reindex(state.index.union(new.index))
+        for col in ['first_price', 'last_price', 'last_score', 'prev_score', 'observations']:
+            state[col] = pd.to_numeric(state[col], errors='coerce').astype(float)
+        for col in ['first_seen', 'last_seen']:
+            state[col] = pd.to_datetime(state[col])
+
+        ids = new.index
+        first_time = ids[state.loc[ids, 'first_seen'].isna().to_numpy()]
+        state.loc[first_time, 'first_seen'] = new.loc[first_time, 'observed_at']
+        state.loc[first_time, 'first_price'] = pd.to_numeric(new.loc[first_time, 'price'], errors='coerce')
+        state.loc[ids, 'prev_score'] = state.loc[ids, 'last_score']
+        state.loc[ids, 'last_seen'] = new['observed_at']
+        state.loc[ids, 'last_price'] = pd.to_numeric(new['price'], errors='coerce')
+        state.loc[ids, 'last_score'] = pd.to_numeric(new['deal_score'], errors='coerce')
+        state.loc[ids, 'observations'] = state.loc[ids, 'observations'].fillna(0) + 1
+        state['observations'] = state['observations'].astype('int64')
+
+        save_dataset(state.rename_axis('id').reset_index()[STATE_COLUMNS], self.root, STATE_NAME)
+
+    def read(self, start=None, end=None, ids=None, columns=None):
+        """
+        Observations between start and end (dates or timestamps, inclusive), optionally only
+        for some listing ids. Only the matching date partitions are opened; with ids, the
+        state table narrows them further to the days those listings were seen.
+        Returns one row per (id, observation), sorted by id then time.
+        """
+        if ids is not None:
+            ids = [str(i) for i in ids]
+            seen = self.state().set_index('id').reindex(ids)
+            if seen['first_seen'].isna().all():
+                return pd.DataFrame(columns=['id', 'observed_at'] + (columns or OBSERVATION_COLUMNS))
+            first, last = seen['first_seen'].min(), seen['last_seen'].max()
+            start = first if start is None else max(pd.Timestamp(start), first)
+            end = last if end is None else min(pd.Timestamp(end), last)
+
+        wanted = None
+        if columns is not None:
+            wanted = ['id', 'observed_at'] + [c for c in columns if c not in ('id', 'observed_at')]
+        frames = []
+        for folder in self.partitions(start, end):
+            for path in list_datasets(folder, prefix="observations_"):
+                if path.suffix == ".parquet":
+                    filters = [('id', 'in', ids)] if ids is not None else None
+                    frames.append(pd.read_parquet(path, columns=wanted, filters=filters))
+                else:
+                    part = load_dataset(path)
+                    part = part[part['id'].astype(str).isin(ids)] if ids is not None else part
+                    frames.append(part[wanted] if wanted is not None else part)
+
+        if not frames:
+            return pd.DataFrame(columns=wanted or ['id', 'observed_at'] + OBSERVATION_COLUMNS)
+        df = _parse_dates(pd.concat(frames, ignore_index=True))
+        df['id'] = df['id'].astype(str)
+        if start is not None:
+            df = df[df['observed_at'] >= pd.Timestamp(start)]
+        if end is not None:
+            end = pd.Timestamp(end)
+            if end == end.normalize():
+                end += pd.Timedelta(days=1) - pd.Timedelta(1)  # A bare date covers that whole day
+            df = df[df['observed_at'] <= end]
+        return apply_schema(df.sort_values(['id', 'observed_at'], kind='stable').reset_index(drop=True))
+
+    def changes(self, start, end=None, column='price'):
+        """
+        First vs. last observed value of column per listing between start and end, e.g.
+        changes(week_ago)[lambda d: d['change_pct'] <= -0.05] -> listings that dropped 5%+.
+        """
+        df = self.read(start, end, columns=[column])
+        values = pd.to_numeric(df[column], errors='coerce')
+        grouped = values.groupby(df['id'].to_numpy(), sort=True)
+        out = pd.DataFrame({'first': grouped.first(), 'last': grouped.last()}).rename_axis('id').reset_index()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['change_pct'] = out['last'] / out['first'] - 1
+        return out
+
+    def change_features(self, df, state=None):
+        """
+        Change features for the listings in df from the state table alone:
+        price_change_pct (vs. the last observation), price_change_total_pct (vs. the first)
+        and score_change (between the last two observed deal scores). NaN for new listings.
+        """
+        state = (self.state() if state is None else state).set_index('id').reindex(df['id'].astype(str))
+        price = pd.to_numeric(df['price'], errors='coerce').to_numpy(dtype=float)
+
+        def column(name):
+            return pd.to_numeric(state[name], errors='coerce').to_numpy(dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features = pd.DataFrame({
+                'price_change_pct': price / column('last_price') - 1,
+                'price_change_total_pct': price / column('first_price') - 1,
+                'score_change': column('last_score') - column('prev_score'),
+            }, index=df.index)
+        return features.replace([np.inf, -np.inf], np.nan)
+
+def load_listing_timeseries(market=None, timeseries_dir=None):
+    """The market's observation store (empty until the first run appends to it)."""
+    return ListingTimeSeries(partition_dir(timeseries_dir or TIMESERIES_DIR, market))
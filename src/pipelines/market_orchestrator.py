@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.markets import load_target_markets, market_slug, partition_dir
+from pipelines.extraction_pipeline import run_extraction
+from pipelines.preprocessing_pipeline import run_preprocessing
+from pipelines.enrichment_pipeline import run_enrichment
+from pipelines.feature_eng_pipeline import run_feature_engineering
+from pipelines.scoring_pipeline import run_scoring, top_n_deals, PREDICTIONS_DIR
+from pipelines.market_stats import update_market_stats
+from pipelines.storage import save_dataset
+from pipelines.stage_cache import StageCache
+from pipelines.metrics import METRICS, REPORT_DIR
+
+# Multi-market runs: every market is one independent shard (extraction -> scoring)
+# running in its own process, writing to its own market=<slug> partitions.
+# The per-market rankings are merged into one cross-market ranking at the end.
+
+def run_market_chain(market, checkpoint=True, force=False):
+    """
+    Runs one market from extraction to scoring and returns its rankings.
+    Top-level function so it can be sent to a worker process.
+    Unchanged stages are reused through the market's own stage cache (force=True recomputes).
+    """
+    slug = market_slug(market)
+    print(f"🏙️  [{slug}] Starting market chain (pid {os.getpid()})")
+    stage_cache = StageCache(market=market, force=force)
+    METRICS.reset()  # Worker processes are reused: one report per market
+
+    try:
+        extraction = {}
+        raw = run_extraction(keep_listings=False, market=market, report=extraction)
+        listings = run_preprocessing(data=raw, save=checkpoint, market=market, stage_cache=stage_cache)
+        df = run_enrichment(listings, save=checkpoint, market=market)
+        if df.empty:
+            raise RuntimeError(f"No listings were enriched in {slug}, nothing to score.")
+        df = run_feature_engineering(df, save=checkpoint, market=market, stage_cache=stage_cache,
+                                     listings=listings)
+        df = run_scoring(df, save=True, market=market, stage_cache=stage_cache)
+        update_market_stats(listings, df, market=market, incomplete_zips=extraction['incomplete_zips'])
+    finally:
+        print(f"📈 [{slug}] Run report: {METRICS.write_report(partition_dir(REPORT_DIR, market))}")
+
+    print(f"\n🏙️  [{slug}]", end="")
+    stage_cache.report()
+    return df.assign(market=slug)
+
+def run_all_markets(markets=None, max_workers=None, checkpoint=True, force=False):
+    """
+    Runs every market in parallel (one process per market, at most one per CPU)
+    and saves the merged, cross-market ranking to 04-predictions.
+    A market that fails is reported and skipped; the others still finish.
+    Returns the merged rankings (best deals first).
+    """
+    markets = markets if markets is not None else load_target_markets()
+    max_workers = max_workers or max(1, min(len(markets), os.cpu_count() or 1))
+    print(f"🚀 Running {len(markets)} markets on {max_workers} processes...")
+
+    start = time.perf_counter()
+    rankings, failed = [], []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_market_chain, market, checkpoint, force): market_slug(market) for market in markets}
+        for future in as_completed(futures):
+            slug = futures[future]
+            try:
+                rankings.append(future.result())
+                print(f"   ✅ {slug} done")
+            except Exception as e:
+                failed.append(slug)
+                print(f"   ❌ {slug} failed: {e}")
+
+    if not rankings:
+        raise RuntimeError("Every market failed, nothing to rank.")
+
+    merged = pd.concat(rankings, ignore_index=True, sort=False)
+    merged = merged.sort_values(by='deal_score', ascending=False, kind='stable').reset_index(drop=True)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    save_path = save_dataset(merged, PREDICTIONS_DIR, f"cross_market_rankings_{timestamp}", export_csv=True)
+
+    print(f"\n⏱️  {len(rankings)}/{len(markets)} markets ranked in {time.perf_counter() - start:.2f}s")
+    if failed:
+        print(f"⚠️  Failed markets: {', '.join(sorted(failed))}")
+    print(f"✅ Cross-market ranking saved to:")
+    print(f"   {save_path}")
+
+    print("\n🏆 TOP 5 DEALS ACROSS ALL MARKETS:")
+    cols = ['deal_score', 'market', 'addressLine1', 'price', 'rent_to_cost_ratio', 'maintenance_risk_score']
+    print(top_n_deals(merged, 5)[cols])
+
+    return merged
+
+if __name__ == "__main__":
+    run_all_markets()
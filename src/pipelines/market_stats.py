@@ -0,0 +1,306 @@
+import json
+import math
+import sqlite3
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from contextlib import closing
+
+from pipelines.markets import partition_dir
+
+# Per-zip statistics of the live market.
+# Every distribution is a mergeable log-bucket quantile sketch (relative error
+# <= RELATIVE_ACCURACY) stored in SQLite, next to the bucket each listing id
+# currently contributes. A new observation moves an id from its old bucket to the
+# new one and a delisted id is retracted, so an update writes only what changed
+# and history is never rescanned.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+STATS_DIR = PROJECT_ROOT / "data" / "market_stats"
+STATS_FILE = "market_stats.sqlite"
+
+RELATIVE_ACCURACY = 0.01
+RENT_TO_COST_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+# Metric families: one row per listing id and family holds the id's current bucket of each sketch
+FAMILIES = {'listings': ('price_per_sqft', 'days_on_market'), 'rents': ('rent_to_cost',)}
+SKETCHES = FAMILIES['listings'] + FAMILIES['rents']
+ZERO_BUCKET = -(2 ** 31)  # Stored bucket key of exact zeros
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bins (
+    zip TEXT NOT NULL, sketch TEXT NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (zip, sketch, bucket));
+CREATE TABLE IF NOT EXISTS listings (id TEXT PRIMARY KEY, zip TEXT NOT NULL, price_per_sqft INTEGER, days_on_market INTEGER);
+CREATE TABLE IF NOT EXISTS rents (id TEXT PRIMARY KEY, zip TEXT NOT NULL, rent_to_cost INTEGER);
+"""
+
+class QuantileSketch:
+    """
+    Log-bucket quantile sketch: value v > 0 goes to bucket ceil(log_gamma(v)).
+    Two sketches merge by adding bucket counts; quantiles are within RELATIVE_ACCURACY.
+    Zeros are counted separately; negative and missing values are ignored.
+    """
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    log_gamma = math.log(gamma)
+
+    def __init__(self, bins=None, zero=0):
+        self.bins = {int(k): int(v) for k, v in (bins or {}).items()}
+        self.zero = int(zero)
+
+    @property
+    def count(self):
+        return self.zero + sum(self.bins.values())
+
+    @classmethod
+    def buckets(cls, values):
+        """Bucket key per value (as floats): ZERO_BUCKET for zeros, NaN for negative or missing values."""
+        values = np.asarray(values, dtype=float)
+        keys = np.full(len(values), np.nan)
+        keys[values == 0] = ZERO_BUCKET
+        positive = values > 0
+        keys[positive] = np.ceil(np.log(values[positive]) / cls.log_gamma)
+        return keys
+
+    def add_buckets(self, keys, counts):
+        """Adds counts to bucket keys from buckets(); negative counts retract."""
+        for key, count in zip(keys, counts):
+            key, count = int(key), int(count)
+            if key == ZERO_BUCKET:
+                self.zero += count
+                continue
+            total = self.bins.get(key, 0) + count
+            if total > 0:
+                self.bins[key] = total
+            else:
+                self.bins.pop(key, None)
+        return self
+
+    def add(self, values):
+        keys = self.buckets(values)
+        keys, counts = np.unique(keys[~np.isnan(keys)], return_counts=True)
+        return self.add_buckets(keys.tolist(), counts.tolist())
+
+    def merge(self, other):
+        self.zero += other.zero
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        return self
+
+    def quantile(self, q):
+        total = self.count
+        if total == 0:
+            return np.nan
+        rank = q * (total - 1)
+        if rank < self.zero:
+            return 0.0
+        seen = self.zero
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key] in relative terms
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {'zero': self.zero, 'bins': {str(k): v for k, v in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('bins'), data.get('zero', 0))
+
+def _ids(df):
+    return (df['id'] if 'id' in df.columns else df['formattedAddress']).astype(str).to_numpy()
+
+def _bucket_counts(df, zip_column, sketches, suffix, sign):
+    """One (zip, sketch, bucket, count) row per known bucket of every sketch column of df."""
+    frames = []
+    for name in sketches:
+        keys = df[name + suffix].to_numpy(dtype=float)
+        known = ~np.isnan(keys)
+        frames.append(pd.DataFrame({'zip': df[zip_column].to_numpy()[known], 'sketch': name,
+                                    'bucket': keys[known].astype(np.int64), 'count': sign}))
+    return frames
+
+class MarketStats:
+    """
+    The per-zip statistics of one market, persisted in SQLite.
+    Each listing id counts once per metric family, with its last observed value:
+    a changed price moves the id to its new bucket, and ids that left
+    the market are retracted, so the table always describes the live listings.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.zips = {}
+        self._rows = None
+        if self.path.exists():
+            with closing(self._connect()) as conn:
+                self._load(conn)
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Market processes and overlapping runs share the file: wait for another writer instead of failing
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _load(self, conn):
+        self.zips = {}
+        for zip_code, name, bucket, count in conn.execute("SELECT zip, sketch, bucket, count FROM bins"):
+            self._zip(zip_code)[name].add_buckets([bucket], [count])
+        self._rows = None
+
+    def _zip(self, zip_code):
+        if zip_code not in self.zips:
+            self.zips[zip_code] = {name: QuantileSketch() for name in SKETCHES}
+        return self.zips[zip_code]
+
+    def _update(self, family, df, columns, complete=False, live_ids=(), incomplete_zips=()):
+        """
+        Makes the rows of df the last observation of their ids (columns maps sketch name -> values).
+        complete: df (plus live_ids, ids still on the market without a new value) is everything
+        that is live, so every other stored id is retracted, except in incomplete_zips
+        (zips whose fetch failed part-way: their missing ids are kept as they were).
+        Returns {'observed': ids that were new or changed, 'retracted': ids taken out}.
+        """
+        sketches = FAMILIES[family]
+        new = pd.DataFrame({'id': _ids(df), 'zip': df['zipCode'].astype(str).to_numpy()})
+        for name in sketches:
+            new[name] = QuantileSketch.buckets(columns[name])
+        new = new.drop_duplicates('id', keep='last')
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")  # Read-modify-write as one transaction
+            try:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (id TEXT PRIMARY KEY)")
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS live (id TEXT PRIMARY KEY)")
+                conn.execute("DELETE FROM incoming")
+                conn.execute("DELETE FROM live")
+                conn.executemany("INSERT INTO incoming VALUES (?)", ((i,) for i in new['id']))
+                old = pd.read_sql_query(f"SELECT * FROM {family} WHERE id IN (SELECT id FROM incoming)", conn)
+                gone = old.iloc[0:0]
+                if complete:
+                    conn.executemany("INSERT OR IGNORE INTO live VALUES (?)", ((str(i),) for i in live_ids))
+                    kept_zips = sorted({str(z) for z in incomplete_zips})
+                    gone = pd.read_sql_query(
+                        f"SELECT * FROM {family} WHERE id NOT IN (SELECT id FROM incoming)"
+                        " AND id NOT IN (SELECT id FROM live)"
+                        f" AND zip NOT IN ({', '.join('?' for _ in kept_zips)})", conn, params=kept_zips)
+
+                merged = new.merge(old, on='id', how='left', suffixes=('', '_old'), indicator=True)
+                known = (merged['_merge'] == 'both').to_numpy()
+                changed = ~known | (merged['zip'] != merged['zip_old']).to_numpy()
+                for name in sketches:
+                    value = merged[name].to_numpy(dtype=float)
+                    before = merged[f"{name}_old"].to_numpy(dtype=float)
+                    changed |= ~((value == before) | (np.isnan(value) & np.isnan(before)))
+                moved = merged[changed]
+
+                # Old buckets out (changed + delisted ids), new buckets in
+                frames = (_bucket_counts(moved[known[changed]], 'zip_old', sketches, '_old', -1)
+                          + _bucket_counts(gone, 'zip', sketches, '', -1)
+                          + _bucket_counts(moved, 'zip', sketches, '', 1))
+                delta = pd.concat(frames, ignore_index=True).groupby(['zip', 'sketch', 'bucket'])['count'].sum()
+                delta = delta[delta != 0]
+                conn.executemany(
+                    "INSERT INTO bins (zip, sketch, bucket, count) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (zip, sketch, bucket) DO UPDATE SET count = count + excluded.count",
+                    ((z, name, int(b), int(c)) for (z, name, b), c in delta.items())
+                )
+                conn.execute("DELETE FROM bins WHERE count <= 0")
+
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {family} (id, zip, {', '.join(sketches)})"
+                    f" VALUES (?, ?, {', '.join('?' for _ in sketches)})",
+                    ((row[0], row[1], *(None if np.isnan(v) else int(v) for v in row[2:]))
+                     for row in moved[['id', 'zip', *sketches]].itertuples(index=False))
+                )
+                conn.executemany(f"DELETE FROM {family} WHERE id = ?", ((i,) for i in gone['id']))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._load(conn)
+        return {'observed': int(changed.sum()), 'retracted': len(gone)}
+
+    def update_listings(self, df, complete=True, incomplete_zips=()):
+        """
+        Makes a snapshot of clean listings the current observation of its ids
+        (price per sqft, days on market and counts).
+        complete: df is the whole market, so listings missing from it are retracted as delisted
+        (except in incomplete_zips, whose fetch failed part-way).
+        """
+        price = pd.to_numeric(df['price'], errors='coerce').to_numpy(dtype=float)
+        sqft = pd.to_numeric(df['squareFootage'], errors='coerce').to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_per_sqft = np.where(sqft > 0, price / sqft, np.nan)
+        days = (pd.to_numeric(df['daysOnMarket'], errors='coerce').to_numpy(dtype=float)
+                if 'daysOnMarket' in df.columns else np.full(len(df), np.nan))
+        return self._update('listings', df, {'price_per_sqft': price_per_sqft, 'days_on_market': days},
+                            complete=complete, incomplete_zips=incomplete_zips)
+
+    def update_rents(self, df, live_ids=None, incomplete_zips=()):
+        """
+        Listings with a real rent estimate -> rent-to-cost sketch (an id's newest ratio replaces its old one).
+        live_ids: the ids still on the market; rents of every other id are retracted
+        (except in incomplete_zips).
+        """
+        ratio = pd.to_numeric(df['rent_to_cost_ratio'], errors='coerce').to_numpy(dtype=float)
+        return self._update('rents', df, {'rent_to_cost': np.where(ratio > 0, ratio, np.nan)},
+                            complete=live_ids is not None, live_ids=live_ids if live_ids is not None else (),
+                            incomplete_zips=incomplete_zips)
+
+    def rows(self):
+        """The materialized table as {zipCode: stats}; rebuilt only after an update."""
+        if self._rows is None:
+            self._rows = {}
+            for zip_code, entry in self.zips.items():
+                row = {
+                    'listing_count': entry['price_per_sqft'].count,
+                    'median_price_per_sqft': entry['price_per_sqft'].quantile(0.5),
+                    'median_days_on_market': entry['days_on_market'].quantile(0.5),
+                    'rent_count': entry['rent_to_cost'].count,
+                }
+                for q in RENT_TO_COST_QUANTILES:
+                    row[f"rent_to_cost_p{round(q * 100)}"] = entry['rent_to_cost'].quantile(q)
+                self._rows[zip_code] = row
+        return self._rows
+
+    def lookup(self, zip_code):
+        """Stats for one zip (None if the zip has never been seen)."""
+        return self.rows().get(str(zip_code))
+
+    def table(self):
+        """The per-zip statistics table as a DataFrame."""
+        return pd.DataFrame.from_dict(self.rows(), orient='index').rename_axis('zipCode').reset_index()
+
+    def version(self, sketches=SKETCHES):
+        """Content hash of the given sketches (changes whenever their part of the table does)."""
+        state = {zip_code: {name: entry[name].to_dict() for name in sketches} for zip_code, entry in self.zips.items()}
+        return hashlib.sha1(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+def load_market_stats(market=None, stats_dir=None):
+    """The market's stats table (empty if nothing has been folded in yet)."""
+    return MarketStats(partition_dir(stats_dir or STATS_DIR, market) / STATS_FILE)
+
+def update_market_stats(listings, rankings, market=None, stats_dir=None, incomplete_zips=()):
+    """
+    The run's single market-stats update, after scoring.
+    listings: the market's clean listings (all of them: missing ids count as delisted).
+    rankings: the scored listings; their API rents feed the rent-to-cost quantiles.
+    incomplete_zips: zips whose extraction failed part-way; nothing is retracted in them.
+    """
+    stats = load_market_stats(market, stats_dir)
+    listed = stats.update_listings(listings, incomplete_zips=incomplete_zips)
+    rents = rankings[rankings['rent_source'] == 'api'] if 'rent_source' in rankings.columns else rankings
+    rented = stats.update_rents(rents, live_ids=_ids(listings), incomplete_zips=incomplete_zips)
+    print(f"📐 Market stats: {listed['observed']} new/changed listings, {listed['retracted']} delisted, "
+          f"{rented['observed']} new/changed rents across {len(stats.rows())} zips")
+    return stats
+
+def zip_values(zip_codes, stats, column):
+    """One stats column broadcast onto a column of zip codes (NaN for unknown zips)."""
+    codes, uniques = pd.factorize(pd.Series(zip_codes).astype(str))
+    values = np.array([(stats.lookup(z) or {}).get(column, np.nan) for z in uniques], dtype=float)
+    return values[codes] if len(uniques) else np.full(len(codes), np.nan)
@@ -0,0 +1,46 @@
+import re
+import yaml
+from pathlib import Path
+
+# Target markets from the investor profile + per-market output partitions
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+PROFILE_PATH = PROJECT_ROOT / "config" / "investor_profile.yaml"
+
+def load_profile():
+    with open(PROFILE_PATH, "r") as f:
+        return yaml.safe_load(f)
+
+def load_target_markets(profile=None):
+    """
+    Returns the list of markets to screen: [{'city', 'state', 'zip_codes'}, ...].
+    Accepts the 'target_markets' list or the older single 'target_market' block.
+    """
+    profile = profile if profile is not None else load_profile()
+    markets = profile.get("target_markets")
+    if markets is None:
+        markets = [profile["target_market"]]
+    return markets
+
+def default_market():
+    """The first market in the profile (what single-market runs work on)."""
+    return load_target_markets()[0]
+
+def market_slug(market):
+    """{'city': 'Kokomo', 'state': 'IN'} -> 'kokomo-in'"""
+    name = f"{market['city']}-{market.get('state', '')}".strip("-").lower()
+    return re.sub(r"[^a-z0-9]+", "-", name).strip("-")
+
+def market_label(market=None):
+    """Banner text, e.g. 'KOKOMO'."""
+    market = market if market is not None else default_market()
+    return str(market["city"]).upper()
+
+def partition_dir(directory, market=None):
+    """
+    Per-market output partition: data/<stage>/market=<slug>/.
+    market=None keeps the classic single-market layout (files directly in the stage folder).
+    """
+    if market is None:
+        return Path(directory)
+    return Path(directory) / f"market={market_slug(market)}"
@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import functools
+from pathlib import Path
+from datetime import datetime
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+# Run telemetry: per-stage metrics (wall time, rows, columns, peak RSS, bytes read/written)
+# and per-endpoint API metrics (latency histogram, status codes, retries).
+# Everything ends up in one JSON-lines run report next to the outputs.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+REPORT_DIR = PROJECT_ROOT / "data" / "04-predictions" / "run_reports"
+
+# Latency histogram bucket upper bounds (ms); the last bucket is open-ended
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Profile stages with cProfile: YIELD_PROFILE=all or YIELD_PROFILE=features,scoring
+PROFILE_STAGES = {s.strip() for s in os.getenv("YIELD_PROFILE", "").split(",") if s.strip()}
+
+def _read_proc(name):
+    try:
+        with open(f"/proc/self/{name}", "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def io_counters():
+    """(bytes read, bytes written) by this process so far, or (None, None) off Linux."""
+    text = _read_proc("io")
+    if text is None:
+        return None, None
+    fields = dict(line.split(": ") for line in text.splitlines() if ": " in line)
+    return int(fields["rchar"]), int(fields["wchar"])
+
+def process_peak_rss_mb():
+    """
+    Peak resident memory (MB) since process start. This is the process high-water
+    mark: it is never reset, so it only grows from one stage to the next.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def _round(value, digits=1):
+    return None if value is None else round(value, digits)
+
+def _size(value):
+    """Row count of a DataFrame / list, else None."""
+    if hasattr(value, "shape") or isinstance(value, (list, tuple)):
+        return len(value)
+    return None
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (ms) that also keeps count / sum / max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        i = 0
+        while i < len(self.buckets) and ms > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None for the open bucket)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else None
+        return None
+
+    def to_dict(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "p50_ms_le": self.quantile(0.5),
+            "p95_ms_le": self.quantile(0.95),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+class RunMetrics:
+    """Thread-safe collector for one pipeline run (one per process)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.run_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            self.started = time.perf_counter()
+            self.stages = []
+            self.api = {}
+
+    def record_stage(self, record):
+        with self.lock:
+            self.stages.append(record)
+
+    def record_request(self, endpoint, status, seconds, retries=0):
+        """One API call as the caller saw it (status=None for connection errors)."""
+        with self.lock:
+            entry = self.api.setdefault(endpoint, {
+                "latency": LatencyHistogram(), "status_codes": {}, "retries": 0, "errors": 0
+            })
+            entry["latency"].add(seconds * 1000)
+            key = str(status) if status is not None else "error"
+            entry["status_codes"][key] = entry["status_codes"].get(key, 0) + 1
+            entry["retries"] += retries
+            if status is None or status >= 400:
+                entry["errors"] += 1
+
+    def report_lines(self):
+        with self.lock:
+            lines = [dict(type="stage", run_id=self.run_id, **record) for record in self.stages]
+            for endpoint, entry in sorted(self.api.items()):
+                lines.append({
+                    "type": "api",
+                    "run_id": self.run_id,
+                    "endpoint": endpoint,
+                    "status_codes": entry["status_codes"],
+                    "retries": entry["retries"],
+                    "errors": entry["errors"],
+                    "latency": entry["latency"].to_dict()
+                })
+            lines.append({
+                "type": "run",
+                "run_id": self.run_id,
+                "pid": os.getpid(),
+                "seconds": round(time.perf_counter() - self.started, 3),
+                "stages": len(self.stages),
+                "api_calls": sum(e["latency"].count for e in self.api.values()),
+                "peak_rss_mb": _round(process_peak_rss_mb())
+            })
+        return lines
+
+    def write_report(self, directory=REPORT_DIR):
+        """Writes the run report as JSON lines. Returns its path."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        save_path = directory / f"run_report_{self.run_id}.jsonl"
+        with open(save_path, "w") as f:
+            for line in self.report_lines():
+                f.write(json.dumps(line, default=str) + "\n")
+        return save_path
+
+# Process-wide collector used by the pipelines
+METRICS = RunMetrics()
+
+def track_stage(stage):
+    """
+    Decorator for run_* stage functions: records wall time, rows in/out, columns,
+    peak RSS and bytes read/written. peak_rss_mb is the process high-water mark after
+    the stage; peak_rss_growth_mb is how far the stage raised it (0 if the stage stayed
+    below an earlier peak). Per-stage peaks of Python allocations come from
+    benchmarks/run_benchmarks.py (tracemalloc). The input is the first argument (df / data);
+    the output is the return value. With YIELD_PROFILE set, the stage also runs
+    under cProfile and its stats are dumped next to the run report.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            data = args[0] if args else kwargs.get("df", kwargs.get("data"))
+            read_before, written_before = io_counters()
+            peak_before = process_peak_rss_mb()
+            profiler = cProfile.Profile() if stage in PROFILE_STAGES or "all" in PROFILE_STAGES else None
+
+            start = time.perf_counter()
+            if profiler is not None:
+                profiler.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            seconds = time.perf_counter() - start
+
+            read_after, written_after = io_counters()
+            peak_after = process_peak_rss_mb()
+            record = {
+                "stage": stage,
+                "seconds": round(seconds, 4),
+                "rows_in": _size(data),
+                "rows_out": _size(result),
+                "columns": len(result.columns) if hasattr(result, "columns") else None,
+                "peak_rss_mb": _round(peak_after),
+                "peak_rss_growth_mb": None if peak_before is None else _round(peak_after - peak_before),
+                "bytes_read": None if read_before is None else read_after - read_before,
+                "bytes_written": None if written_before is None else written_after - written_before
+            }
+            if profiler is not None:
+                REPORT_DIR.mkdir(parents=True, exist_ok=True)
+                profile_path = REPORT_DIR / f"profile_{stage}_{METRICS.run_id}_{os.getpid()}.prof"
+                profiler.dump_stats(profile_path)
+                record["profile"] = str(profile_path)
+            METRICS.record_stage(record)
+            return result
+        return wrapper
+    return decorator
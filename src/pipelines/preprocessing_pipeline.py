@@ -1,35 +1,94 @@
-import os
-import json
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.storage import save_dataset, get_latest_dataset
+from pipelines.raw_store import iter_raw_chunks, get_latest_raw_snapshot, RAW_CHUNK_SIZE
+from pipelines.markets import partition_dir
+from pipelines.stage_cache import raw_digest, make_fingerprint
+from pipelines.metrics import track_stage
+
 # Define Paths
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 RAW_DIR = PROJECT_ROOT / "data" / "01-raw"
 PROCESSED_DIR = PROJECT_ROOT / "data" / "02-preprocessed"
+HISTORY_DIR = PROCESSED_DIR / "history"
+
+# Long-format listing history: one row per (listing, event date)
+HISTORY_COLUMNS = ['id', 'date', 'event', 'price', 'daysOnMarket']
 
-def get_latest_raw_file():
-    """Finds the most recent JSON file in the 01-raw folder."""
-    files = list(RAW_DIR.glob("*.json"))
-    if not files:
+def get_latest_raw_file(market=None):
+    """Finds the most recent raw snapshot (NDJSON or legacy JSON) in the 01-raw folder."""
+    latest_file = get_latest_raw_snapshot(partition_dir(RAW_DIR, market))
+    if latest_file is None:
         raise FileNotFoundError("No raw data found! Run extraction_pipeline.py first.")
-    
-    # Sort files by modification time (newest last) and grab the last one
-    latest_file = max(files, key=os.path.getmtime)
     print(f"📂 Processing File: {latest_file.name}")
     return latest_file
 
+def get_latest_history_file(market=None):
+    """Finds the most recent listing-history dataset."""
+    latest_file = get_latest_dataset(partition_dir(HISTORY_DIR, market))
+    if latest_file is None:
+        raise FileNotFoundError("No listing history found! Run preprocessing_pipeline.py first.")
+    return latest_file
+
+def split_history(records):
+    """
+    Pulls the nested 'history' dict out of every raw listing.
+    pd.json_normalize would turn every event date into six 'history.YYYY-MM-DD.*'
+    columns; instead we return the listings without history plus a long table
+    (id, date, event, price, daysOnMarket) that joins back on 'id'.
+    """
+    listings = []
+    events = []
+    for record in records:
+        history = record.get('history') or {}
+        listing = {k: v for k, v in record.items() if k != 'history'}
+        listings.append(listing)
+        for date, event in history.items():
+            events.append({
+                'id': record.get('id'),
+                'date': date,
+                'event': event.get('event'),
+                'price': event.get('price'),
+                'daysOnMarket': event.get('daysOnMarket')
+            })
+    
+    history_df = pd.DataFrame(events, columns=HISTORY_COLUMNS)
+    history_df['date'] = pd.to_datetime(history_df['date'], errors='coerce')
+    history_df['price'] = pd.to_numeric(history_df['price'], errors='coerce')
+    history_df['daysOnMarket'] = pd.to_numeric(history_df['daysOnMarket'], errors='coerce')
+    return listings, history_df
+
+def normalize_listings(records):
+    """Raw listings -> (narrow listing frame, long history frame)."""
+    listings, history_df = split_history(records)
+    return pd.json_normalize(listings), history_df
+
+def join_history(df, history_df):
+    """Joins the long history back onto listings (one row per listing event)."""
+    return df.merge(history_df, on='id', how='left', suffixes=('', '_history'))
+
 def clean_data(df):
     """
     Performs standard cleaning:
+    0. Drop wide 'history.*' columns (history is kept in a long table instead)
     1. Filter for valid property types (No Land/Manufactured)
     2. Ensure numeric types for Price
     3. Prepare empty column for Rent Enrichment
     """
     initial_count = len(df)
     
+    # 0. Keep the schema narrow: history lives in its own long table (see split_history)
+    wide_history = [c for c in df.columns if c.startswith('history.')]
+    if wide_history:
+        df = df.drop(columns=wide_history)
+    
     # 1. Filter Property Types
     # We only want investment-grade structures:
     valid_types = ['Single Family', 'Multi-Family', 'Condo', 'Townhouse']
@@ -51,6 +110,11 @@ def clean_data(df):
         df['rent_estimate'] = np.nan
 
     # 4. Standardize Numeric Columns
+    # A small batch (e.g. a delta of only Land listings) may not carry every column
+    for col in ['squareFootage', 'yearBuilt', 'bedrooms', 'bathrooms']:
+        if col not in df.columns:
+            df[col] = np.nan
+    
     # 'coerce' turns invalid text (like "Contact Agent") into NaN so it doesn't crash math
     df['price'] = pd.to_numeric(df['price'], errors='coerce')
     df['squareFootage'] = pd.to_numeric(df['squareFootage'], errors='coerce')
@@ -61,33 +125,66 @@ def clean_data(df):
     print(f"🧹 Cleaned Data: {initial_count} rows -> {len(df)} rows")
     return df
 
-def run_preprocessing():
+def iter_clean_chunks(chunks):
+    """Normalizes + cleans each chunk of raw listings. Yields (clean_df, history_df)."""
+    for chunk in chunks:
+        df, history_df = normalize_listings(chunk)
+        df_clean = clean_data(df)
+        yield df_clean, history_df[history_df['id'].isin(df_clean['id'])]
+
+@track_stage("preprocessing")
+def run_preprocessing(data=None, save=True, chunk_size=RAW_CHUNK_SIZE, market=None, stage_cache=None):
+    """
+    data: raw listings (list of dicts) or a raw snapshot path from run_extraction.
+          If None, the latest raw snapshot is used.
+    save: write the clean dataset (+ history) to 02-preprocessed.
+    Snapshots are streamed in chunks of chunk_size listings, so the raw JSON is never
+    loaded whole. Memory is not constant: the clean chunks are concatenated into the
+    returned DataFrame (one compact row per listing), which the next stages need whole.
+    Returns the clean DataFrame.
+    market: read/write that market's partition (market=<slug>) instead of the stage folder.
+    stage_cache: a StageCache; the previous output is reused if the raw listings and code are unchanged.
+    """
     print("🚀 Starting Preprocessing Pipeline...")
     
-    # Ensure the output directory exists
-    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    # 1. Load Data (raw JSON streamed in bounded chunks)
+    if data is None:
+        data = get_latest_raw_file(market)
+    if isinstance(data, (str, Path)):
+        chunks = iter_raw_chunks(data, chunk_size)
+    else:
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
     
-    # 1. Load Data
-    raw_file = get_latest_raw_file()
-    with open(raw_file, 'r') as f:
-        data = json.load(f)
+    if stage_cache is not None:
+        fingerprint = make_fingerprint(raw_digest(data), code_paths=[__file__])
+        cached = stage_cache.load("preprocess", fingerprint)
+        if cached is not None:
+            return cached
     
-    # 2. Normalize JSON to DataFrame
-    df = pd.json_normalize(data)
+    # 2-3. Normalize JSON to DataFrame (history goes to its own long table) + Apply Cleaning
+    clean_parts, history_parts = [], []
+    for df_part, history_part in iter_clean_chunks(chunks):
+        clean_parts.append(df_part)
+        history_parts.append(history_part)
     
-    # 3. Apply Cleaning
-    df_clean = clean_data(df)
+    if not clean_parts:
+        raise ValueError("The raw snapshot contains no listings.")
+    df_clean = pd.concat(clean_parts, ignore_index=True, sort=False)
+    history_df = pd.concat(history_parts, ignore_index=True, sort=False)
     
-    # 4. Save to CSV
+    # 4. Save (typed storage: Parquet by default, see storage.py)
     # We use a consistent name format so the next script can find it easily
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"clean_listings_{timestamp}.csv"
-    save_path = PROCESSED_DIR / filename
+    if save:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        save_path = save_dataset(df_clean, partition_dir(PROCESSED_DIR, market), f"clean_listings_{timestamp}")
+        history_path = save_dataset(history_df, partition_dir(HISTORY_DIR, market), f"listing_history_{timestamp}")
+        
+        print(f"✅ Success! Saved clean data to:")
+        print(f"   {save_path}")
+        print(f"   {history_path} ({len(history_df)} history events)")
     
-    df_clean.to_csv(save_path, index=False)
-    
-    print(f"✅ Success! Saved clean data to:")
-    print(f"   {save_path}")
+    if stage_cache is not None:
+        stage_cache.record("preprocess", fingerprint, save_path if save else None, df_clean)
     
     # Preview
     cols_to_show = ['addressLine1', 'price', 'propertyType', 'rent_estimate']
@@ -96,6 +193,8 @@ def run_preprocessing():
     
     print("\n📊 Preview (Ready for Enrichment):")
     print(df_clean[final_cols].head())
+    
+    return df_clean
 
 if __name__ == "__main__":
     run_preprocessing()
\ No newline at end of file
@@ -0,0 +1,106 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+from pipelines.feature_eng_pipeline import compute_features, load_market_config
+from pipelines.scoring_pipeline import score_arrays, load_config
+
+# Pre-scoring: everything calculate_score() can know BEFORE a paid rent call.
+# Maintenance risk and price come from the listing; rent comes from a prior
+# (a linear model on beds/baths/sqft). The expected (or optimistic) deal_score
+# decides which listings are worth spending the enrichment budget on.
+
+PRIOR_FEATURES = ['bedrooms', 'bathrooms', 'squareFootage']
+MIN_FIT_ROWS = 20  # Enriched listings needed before the prior is refit from data
+STRATEGIES = ('expected', 'upper_bound', 'cheapest')
+
+def _attribute_matrix(df):
+    """[1, beds, baths, sqft] per listing (missing attributes count as 0)."""
+    columns = [
+        pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col in df.columns
+        else np.zeros(len(df))
+        for col in PRIOR_FEATURES
+    ]
+    X = np.column_stack([np.ones(len(df))] + columns)
+    return np.nan_to_num(X, nan=0.0)
+
+def rent_prior(df, params):
+    """Monthly rent prior per listing from its attributes."""
+    coef = np.array([params['base'], params['per_bedroom'], params['per_bathroom'], params['per_sqft']], dtype=float)
+    return np.maximum(_attribute_matrix(df) @ coef, 0.0)
+
+def fit_rent_prior(enriched_df, defaults):
+    """
+    Refits the prior on listings that already have a rent estimate (least squares).
+    Keeps the defaults if there are fewer than MIN_FIT_ROWS estimates.
+    The relative residual spread becomes the new 'uncertainty'.
+    """
+    if enriched_df is None or 'rent_estimate' not in enriched_df.columns:
+        return dict(defaults)
+    rent = pd.to_numeric(enriched_df['rent_estimate'], errors='coerce').to_numpy(dtype=float)
+    known = rent > 0
+    if known.sum() < MIN_FIT_ROWS:
+        return dict(defaults)
+
+    X = _attribute_matrix(enriched_df)[known]
+    coef, *_ = np.linalg.lstsq(X, rent[known], rcond=None)
+    residual = rent[known] - X @ coef
+    params = dict(defaults)
+    params.update(base=coef[0], per_bedroom=coef[1], per_bathroom=coef[2], per_sqft=coef[3])
+    params['uncertainty'] = float(np.std(residual) / np.mean(rent[known]))
+    return params
+
+def prescore(df, market_data=None, model_config=None, rent_params=None, z=None):
+    """
+    Deal score without a paid rent call. Returns a DataFrame aligned with df:
+    price_per_sqft, rent_prior, maintenance_risk_score,
+    expected_deal_score (rent = prior) and upper_deal_score (rent = prior + z * uncertainty).
+    """
+    market_data = market_data if market_data is not None else load_market_config()
+    model_config = model_config if model_config is not None else load_config()
+    rent_params = rent_params if rent_params is not None else model_config['rent_prior']
+    if z is None:
+        z = model_config.get('candidate_selection', {}).get('z', 1.0)
+
+    base = pd.DataFrame(index=df.index)
+    for col in ['price', 'squareFootage', 'yearBuilt']:
+        base[col] = pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+    base['zipCode'] = df['zipCode'].astype(str) if 'zipCode' in df.columns else ''
+    for col in ['city', 'state']:  # Market fallback for zips missing from market_data.yaml
+        if col in df.columns:
+            base[col] = df[col]
+
+    prior = rent_prior(df, rent_params)
+    optimistic = prior * (1 + z * rent_params.get('uncertainty', 0.0))
+    price = base['price'].to_numpy(dtype=float)
+
+    scores = {}
+    for name, rent in [('expected_deal_score', prior), ('upper_deal_score', optimistic)]:
+        features = compute_features(base.assign(rent_estimate=rent), market_data)
+        scores[name] = score_arrays(
+            features['rent_to_cost_ratio'], features['maintenance_risk_score'],
+            features['vacancy_adjusted_revenue'], price, model_config
+        )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_per_sqft = np.where(base['squareFootage'] > 0, price / base['squareFootage'], np.nan)
+
+    return pd.DataFrame({
+        'price_per_sqft': price_per_sqft,
+        'rent_prior': prior,
+        'maintenance_risk_score': features['maintenance_risk_score'].to_numpy(),
+        'expected_deal_score': scores['expected_deal_score'],
+        'upper_deal_score': scores['upper_deal_score']
+    }, index=df.index)
+
+def select_top_k(candidates, priority, k, tiebreak=None):
+    """
+    Heap-based top-K: the k candidate positions with the highest priority, best first
+    (O(n log k)). NaN priorities rank last; ties go to the lower tiebreak (e.g. price per sqft),
+    then to the earlier position.
+    """
+    if k <= 0:
+        return []
+    priority = np.nan_to_num(np.asarray(priority, dtype=float), nan=-np.inf)
+    tiebreak = np.zeros(len(priority)) if tiebreak is None else np.nan_to_num(np.asarray(tiebreak, dtype=float), nan=np.inf)
+    return heapq.nlargest(k, candidates, key=lambda i: (priority[i], -tiebreak[i], -i))
@@ -0,0 +1,275 @@
+import sys
+import copy
+import json
+import time
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.storage import load_dataset, get_latest_dataset
+from pipelines.markets import partition_dir, load_target_markets, market_slug
+from pipelines.feature_eng_pipeline import FEATURES_DIR
+from pipelines.scoring_pipeline import score_arrays, rent_confidence, load_config, market_yield_targets
+from pipelines.market_stats import load_market_stats
+
+# Re-ranking service: loads the latest 03-features dataset once, keeps the scoring
+# columns as numpy arrays, and answers "top N with these weights / zips / max price"
+# over HTTP in milliseconds. A watcher thread swaps in new features files as they land.
+#
+#   python src/pipelines/ranking_service.py --port 8787
+#   curl 'http://127.0.0.1:8787/top?n=5&zips=46901&max_price=90000&rent_to_cost=0.6&maintenance_risk=0.2'
+
+DEFAULT_PORT = 8787
+RELOAD_INTERVAL = 2.0  # Seconds between checks for a newer features file
+SCORE_COLUMNS = ['rent_to_cost_ratio', 'maintenance_risk_score', 'vacancy_adjusted_revenue', 'price']
+DISPLAY_COLUMNS = ['id', 'addressLine1', 'zipCode', 'price', 'rent_estimate', 'rent_to_cost_ratio',
+                   'maintenance_risk_score', 'rent_source', 'rent_confidence']
+WEIGHT_PARAMS = ('rent_to_cost', 'maintenance_risk', 'vacancy_adjusted')
+SCALING_PARAMS = ('target_yield', 'max_risk_score')
+
+class FeatureSnapshot:
+    """One features file in columnar form: float arrays for scoring, zip codes as categorical codes."""
+
+    def __init__(self, df, path=None, config=None, stats=None):
+        self.path = path
+        self.mtime = path.stat().st_mtime if path is not None else None
+        self.loaded_at = time.time()
+        self.rows = len(df)
+        self.columns = {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) for col in SCORE_COLUMNS}
+        confidence = rent_confidence(df)
+        self.confidence = confidence if confidence is not None else np.ones(self.rows)
+        zips = pd.Categorical(df['zipCode'].astype(str))
+        self.zip_codes = zips.codes
+        self.zip_index = {zip_code: i for i, zip_code in enumerate(zips.categories)}
+        self.display = {col: df[col].to_numpy() for col in DISPLAY_COLUMNS if col in df.columns}
+        # Live per-zip yield targets (scaling.yield_target: market), resolved once per file
+        self.market_targets = None
+        if config is not None and stats is not None:
+            self.market_targets = market_yield_targets(df['zipCode'], config, stats)
+
+    def mask(self, zips=None, max_price=None, min_price=None):
+        """Boolean row filter; unknown zips simply match nothing."""
+        keep = np.ones(self.rows, dtype=bool)
+        if zips:
+            codes = [self.zip_index[z] for z in zips if z in self.zip_index]
+            keep &= np.isin(self.zip_codes, codes)
+        price = self.columns['price']
+        if max_price is not None:
+            keep &= price <= max_price
+        if min_price is not None:
+            keep &= price >= min_price
+        return keep
+
+    def top(self, config, n=10, zips=None, max_price=None, min_price=None, use_market_targets=False):
+        """The n best listings under config (weights + scaling) after filtering, best first."""
+        rows = np.flatnonzero(self.mask(zips, max_price, min_price))
+        target = self.market_targets[rows] if use_market_targets and self.market_targets is not None else None
+        scores = score_arrays(*(self.columns[col][rows] for col in SCORE_COLUMNS), config, target,
+                              self.confidence[rows])
+
+        n = min(n, len(rows))
+        if n <= 0:
+            return []
+        keys = np.where(np.isnan(scores), -np.inf, scores)
+        best = np.argpartition(-keys, n - 1)[:n] if n < len(keys) else np.arange(len(keys))
+        best = best[np.argsort(-keys[best], kind='stable')]
+
+        results = []
+        for i in best:
+            row = {col: _json_value(values[rows[i]]) for col, values in self.display.items()}
+            row['deal_score'] = _json_value(scores[i])
+            results.append(row)
+        return results
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+class RankingService:
+    """Holds the current FeatureSnapshot and swaps it when a newer features file appears."""
+
+    def __init__(self, market=None, features_dir=FEATURES_DIR):
+        self.market = market
+        self.features_dir = partition_dir(features_dir, market)
+        self.base_config = load_config()
+        self.snapshot = None
+        self.lock = threading.Lock()
+        self.reloads = 0
+
+    def latest_file(self):
+        return get_latest_dataset(self.features_dir)
+
+    def reload(self, force=False):
+        """Loads the latest features file if it is new (or force). Returns True when swapped."""
+        path = self.latest_file()
+        if path is None:
+            raise FileNotFoundError("No feature data found! Run feature_eng_pipeline.py first.")
+        current = self.snapshot
+        if not force and current is not None and current.path == path and current.mtime == path.stat().st_mtime:
+            return False
+
+        with self.lock:
+            self.base_config = load_config()
+            stats = None
+            if self.base_config['scaling'].get('yield_target') == 'market':
+                stats = load_market_stats(self.market)
+            snapshot = FeatureSnapshot(load_dataset(path), path, self.base_config, stats)
+            self.snapshot = snapshot  # Atomic swap: queries in flight keep the old snapshot
+            self.reloads += 1
+        print(f"📂 Loaded {path.name} ({snapshot.rows:,} listings)")
+        return True
+
+    def watch(self, interval=RELOAD_INTERVAL, stop=None):
+        """Polls for newer features files until stop (a threading.Event) is set."""
+        stop = stop or threading.Event()
+        while not stop.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"⚠️ Reload failed: {e}")
+        return stop
+
+    def query(self, params):
+        """
+        params (all optional): n, zips (comma-separated), max_price, min_price,
+        rent_to_cost / maintenance_risk / vacancy_adjusted (weights),
+        target_yield / max_risk_score (scaling). Missing values come from model_params.yaml.
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            raise FileNotFoundError("No features loaded yet.")
+        config = copy.deepcopy(self.base_config)
+        for name in WEIGHT_PARAMS:
+            if name in params:
+                config['weights'][name] = float(params[name])
+        for name in SCALING_PARAMS:
+            if name in params:
+                config['scaling'][name] = float(params[name])
+
+        # A fixed target_yield in the query overrides the live per-zip targets
+        use_market_targets = config['scaling'].get('yield_target') == 'market' and 'target_yield' not in params
+        zips = [z.strip() for z in params['zips'].split(",") if z.strip()] if params.get('zips') else None
+        start = time.perf_counter()
+        results = snapshot.top(
+            config, n=int(params.get('n', 10)), zips=zips,
+            max_price=float(params['max_price']) if 'max_price' in params else None,
+            min_price=float(params['min_price']) if 'min_price' in params else None,
+            use_market_targets=use_market_targets
+        )
+        return {
+            'file': snapshot.path.name if snapshot.path is not None else None,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+            'results': results
+        }
+
+    def health(self):
+        snapshot = self.snapshot
+        return {
+            'file': snapshot.path.name if snapshot is not None and snapshot.path is not None else None,
+            'rows': snapshot.rows if snapshot is not None else 0,
+            'loaded_at': snapshot.loaded_at if snapshot is not None else None,
+            'reloads': self.reloads
+        }
+
+class RankingHandler(BaseHTTPRequestHandler):
+    server_version = "YieldRanking/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Analysts poll this a lot
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/top":
+                return self._send_json(200, service.query(params))
+            if url.path == "/health":
+                return self._send_json(200, service.health())
+            return self._send_json(404, {"message": f"Unknown endpoint {url.path}"})
+        except (ValueError, KeyError) as e:
+            return self._send_json(400, {"message": f"Bad query: {e}"})
+        except FileNotFoundError as e:
+            return self._send_json(503, {"message": str(e)})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/reload":
+            return self._send_json(404, {"message": f"Unknown endpoint {self.path}"})
+        try:
+            swapped = self.server.service.reload(force=True)
+        except FileNotFoundError as e:
+            return self._send_json(503, {"message": str(e)})
+        self._send_json(200, dict(self.server.service.health(), reloaded=swapped))
+
+class RankingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, RankingHandler)
+        self.service = service
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_service(service, host="127.0.0.1", port=0, reload_interval=RELOAD_INTERVAL):
+    """
+    Loads the features, then serves and watches for new files in background threads
+    (port=0 picks a free port). Returns (server, stop_event).
+    """
+    service.reload()
+    server = RankingServer((host, port), service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stop = threading.Event()
+    threading.Thread(target=service.watch, args=(reload_interval, stop), daemon=True).start()
+    return server, stop
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="In-memory re-ranking service over the latest features")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--market", default=None, help="Serve this market's partition (slug, e.g. 'kokomo-in')")
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    market = None
+    if args.market:
+        markets = {market_slug(m): m for m in load_target_markets()}
+        if args.market not in markets:
+            raise SystemExit(f"Unknown market '{args.market}'. Use one of: {', '.join(markets)}")
+        market = markets[args.market]
+    server, stop = start_service(RankingService(market), args.host, args.port, args.reload_interval)
+    print(f"🛰️  Ranking service listening on {server.base_url} (GET /top, GET /health, POST /reload)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
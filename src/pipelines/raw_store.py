@@ -0,0 +1,203 @@
+import os
+import io
+import gzip
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+from pipelines import artifact_index
+
+# Raw snapshot storage (data/01-raw): compressed newline-delimited JSON.
+# One listing per line, written as pages arrive and read back in bounded chunks,
+# so neither extraction nor preprocessing ever holds every raw listing (as JSON dicts)
+# at once. The clean DataFrame preprocessing returns still has one row per listing.
+
+try:
+    import orjson  # Optional fast JSON encoder/decoder
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import zstandard  # Optional, smaller + faster than gzip
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Override with YIELD_RAW_COMPRESSION=gzip|zstd
+RAW_COMPRESSION = os.getenv("YIELD_RAW_COMPRESSION", "gzip").lower()
+RAW_CHUNK_SIZE = 50000  # Listings per chunk handed to clean_data
+
+RAW_EXTENSIONS = [".ndjson.gz", ".ndjson.zst", ".ndjson", ".json"]
+
+def raw_extension(compression=None):
+    compression = (compression or RAW_COMPRESSION).lower()
+    if compression == "zstd":
+        if HAS_ZSTD:
+            return ".ndjson.zst"
+        print("⚠️  zstandard is not installed; compressing raw snapshots with gzip.")
+    return ".ndjson.gz"
+
+def dumps(record):
+    """One listing -> one NDJSON line (bytes, newline included)."""
+    if HAS_ORJSON:
+        return orjson.dumps(record) + b"\n"
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+def loads(line):
+    if HAS_ORJSON:
+        return orjson.loads(line)
+    return json.loads(line)
+
+def _open(path, mode):
+    """Opens a raw snapshot for binary reading ('rb') or writing ('wb')."""
+    name = str(path)
+    if name.endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=6)
+    if name.endswith(".zst"):
+        if mode == "wb":
+            return zstandard.ZstdCompressor(level=6).stream_writer(open(path, "wb"), closefd=True)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return open(path, mode)
+
+class ContentHash:
+    """
+    Order-independent hash of a multiset of NDJSON lines (sum of the line hashes mod 2**256).
+    Pages arrive in any order, so the same listings always give the same hash.
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def update(self, lines):
+        for line in lines:
+            self.total += int.from_bytes(hashlib.sha256(line).digest(), "big")
+        self.total %= 1 << 256
+
+    def hexdigest(self):
+        return f"ndjson:{self.total:064x}"
+
+class RawSnapshotWriter:
+    """
+    Thread-safe NDJSON writer. Pages from different zips can be written
+    concurrently; each page is appended as one block.
+    deduper: a ListingDeduper; repeated listings are dropped before they are written,
+    and copies replaced by a newer observation are removed from the file on close.
+    """
+
+    def __init__(self, path, deduper=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = _open(self.path, "wb")
+        self.count = 0
+        self.content = ContentHash()
+        self.deduper = deduper
+        self.lock = threading.Lock()
+
+    def write_many(self, records):
+        """Writes a page. Returns the records actually written (all of them without a deduper)."""
+        if self.deduper is None:
+            lines = [dumps(record) for record in records]
+        with self.lock:
+            if self.deduper is not None:
+                # Ordinals must match line numbers, so admission happens under the lock
+                records = self.deduper.admit(records, start=self.count)
+                lines = [dumps(record) for record in records]
+            self.file.write(b"".join(lines))
+            self.content.update(lines)
+            self.count += len(records)
+        return records
+
+    def _drop_lines(self, ordinals):
+        """Rewrites the snapshot without the given line numbers (one sequential pass)."""
+        tmp_path = self.path.with_name(f".tmp_{self.path.name}")
+        content, count = ContentHash(), 0
+        with _open(tmp_path, "wb") as out:
+            for ordinal, line in enumerate(iter_raw_lines(self.path)):
+                if ordinal in ordinals:
+                    continue
+                out.write(line)
+                content.update([line])
+                count += 1
+        os.replace(tmp_path, self.path)
+        self.content, self.count = content, count
+
+    def close(self):
+        self.file.close()
+        if self.deduper is not None and self.deduper.superseded:
+            self._drop_lines(self.deduper.superseded)
+        if artifact_index.is_indexed(self.path.parent):
+            artifact_index.get_index().record(self.path, self.content.hexdigest(), rows=self.count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_raw_lines(path):
+    """
+    Yields the encoded NDJSON line of every listing (bytes, newline included).
+    Legacy '.json' snapshots are re-encoded one listing at a time.
+    """
+    path = Path(path)
+    if path.name.endswith(".json"):
+        with open(path, "r") as f:
+            for record in json.load(f):
+                yield dumps(record)
+        return
+
+    with _open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield line if line.endswith(b"\n") else line + b"\n"
+
+def iter_raw_records(path):
+    """
+    Yields listings one by one from a raw snapshot.
+    Legacy '.json' snapshots (one big array) are still readable, but are loaded whole.
+    """
+    path = Path(path)
+    if path.name.endswith(".json"):
+        with open(path, "r") as f:
+            yield from json.load(f)
+        return
+
+    for line in iter_raw_lines(path):
+        yield loads(line)
+
+def iter_raw_chunks(path, chunk_size=RAW_CHUNK_SIZE):
+    """Yields lists of at most chunk_size listings."""
+    chunk = []
+    for record in iter_raw_records(path):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def list_raw_snapshots(directory):
+    directory = Path(directory)
+    files = []
+    for ext in RAW_EXTENSIONS:
+        files.extend(directory.glob(f"*{ext}"))
+    return files
+
+def raw_content_hash(path):
+    """ContentHash of an existing raw snapshot (the same value its writer recorded)."""
+    content = ContentHash()
+    content.update(iter_raw_lines(path))
+    return content.hexdigest()
+
+def get_latest_raw_snapshot(directory):
+    """Most recent raw snapshot in any supported format (None if there is none)."""
+    if artifact_index.is_indexed(directory):
+        indexed = artifact_index.get_index().latest(directory, prefix="raw_listings_")
+        if indexed is not None:
+            return indexed
+    files = list_raw_snapshots(directory)
+    if not files:
+        return None
+    return max(files, key=os.path.getmtime)
@@ -0,0 +1,160 @@
+import re
+import time
+import sqlite3
+import threading
+import pandas as pd
+from pathlib import Path
+
+# Local on-disk cache for RentCast AVM responses.
+# A rent estimate for the same house barely moves week to week, so paying for it
+# on every run is wasted budget.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_CACHE_PATH = PROJECT_ROOT / "data" / "cache" / "rent_cache.sqlite"
+DEFAULT_TTL_DAYS = 30        # Re-buy an estimate once it is older than this
+DEFAULT_NEGATIVE_TTL_DAYS = 7  # "No rent data" answers are re-asked sooner (the AVM may gain coverage)
+DEFAULT_MAX_ENTRIES = 50000  # Least-recently-used entries are evicted past this size
+
+def normalize_address(address):
+    """'710 N. Lindsay St,  Kokomo' -> '710 n lindsay st kokomo'"""
+    text = str(address).lower()
+    text = re.sub(r"[^a-z0-9 ]", " ", text)
+    return " ".join(text.split())
+
+def _normalize_number(value):
+    """3 / 3.0 / '3' all map to '3'; missing values map to ''."""
+    if value is None or pd.isna(value):
+        return ""
+    try:
+        return f"{float(value):g}"
+    except (TypeError, ValueError):
+        return str(value).strip().lower()
+
+def make_cache_key(address, property_type, bedrooms, bathrooms, square_footage):
+    """Cache key = normalized address + the attributes we send to the AVM."""
+    parts = [
+        normalize_address(address),
+        str(property_type).strip().lower() if pd.notnull(property_type) else "",
+        _normalize_number(bedrooms),
+        _normalize_number(bathrooms),
+        _normalize_number(square_footage),
+    ]
+    return "|".join(parts)
+
+class RentCache:
+    """
+    SQLite-backed rent cache with a TTL and size-bounded (LRU) eviction.
+    A rent of 0 is a negative entry: the AVM answered, but had no rent for the house.
+    Negative entries are hits too (the call is not paid for again) and expire after
+    negative_ttl_days. Tracks hit/miss counters for the current run.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_days=DEFAULT_TTL_DAYS, max_entries=DEFAULT_MAX_ENTRIES,
+                 negative_ttl_days=DEFAULT_NEGATIVE_TTL_DAYS):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.negative_ttl_seconds = negative_ttl_days * 24 * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Market processes share one cache file: wait for another writer instead of failing
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rent_cache ("
+            " key TEXT PRIMARY KEY,"
+            " rent REAL NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_rent_cache_accessed ON rent_cache (accessed_at)")
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """
+        Looks up many keys at once. Returns {key: rent} for the fresh hits only
+        (rent 0 for a fresh negative entry). Expired entries count as misses.
+        """
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found = {}
+
+        with self.lock:
+            # SQLite caps the number of bound parameters, so query in chunks
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, rent FROM rent_cache WHERE key IN ({placeholders}) AND {self._FRESH}",
+                    chunk + self._oldest_allowed(now)
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                self.conn.executemany(
+                    "UPDATE rent_cache SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self.conn.commit()
+
+            self.hits += len(found)
+            self.negative_hits += sum(1 for rent in found.values() if rent <= 0)
+            self.misses += len(keys) - len(found)
+        return found
+
+    # Positive and negative entries expire on their own TTL
+    _FRESH = "fetched_at >= CASE WHEN rent > 0 THEN ? ELSE ? END"
+
+    def _oldest_allowed(self, now):
+        return [now - self.ttl_seconds, now - self.negative_ttl_seconds]
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """
+        Stores {key: rent} (rent 0 = the AVM had no data) and evicts the least
+        recently used entries if over size.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rent_cache (key, rent, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, float(rent), now, now) for key, rent in items.items()]
+            )
+            self._evict()
+            self.conn.commit()
+
+    def put(self, key, rent):
+        self.put_many({key: rent})
+
+    def _evict(self):
+        # 1. Drop everything past its TTL
+        self.conn.execute(f"DELETE FROM rent_cache WHERE NOT ({self._FRESH})", self._oldest_allowed(time.time()))
+
+        # 2. Enforce the size bound (least recently used first)
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM rent_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM rent_cache WHERE key IN "
+                "(SELECT key FROM rent_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def __len__(self):
+        with self.lock:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM rent_cache").fetchone()
+        return count
+
+    def stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0.0
+        return {"hits": self.hits, "negative_hits": self.negative_hits, "misses": self.misses,
+                "hit_rate": hit_rate, "entries": len(self)}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+from pipelines.storage import list_recent_datasets, load_dataset
+from pipelines.markets import partition_dir
+
+# Comparable-based rent model: every listing without a paid estimate gets the
+# distance-weighted rent of its k nearest enriched neighbours in
+# (location, bedrooms, bathrooms, squareFootage) space.
+# Uses scipy's cKDTree when it is installed, else an exact blocked brute-force search.
+
+try:
+    from scipy.spatial import cKDTree  # Optional spatial index
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+KM_PER_DEGREE = 111.32
+# How far apart two listings are "worth one unit" in each dimension
+FEATURE_SCALES = {'km': 1.5, 'bedrooms': 1.0, 'bathrooms': 0.75, 'squareFootage': 400.0}
+K_NEIGHBORS = 8
+MIN_COMPARABLES = 20       # Fewer paid rents than this are too thin to price a whole market
+CONFIDENCE_DISTANCE = 2.0  # Mean scaled neighbour distance at which confidence drops to ~37%
+BRUTE_FORCE_BLOCK = 4096   # Query rows per block in the numpy fallback (bounds memory)
+COMPARABLE_LOOKBACK_DAYS = 90  # Enriched snapshots older than this are not used as comparables
+COMPARABLE_SNAPSHOTS = 12      # ...and at most this many of the newest ones
+
+class ComparableRentModel:
+    """
+    Built once from listings that have a rent_estimate, then queried in batch.
+    estimate(df) returns (rent, confidence) arrays aligned with df.
+    """
+
+    def __init__(self, k=K_NEIGHBORS, scales=None):
+        self.k = k
+        self.scales = dict(FEATURE_SCALES, **(scales or {}))
+        self.tree = None
+
+    def _matrix(self, df):
+        """
+        Scaled feature matrix, centred on the training medians (which also fill missing values).
+        Centring keeps the squared distances of the fallback search numerically exact.
+        """
+        columns = []
+        for col in ['latitude', 'longitude', 'bedrooms', 'bathrooms', 'squareFootage']:
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+            columns.append(np.where(np.isnan(values), 0.0, values - self.fill[col]))
+        columns[0] *= KM_PER_DEGREE / self.scales['km']
+        columns[1] *= KM_PER_DEGREE * self.lon_factor / self.scales['km']
+        for i, col in enumerate(['bedrooms', 'bathrooms', 'squareFootage'], start=2):
+            columns[i] /= self.scales[col]
+        return np.column_stack(columns)
+
+    def fit(self, comparables):
+        rent = pd.to_numeric(comparables['rent_estimate'], errors='coerce')
+        comparables = comparables[(rent > 0).to_numpy()]
+        comparables = comparables.dropna(subset=['latitude', 'longitude'])
+        if len(comparables) < MIN_COMPARABLES:
+            raise ValueError(f"Need at least {MIN_COMPARABLES} enriched listings with coordinates, "
+                             f"got {len(comparables)}.")
+
+        self.fill = {
+            col: float(np.nanmedian(pd.to_numeric(comparables[col], errors='coerce')))
+            for col in ['latitude', 'longitude', 'bedrooms', 'bathrooms', 'squareFootage']
+        }
+        self.fill = {col: (0.0 if np.isnan(value) else value) for col, value in self.fill.items()}
+        # Degrees of longitude shrink with latitude: scale once at the market's latitude
+        self.lon_factor = np.cos(np.radians(self.fill['latitude']))
+
+        self.points = self._matrix(comparables)
+        self.rents = pd.to_numeric(comparables['rent_estimate'], errors='coerce').to_numpy(dtype=float)
+        self.k = min(self.k, len(self.rents))
+        self.tree = cKDTree(self.points) if HAS_SCIPY else None
+        return self
+
+    def _neighbors(self, X):
+        """(distances, indices) of the k nearest comparables for every row of X."""
+        if self.tree is not None:
+            distances, indices = self.tree.query(X, k=self.k)
+            return distances.reshape(len(X), -1), indices.reshape(len(X), -1)
+
+        distances = np.empty((len(X), self.k))
+        indices = np.empty((len(X), self.k), dtype=np.int64)
+        points_sq = (self.points ** 2).sum(axis=1)
+        for start in range(0, len(X), BRUTE_FORCE_BLOCK):
+            block = X[start:start + BRUTE_FORCE_BLOCK]
+            d2 = (block ** 2).sum(axis=1)[:, None] + points_sq[None, :] - 2 * block @ self.points.T
+            np.maximum(d2, 0, out=d2)
+            nearest = np.argpartition(d2, self.k - 1, axis=1)[:, :self.k] if self.k < d2.shape[1] \
+                else np.tile(np.arange(d2.shape[1]), (len(block), 1))
+            nearest_d2 = np.take_along_axis(d2, nearest, axis=1)
+            order = np.argsort(nearest_d2, axis=1)
+            indices[start:start + len(block)] = np.take_along_axis(nearest, order, axis=1)
+            distances[start:start + len(block)] = np.sqrt(np.take_along_axis(nearest_d2, order, axis=1))
+        return distances, indices
+
+    def estimate(self, df):
+        """
+        Batch rent estimate for every row of df.
+        rent: inverse-distance weighted mean of the neighbours' rents.
+        confidence (0-1): high when the neighbours are close AND agree with each other.
+        """
+        if self.tree is None and not hasattr(self, 'points'):
+            raise RuntimeError("Call fit() before estimate().")
+        if len(df) == 0:
+            return np.array([]), np.array([])
+
+        distances, indices = self._neighbors(self._matrix(df))
+        neighbour_rents = self.rents[indices]
+        weights = 1.0 / (distances + 0.05)
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        rent = (weights * neighbour_rents).sum(axis=1)
+        spread = np.sqrt((weights * (neighbour_rents - rent[:, None]) ** 2).sum(axis=1))
+        agreement = 1 - np.minimum(spread / np.maximum(rent, 1.0), 1.0)
+        closeness = np.exp(-(weights * distances).sum(axis=1) / CONFIDENCE_DISTANCE)
+        return rent.round(0), (agreement * closeness).round(3)
+
+def load_comparables(enriched_dir, market=None, extra=None, lookback_days=COMPARABLE_LOOKBACK_DAYS,
+                     max_snapshots=COMPARABLE_SNAPSHOTS):
+    """
+    Recent listings with a rent estimate in this market, latest observation per id:
+    the enriched snapshots of the last lookback_days (at most max_snapshots, each content
+    once -- see list_recent_datasets). extra (e.g. this run's enrichment) wins over the files.
+    """
+    files = list_recent_datasets(partition_dir(enriched_dir, market), max_age_days=lookback_days,
+                                 limit=max_snapshots)[::-1]  # Oldest first: newer observations win
+
+    frames = [load_dataset(f) for f in files]
+    if extra is not None:
+        frames.append(extra)
+    frames = [f for f in frames if not f.empty and {'latitude', 'longitude', 'rent_estimate'} <= set(f.columns)]
+    if not frames:
+        return pd.DataFrame(columns=['id', 'latitude', 'longitude', 'rent_estimate'])
+    comparables = pd.concat(frames, ignore_index=True, sort=False)
+    if 'id' in comparables.columns:
+        comparables = comparables.drop_duplicates(subset='id', keep='last')
+    return comparables.reset_index(drop=True)
+
+def estimate_missing_rents(listings, enriched, comparables, model=None):
+    """
+    The whole market with a rent per listing: enriched rows keep their API rent
+    (rent_source 'api', rent_confidence 1.0); every other listing gets the
+    comparable estimate (rent_source 'comps'). Returns enriched unchanged
+    (plus the two columns) if there are too few comparables to fit the model.
+    """
+    enriched = enriched.assign(rent_source='api', rent_confidence=1.0)
+    key = 'id' if 'id' in listings.columns and 'id' in enriched.columns else 'formattedAddress'
+    missing = listings[~listings[key].isin(enriched[key])]
+    if missing.empty:
+        return enriched
+
+    try:
+        model = model or ComparableRentModel().fit(comparables)
+    except ValueError as e:
+        print(f"⚠️ Local rent model skipped: {e}")
+        return enriched
+
+    rent, confidence = model.estimate(missing)
+    estimated = missing.assign(rent_estimate=rent, rent_source='comps', rent_confidence=confidence)
+    print(f"🏘️ Estimated {len(estimated)} rents from {len(model.rents)} comparables "
+          f"(median confidence {np.median(confidence):.2f})")
+    return pd.concat([enriched, estimated], ignore_index=True, sort=False)
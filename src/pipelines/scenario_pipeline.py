@@ -0,0 +1,222 @@
+import sys
+import copy
+import itertools
+import yaml
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.storage import save_dataset, load_dataset
+from pipelines.markets import partition_dir
+from pipelines.scoring_pipeline import (
+    load_config, score_arrays, rent_confidence, market_yield_targets, get_latest_features_file, PREDICTIONS_DIR
+)
+from pipelines.market_stats import load_market_stats
+from pipelines.metrics import track_stage
+
+# Scenario engine: scores every listing under N weight/scaling configurations at once.
+# The N x M score matrix is one broadcast of score_arrays() (in blocks of scenarios
+# to bound memory), followed by per-scenario ranks and rank-stability summaries.
+
+# Define Paths
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+SCENARIOS_PATH = PROJECT_ROOT / "config" / "scenarios.yaml"
+SCENARIOS_DIR = PREDICTIONS_DIR / "scenarios"
+
+SCENARIO_BLOCK = 16  # Scenarios scored per broadcast (peak memory ~ block x listings)
+RANK_COLUMNS = ['id', 'addressLine1', 'zipCode', 'price', 'rent_estimate']
+
+def load_scenario_config(path=SCENARIOS_PATH):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+def apply_overrides(base_config, overrides):
+    """base_config with overrides[section][key] replaced (sections: weights, scaling)."""
+    config = copy.deepcopy(base_config)
+    for section in ('weights', 'scaling'):
+        config[section].update(overrides.get(section) or {})
+    return config
+
+def expand_grid(base_config, grid):
+    """
+    Every combination of the grid values as (name, config) scenarios.
+    grid: {'weights.rent_to_cost': [0.3, 0.4], 'scaling.target_yield': [0.01, 0.015], ...}
+    """
+    keys = list(grid)
+    scenarios = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        overrides = {}
+        for key, value in zip(keys, values):
+            section, name = key.split(".", 1)
+            overrides.setdefault(section, {})[name] = value
+        label = ",".join(f"{key.split('.', 1)[1]}={value}" for key, value in zip(keys, values))
+        scenarios.append((label, apply_overrides(base_config, overrides)))
+    return scenarios
+
+def build_scenarios(base_config, scenario_config):
+    """The named scenarios followed by the grid sweep, as a list of (name, config)."""
+    scenarios = [
+        (entry['name'], apply_overrides(base_config, entry))
+        for entry in scenario_config.get('scenarios') or []
+    ]
+    scenarios.extend(expand_grid(base_config, scenario_config.get('grid') or {}))
+    if not scenarios:
+        scenarios = [('base', copy.deepcopy(base_config))]
+    names = [name for name, _ in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario names must be unique.")
+    return scenarios
+
+def score_matrix(df, configs, target_yields=None, block=SCENARIO_BLOCK):
+    """
+    deal_score of every listing (M) under every config (N) as an N x M matrix.
+    Row i equals score_arrays(..., configs[i], target_yields[i]) exactly.
+    target_yields: optional per-scenario per-listing targets (None entries use the config constant).
+    """
+    ratio = df['rent_to_cost_ratio'].to_numpy(dtype=float)[None, :]
+    risk_raw = df['maintenance_risk_score'].to_numpy(dtype=float)[None, :]
+    revenue = df['vacancy_adjusted_revenue'].to_numpy(dtype=float)[None, :]
+    price = pd.to_numeric(df['price'], errors='coerce').to_numpy(dtype=float)[None, :]
+    confidence = rent_confidence(df)
+    confidence = confidence[None, :] if confidence is not None else None
+    target_yields = target_yields or [None] * len(configs)
+
+    scores = np.empty((len(configs), ratio.shape[1]))
+    for start in range(0, len(configs), block):
+        chunk = configs[start:start + block]
+
+        def stacked(section, key):
+            return np.array([c[section][key] for c in chunk], dtype=float)[:, None]
+
+        # One config whose constants are (scenario, 1) columns: score_arrays broadcasts them over the listings
+        config = {
+            'weights': {key: stacked('weights', key) for key in ('rent_to_cost', 'maintenance_risk', 'vacancy_adjusted')},
+            'scaling': {key: stacked('scaling', key) for key in ('target_yield', 'max_risk_score')},
+        }
+        target = np.vstack([
+            np.broadcast_to(c['scaling']['target_yield'] if t is None else t, ratio.shape[1])
+            for c, t in zip(chunk, target_yields[start:start + block])
+        ]).astype(float)
+        scores[start:start + len(chunk)] = score_arrays(ratio, risk_raw, revenue, price, config, target, confidence)
+    return scores
+
+def rank_matrix(scores):
+    """
+    (order, ranks) per scenario: order[i] lists listing positions best first;
+    ranks[i, j] is listing j's rank (1 = best). Missing scores rank last, ties keep input order.
+    """
+    keys = np.where(np.isnan(scores), -np.inf, scores)
+    order = np.argsort(-keys, axis=1, kind='stable').astype(np.int32)
+    ranks = np.empty_like(order)
+    ranks[np.arange(len(order))[:, None], order] = np.arange(1, order.shape[1] + 1, dtype=np.int32)
+    return order, ranks
+
+def scenario_summary(names, scores, order, ranks, top_n):
+    """One row per scenario: top score, and agreement with the first (base) scenario."""
+    m = ranks.shape[1]
+    d2 = ((ranks.astype(float) - ranks[0]) ** 2).sum(axis=1)
+    spearman = 1 - 6 * d2 / (m * (m ** 2 - 1)) if m > 1 else np.ones(len(names))
+    base_top = set(order[0, :top_n].tolist())
+    overlap = [len(base_top.intersection(order[i, :top_n].tolist())) / max(len(base_top), 1)
+               for i in range(len(names))]
+    return pd.DataFrame({
+        'scenario': names,
+        'top_score': np.nanmax(scores, axis=1) if m else np.nan,
+        'median_score': np.nanmedian(scores, axis=1) if m else np.nan,
+        'spearman_vs_base': np.round(spearman, 4),
+        'top_n_overlap_vs_base': np.round(overlap, 4),
+    })
+
+def listing_stability(df, scores, ranks, top_n):
+    """
+    Rank stability of every listing that reaches the top_n of at least one scenario:
+    best / worst / median rank, rank spread and the share of scenarios that put it in the top_n.
+    """
+    in_top = ranks <= top_n
+    contenders = np.flatnonzero(in_top.any(axis=0))
+    r = ranks[:, contenders]
+    columns = [c for c in RANK_COLUMNS if c in df.columns]
+    stability = df.iloc[contenders][columns].reset_index(drop=True)
+    stability['best_rank'] = r.min(axis=0)
+    stability['worst_rank'] = r.max(axis=0)
+    stability['median_rank'] = np.median(r, axis=0)
+    stability['rank_std'] = r.std(axis=0).round(2)
+    stability['top_n_share'] = in_top[:, contenders].mean(axis=0).round(4)
+    stability['mean_score'] = scores[:, contenders].mean(axis=0).round(2)
+    return stability.sort_values(['top_n_share', 'median_rank'], ascending=[False, True], ignore_index=True)
+
+def rank_table(df, names, scores, order, top_n):
+    """Long table: the top_n listings of every scenario (scenario, rank, listing columns, deal_score)."""
+    top = order[:, :top_n]
+    columns = [c for c in RANK_COLUMNS if c in df.columns]
+    table = df.iloc[top.ravel()][columns].reset_index(drop=True)
+    table.insert(0, 'rank', np.tile(np.arange(1, top.shape[1] + 1), len(names)))
+    table.insert(0, 'scenario', np.repeat(names, top.shape[1]))
+    table['deal_score'] = np.take_along_axis(scores, top.astype(np.int64), axis=1).ravel()
+    return table
+
+@track_stage("scenarios")
+def run_scenarios(df=None, scenario_config=None, save=True, market=None):
+    """
+    df: features from run_feature_engineering. If None, the latest features dataset is used.
+    scenario_config: dict like config/scenarios.yaml (loaded from there if None).
+    save: write the rank table, listing stability and scenario summary to 04-predictions/scenarios.
+    market: read/write that market's partition instead of the stage folder.
+    Returns (rank_table, stability, summary) DataFrames.
+    """
+    print("🚀 Starting Scenario Scoring...")
+
+    # 1. Load Data & Scenarios
+    if df is None:
+        file_path = get_latest_features_file(market)
+        print(f"📂 Loading: {file_path.name}")
+        df = load_dataset(file_path)
+    scenario_config = scenario_config if scenario_config is not None else load_scenario_config()
+    scenarios = build_scenarios(load_config(), scenario_config)
+    names = [name for name, _ in scenarios]
+    configs = [config for _, config in scenarios]
+    top_n = min(int(scenario_config.get('top_n', 100)), len(df))
+
+    # Scenarios that normalize against live zip quantiles get per-listing targets
+    stats = None
+    target_yields = []
+    for config in configs:
+        if config['scaling'].get('yield_target') == 'market':
+            stats = stats or load_market_stats(market)
+            target_yields.append(market_yield_targets(df['zipCode'], config, stats))
+        else:
+            target_yields.append(None)
+
+    # 2. Score + Rank (N x M)
+    scores = score_matrix(df, configs, target_yields)
+    order, ranks = rank_matrix(scores)
+    print(f"🧮 Scored {len(df):,} listings under {len(configs)} scenarios")
+
+    # 3. Rank Tables + Stability
+    ranked = rank_table(df, names, scores, order, top_n)
+    stability = listing_stability(df, scores, ranks, top_n)
+    summary = scenario_summary(names, scores, order, ranks, top_n)
+
+    # 4. Save
+    if save:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        directory = partition_dir(SCENARIOS_DIR, market)
+        for name, table in [("scenario_ranks", ranked), ("scenario_stability", stability),
+                            ("scenario_summary", summary)]:
+            save_path = save_dataset(table, directory, f"{name}_{timestamp}", export_csv=True)
+            print(f"   {save_path}")
+
+    # Preview
+    print(f"\n📊 Scenario Summary (top {top_n}):")
+    print(summary.head(10).to_string(index=False))
+    print("\n🪨 Most Stable Deals:")
+    print(stability.head(5).to_string(index=False))
+
+    return ranked, stability, summary
+
+if __name__ == "__main__":
+    run_scenarios()
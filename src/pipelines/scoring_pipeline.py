@@ -1,8 +1,20 @@
+import sys
 import pandas as pd
+import numpy as np
 import yaml
 from pathlib import Path
 from datetime import datetime
 
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.storage import save_dataset, load_dataset, get_latest_dataset
+from pipelines.markets import partition_dir, market_label
+from pipelines.stage_cache import frame_digest, make_fingerprint
+from pipelines.metrics import track_stage
+from pipelines.market_stats import load_market_stats, zip_values
+from pipelines.listing_timeseries import load_listing_timeseries
+
 # Define Paths
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 FEATURES_DIR = PROJECT_ROOT / "data" / "03-features"
@@ -13,11 +25,17 @@ def load_config():
     with open(CONFIG_PATH, "r") as f:
         return yaml.safe_load(f)
 
-def get_latest_features_file():
-    files = list(FEATURES_DIR.glob("*.csv"))
-    if not files:
+def get_latest_features_file(market=None):
+    latest_file = get_latest_dataset(partition_dir(FEATURES_DIR, market))
+    if latest_file is None:
         raise FileNotFoundError("No feature data found! Run feature_eng_pipeline.py first.")
-    return max(files, key=lambda f: f.stat().st_mtime)
+    return latest_file
+
+def get_latest_rankings_file(market=None):
+    latest_file = get_latest_dataset(partition_dir(PREDICTIONS_DIR, market), prefix="final_rankings_")
+    if latest_file is None:
+        raise FileNotFoundError("No rankings found! Run scoring_pipeline.py first.")
+    return latest_file
 
 def calculate_score(row, config):
     """
@@ -54,37 +72,187 @@ def calculate_score(row, config):
     # Convert to 0-100 scale
     return round(final_score * 100, 1)
 
-def run_scoring():
+def round_scores(values, decimals=1):
+    """
+    np.round() on a whole vector, but with Python's round() result on exact ties.
+    np.round scales by 10**decimals first, which can flip values such as 0.35
+    that Python rounds by their true binary value. Only those few ties go back
+    through Python, so the output matches calculate_score() bit for bit.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, decimals)
+
+    scaled = values * 10 ** decimals
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9
+    if ties.any():
+        rounded[ties] = [round(v, decimals) for v in values[ties]]
+    return rounded
+
+def score_arrays(rent_to_cost_ratio, maintenance_risk_score, vacancy_adjusted_revenue, price, config,
+                 target_yield=None, rent_confidence=None):
+    """
+    Batch version of calculate_score().
+    Takes the feature columns as arrays and returns the 0-100 deal_score vector.
+    target_yield: optional per-listing yield targets (see market_yield_targets) instead of the config constant.
+    rent_confidence: optional per-listing confidence (0-1) in the rent behind the yield. The yield and
+    revenue points are scaled by it, so a comparable rent with weak support can't outrank a paid
+    estimate on yield alone (API rents have 1.0; missing values count as 1.0).
+    Inputs, target_yield and the config constants may be any broadcastable numpy shapes
+    (scenario_pipeline.score_matrix scores N configs x M listings in one call).
+    """
+    weights = config['weights']
+    limits = config['scaling']
+    target_yield = limits['target_yield'] if target_yield is None else np.asarray(target_yield, dtype=float)
+
+    ratio = np.asarray(rent_to_cost_ratio, dtype=float)
+    risk_raw = np.asarray(maintenance_risk_score, dtype=float)
+    revenue = np.asarray(vacancy_adjusted_revenue, dtype=float)
+    price = np.asarray(price, dtype=float)
+
+    # 1. Yield (capped at 1.0)
+    yield_score = np.minimum(ratio / target_yield, 1.0)
+
+    # 2. Maintenance Risk (inverted, floored at 0.0)
+    risk_score = np.maximum(1 - (risk_raw / limits['max_risk_score']), 0.0)
+
+    # 3. Vacancy Adjusted Revenue per dollar (0 when price is missing)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rev_score = np.where(
+            price > 0,
+            np.minimum((revenue * 12) / price / target_yield, 1.0),
+            0.0
+        )
+
+    # 3b. Rent-based points only count as far as the rent is trusted
+    if rent_confidence is not None:
+        confidence = np.asarray(rent_confidence, dtype=float)
+        confidence = np.where(np.isnan(confidence), 1.0, np.clip(confidence, 0.0, 1.0))
+        yield_score = yield_score * confidence
+        rev_score = rev_score * confidence
+
+    # 4. Weighted Sum
+    final_score = (
+        (yield_score * weights['rent_to_cost']) +
+        (risk_score * weights['maintenance_risk']) +
+        (rev_score * weights['vacancy_adjusted'])
+    )
+
+    return round_scores(final_score * 100, 1)
+
+def rent_confidence(df):
+    """The rent_confidence column as floats (see rent_model), or None if df has none."""
+    if 'rent_confidence' not in df.columns:
+        return None
+    return pd.to_numeric(df['rent_confidence'], errors='coerce').to_numpy(dtype=float)
+
+def market_yield_targets(zip_codes, config, stats):
+    """
+    Per-listing target_yield for yield_target: market -- the zip's live rent-to-cost
+    quantile (market_yield_quantile), or the static target_yield where the zip has
+    fewer than min_zip_rents rent estimates. Returns None in static mode.
+    """
+    limits = config['scaling']
+    if limits.get('yield_target', 'static') != 'market':
+        return None
+    column = f"rent_to_cost_p{round(limits.get('market_yield_quantile', 0.75) * 100)}"
+    live = zip_values(zip_codes, stats, column)
+    enough = zip_values(zip_codes, stats, 'rent_count') >= limits.get('min_zip_rents', 20)
+    return np.where(enough & (live > 0), live, limits['target_yield'])
+
+def calculate_scores(df, config, target_yield=None):
+    """Scores a whole features DataFrame. Returns a Series aligned with df."""
+    scores = score_arrays(
+        df['rent_to_cost_ratio'].to_numpy(dtype=float),
+        df['maintenance_risk_score'].to_numpy(dtype=float),
+        df['vacancy_adjusted_revenue'].to_numpy(dtype=float),
+        pd.to_numeric(df['price'], errors='coerce').to_numpy(dtype=float),
+        config,
+        target_yield,
+        rent_confidence(df)
+    )
+    return pd.Series(scores, index=df.index, name='deal_score')
+
+def top_n_deals(df, n=5, score_col='deal_score'):
+    """
+    Returns the n best-scored rows, best first.
+    Uses a partial selection (argpartition), so only the winners get sorted.
+    """
+    scores = df[score_col].to_numpy(dtype=float)
+    n = min(n, len(scores))
+    if n == 0:
+        return df.iloc[0:0]
+
+    # Missing scores always rank last
+    keys = np.where(np.isnan(scores), -np.inf, scores)
+    if n < len(keys):
+        top = np.argpartition(-keys, n - 1)[:n]
+    else:
+        top = np.arange(len(keys))
+    top = top[np.argsort(-keys[top], kind='stable')]
+    return df.iloc[top]
+
+@track_stage("scoring")
+def run_scoring(df=None, save=True, market=None, stage_cache=None):
+    """
+    df: features from run_feature_engineering. If None, the latest features dataset is used.
+    save: write the final rankings to 04-predictions and append this run's observations
+          to the listing time series.
+    market: read/write that market's partition instead of the stage folder.
+    stage_cache: a StageCache; the previous ranking is reused if the input, model_params.yaml and code are unchanged.
+    Returns the ranked DataFrame (best deals first).
+    """
     print("🚀 Starting Scoring Pipeline (The Final Ranking)...")
     
-    PREDICTIONS_DIR.mkdir(parents=True, exist_ok=True)
-    
     # 1. Load Data & Config
-    file_path = get_latest_features_file()
-    print(f"📂 Loading: {file_path.name}")
-    df = pd.read_csv(file_path)
+    if df is None:
+        file_path = get_latest_features_file(market)
+        print(f"📂 Loading: {file_path.name}")
+        df = load_dataset(file_path)
+    else:
+        df = df.copy()
+    
     config = load_config()
+    stats = load_market_stats(market) if config['scaling'].get('yield_target') == 'market' else None
+    
+    if stage_cache is not None:
+        params = {'market_stats': stats.version(('rent_to_cost',))} if stats is not None else None
+        fingerprint = make_fingerprint(frame_digest(df), config_paths=[CONFIG_PATH], code_paths=[__file__],
+                                       params=params)
+        cached = stage_cache.load("score", fingerprint)
+        if cached is not None:
+            # Same input as the run that made it: its observations are already in the time series
+            return cached
     
-    # 2. Calculate Deal Score
-    df['deal_score'] = df.apply(lambda row: calculate_score(row, config), axis=1)
+    # 2. Calculate Deal Score (against live zip quantiles if yield_target is 'market')
+    target_yield = market_yield_targets(df['zipCode'], config, stats) if stats is not None else None
+    df['deal_score'] = calculate_scores(df, config, target_yield)
     
     # 3. Sort by Score (Best Deals First)
     df_sorted = df.sort_values(by='deal_score', ascending=False)
     
     # 4. Save Final Report
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"final_rankings_{timestamp}.csv"
-    save_path = PREDICTIONS_DIR / filename
+    # The typed dataset feeds visualization; the CSV copy is the human-readable report
+    if save:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        save_path = save_dataset(df_sorted, partition_dir(PREDICTIONS_DIR, market), f"final_rankings_{timestamp}",
+                                 export_csv=True)
+        
+        print(f"✅ Success! Top deals saved to:")
+        print(f"   {save_path}")
+        
+        # One observation per listing for this run (price / status / score history)
+        part_path = load_listing_timeseries(market).append(df_sorted)
+        print(f"   {part_path}")
     
-    df_sorted.to_csv(save_path, index=False)
-    
-    print(f"✅ Success! Top deals saved to:")
-    print(f"   {save_path}")
+    if stage_cache is not None:
+        stage_cache.record("score", fingerprint, save_path if save else None, df_sorted)
     
     # Preview the Winners
-    print("\n🏆 TOP 5 DEALS IN KOKOMO:")
+    print(f"\n🏆 TOP 5 DEALS IN {market_label(market)}:")
     cols = ['deal_score', 'addressLine1', 'price', 'rent_to_cost_ratio', 'maintenance_risk_score']
-    print(df_sorted[cols].head(5))
+    print(top_n_deals(df, 5)[cols])
+    
+    return df_sorted
 
 if __name__ == "__main__":
     run_scoring()
\ No newline at end of file
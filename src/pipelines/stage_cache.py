@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+
+from pipelines.storage import load_dataset, apply_schema
+from pipelines.raw_store import iter_raw_lines, dumps
+from pipelines.markets import partition_dir
+
+# Content-hashed stage cache.
+# Every cacheable stage fingerprints (input data + config files + its own source code).
+# The run manifest remembers the last fingerprint and output of each stage;
+# when the fingerprint matches, the stage reuses that output instead of recomputing.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIR = PROJECT_ROOT / "data" / "cache"
+MANIFEST_NAME = "run_manifest.json"
+
+def file_digest(path):
+    """sha256 of a file's bytes (read in 1 MB blocks)."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def frame_digest(df):
+    """
+    Content hash of a DataFrame. Independent of row and column order and of
+    in-memory vs. reloaded dtypes (the pinned storage schema is applied first).
+    """
+    df = apply_schema(df)
+    df = df[sorted(df.columns)]
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    except TypeError:
+        # Unhashable cells (lists/dicts): hash their text form instead
+        row_hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+
+    sha = hashlib.sha256()
+    sha.update(json.dumps([[col, str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    sha.update(np.sort(row_hashes).tobytes())
+    return sha.hexdigest()
+
+def raw_digest(data):
+    """Content hash of raw listings (a list of dicts or a raw snapshot path), independent of order."""
+    lines = iter_raw_lines(data) if isinstance(data, (str, Path)) else (dumps(record) for record in data)
+    digests = sorted(hashlib.sha1(line).digest() for line in lines)
+    return hashlib.sha256(b"".join(digests)).hexdigest()
+
+def make_fingerprint(input_digest, config_paths=(), code_paths=(), params=None):
+    """Combines the input hash, config file contents, stage source code and extra params."""
+    sha = hashlib.sha256()
+    sha.update(f"input:{input_digest}\n".encode())
+    for path in config_paths:
+        sha.update(f"config:{Path(path).name}:{file_digest(path)}\n".encode())
+    for path in code_paths:
+        sha.update(f"code:{Path(path).name}:{file_digest(path)}\n".encode())
+    if params:
+        sha.update(f"params:{json.dumps(params, sort_keys=True, default=str)}\n".encode())
+    return sha.hexdigest()
+
+class StageCache:
+    """
+    Run manifest + hit/miss bookkeeping for one pipeline run.
+    One manifest per market partition, so market processes never share a file.
+    force=True recomputes every stage (and still records the new fingerprints).
+    """
+
+    def __init__(self, market=None, force=False, cache_dir=CACHE_DIR):
+        self.force = force
+        self.market = market
+        self.manifest_path = partition_dir(cache_dir, market) / MANIFEST_NAME
+        self.manifest = self._read_manifest()
+        self.results = []  # [(stage, 'hit' | 'miss' | 'forced', seconds)]
+        self.started = {}
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"stages": {}}
+
+    def _write_manifest(self):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def lookup(self, stage, fingerprint):
+        """
+        Output path of the stage's previous run if its fingerprint matches
+        (and the file still exists), else None. Starts the stage timer.
+        """
+        self.started[stage] = time.perf_counter()
+        entry = self.manifest["stages"].get(stage)
+        if self.force or entry is None or entry["fingerprint"] != fingerprint:
+            return None
+        output = Path(entry["output"])
+        if not output.exists():
+            return None
+        self.results.append((stage, "hit", time.perf_counter() - self.started.pop(stage)))
+        print(f"♻️  Stage cache hit for '{stage}' -> reusing {output.name}")
+        return output
+
+    def load(self, stage, fingerprint):
+        """Cached DataFrame of a stage, or None on a miss."""
+        output = self.lookup(stage, fingerprint)
+        return load_dataset(output) if output is not None else None
+
+    def record(self, stage, fingerprint, output, df=None):
+        """
+        Remembers the stage's new fingerprint and output.
+        output=None means the stage did not save anything (save=False, e.g. --in-memory):
+        nothing is written for it either, so the stage is simply recomputed next run.
+        """
+        if output is not None:
+            self.manifest["stages"][stage] = {
+                "fingerprint": fingerprint,
+                "output": str(output),
+                "rows": None if df is None else len(df),
+                "updated_at": datetime.now().isoformat(timespec="seconds")
+            }
+            self._write_manifest()
+        started = self.started.pop(stage, time.perf_counter())
+        self.results.append((stage, "forced" if self.force else "miss", time.perf_counter() - started))
+
+    def report(self):
+        """Prints which stages were reused and which were recomputed."""
+        if not self.results:
+            return
+        hits = sum(1 for _, status, _ in self.results if status == "hit")
+        print(f"\n♻️  Stage cache: {hits} hit(s), {len(self.results) - hits} recomputed")
+        for stage, status, seconds in self.results:
+            print(f"   {stage:<15} {status.upper():<7} {seconds:.2f}s")
@@ -0,0 +1,164 @@
+import os
+import time
+import pandas as pd
+from pathlib import Path
+
+from pipelines import artifact_index
+
+# Typed storage for the datasets handed from one stage to the next
+# (02-preprocessed, 02-enriched, 03-features, 04-predictions).
+# Parquet keeps dtypes, so nothing is re-inferred or re-parsed on load.
+
+try:
+    import pyarrow  # noqa: F401  (Parquet/Feather engine)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+# Preferred format if a dataset exists in more than one (e.g. Parquet + CSV export)
+FORMAT_PREFERENCE = ["parquet", "feather", "csv"]
+
+# Default format: override with YIELD_STORAGE_FORMAT=parquet|feather|csv
+STORAGE_FORMAT = os.getenv("YIELD_STORAGE_FORMAT", "parquet" if HAS_PYARROW else "csv").lower()
+COMPRESSION = "zstd"
+
+# Pinned schema for the columns every stage shares.
+# Low-cardinality text -> category; whole-number measures -> float32 (exact for these ranges,
+# and NaN-friendly so the existing pd.notnull / numpy math keeps working).
+CATEGORICAL_COLUMNS = ['propertyType', 'zipCode', 'city', 'state', 'county', 'status', 'listingType']
+FLOAT32_COLUMNS = ['bedrooms', 'bathrooms', 'squareFootage', 'yearBuilt', 'lotSize', 'daysOnMarket']
+
+def resolve_format(fmt=None):
+    fmt = (fmt or STORAGE_FORMAT).lower()
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown storage format '{fmt}'. Use one of: {', '.join(EXTENSIONS)}")
+    if fmt != "csv" and not HAS_PYARROW:
+        print(f"⚠️  pyarrow is not installed; storing as CSV instead of {fmt}.")
+        return "csv"
+    return fmt
+
+def apply_schema(df):
+    """Casts the shared columns to their pinned dtypes (columns that are absent are skipped)."""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            # CSV reads zip codes as numbers: 46901.0 -> "46901"
+            values = pd.to_numeric(values, errors='coerce').astype('Int64').astype('string')
+        elif not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('string')
+        df[col] = values.astype('category')
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+    return df
+
+def save_dataset(df, directory, name, fmt=None, export_csv=False):
+    """
+    Saves df as directory/name.<ext> in the configured format.
+    export_csv=True also writes a human-readable CSV copy next to it.
+    Returns the path of the primary file.
+    """
+    fmt = resolve_format(fmt)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    save_path = directory / f"{name}{EXTENSIONS[fmt]}"
+    # Written under a temporary name, then swapped in: readers never see a half-written file,
+    # and a deduplicated (hard-linked) snapshot is never overwritten in place
+    tmp_path = directory / f".{name}{EXTENSIONS[fmt]}.tmp"
+
+    stored = apply_schema(df) if fmt != "csv" else df
+    if fmt == "parquet":
+        stored.to_parquet(tmp_path, index=False, compression=COMPRESSION)
+    elif fmt == "feather":
+        stored.reset_index(drop=True).to_feather(tmp_path, compression=COMPRESSION)
+    else:
+        stored.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, save_path)
+
+    if export_csv and fmt != "csv":
+        df.to_csv(directory / f"{name}.csv", index=False)
+
+    if artifact_index.is_indexed(directory):
+        from pipelines.stage_cache import file_digest
+        artifact_index.get_index().record(
+            save_path, file_digest(save_path), rows=len(df),
+            schema={col: str(dtype) for col, dtype in stored.dtypes.items()}
+        )
+    return save_path
+
+def load_dataset(path):
+    """Loads a dataset written by save_dataset (or a legacy CSV) with the pinned schema."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if suffix == ".feather":
+        return pd.read_feather(path)
+    return apply_schema(pd.read_csv(path))
+
+def list_datasets(directory, prefix=""):
+    """All dataset files in a folder (not recursive), any supported format."""
+    directory = Path(directory)
+    files = []
+    for ext in EXTENSIONS.values():
+        files.extend(directory.glob(f"{prefix}*{ext}"))
+    return files
+
+def get_latest_dataset(directory, prefix=""):
+    """
+    Newest dataset in a folder (by mtime). If the newest dataset was saved in
+    several formats (e.g. Parquet + CSV export), the typed format wins.
+    Returns None if the folder holds no datasets.
+    Folders under data/ are answered from the artifact index; the folder is only
+    scanned if the index has nothing for it (e.g. snapshots written before the index).
+    """
+    if artifact_index.is_indexed(directory):
+        indexed = artifact_index.get_index().latest(directory, prefix)
+        if indexed is not None:
+            return indexed
+    files = list_datasets(directory, prefix)
+    if not files:
+        return None
+    newest = max(files, key=lambda f: f.stat().st_mtime)
+    same_stem = {f.suffix.lower(): f for f in files if f.stem == newest.stem}
+    for fmt in FORMAT_PREFERENCE:
+        if EXTENSIONS[fmt] in same_stem:
+            return same_stem[EXTENSIONS[fmt]]
+    return newest
+
+def list_recent_datasets(directory, prefix="", max_age_days=None, limit=None):
+    """
+    Datasets in a folder, newest first: one file per dataset (the typed format wins over its
+    CSV export) and one per content, so deduplicated (hard-linked) snapshots count once.
+    max_age_days / limit bound the lookback. Folders under data/ are answered from the
+    artifact index; other folders are scanned (same content = same file on disk).
+    """
+    since = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    if artifact_index.is_indexed(directory):
+        indexed = artifact_index.get_index().recent(directory, prefix, since, limit)
+        if indexed:
+            return indexed
+
+    rank = {EXTENSIONS[fmt]: i for i, fmt in enumerate(FORMAT_PREFERENCE)}
+    by_stem = {}
+    for f in list_datasets(directory, prefix):
+        current = by_stem.get(f.stem)
+        if current is None or rank[f.suffix.lower()] < rank[current.suffix.lower()]:
+            by_stem[f.stem] = f
+    files, inodes = [], set()
+    for f in sorted(by_stem.values(), key=lambda f: f.stat().st_mtime, reverse=True):
+        stat = f.stat()
+        if since is not None and stat.st_mtime < since:
+            break
+        if (stat.st_dev, stat.st_ino) in inodes:
+            continue
+        inodes.add((stat.st_dev, stat.st_ino))
+        files.append(f)
+        if limit is not None and len(files) >= limit:
+            break
+    return files
@@ -1,43 +1,132 @@
+import os
+import sys
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # Charts are only ever saved, never shown (also safe in worker processes)
 import seaborn as sns
 import matplotlib.pyplot as plt
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+# Make sibling modules importable when this file is run directly
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pipelines.storage import load_dataset, get_latest_dataset
+from pipelines.stage_cache import frame_digest, make_fingerprint
+from pipelines.metrics import track_stage
 
 # Define Paths
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 PREDICTIONS_DIR = PROJECT_ROOT / "data" / "04-predictions"
 FIGURES_DIR = PROJECT_ROOT / "reports" / "figures" # Standard place for images
 
+# Thresholds (Business Logic)
+RISK_THRESHOLD = 100
+YIELD_THRESHOLD = 0.012
+
+# Large-N rendering
+SCATTER_LIMIT = 1000         # Above this many listings the chart switches to density mode
+TOP_K = 25                   # Best deals drawn as points on top of the density
+MAX_DENSITY_POINTS = 200000  # Density is drawn from a sample this large (plus the top-K)
+HEX_GRIDSIZE = 60
+MAX_PANELS = 12              # Small multiples: the largest groups only
+PANEL_WORKERS = 4
+POOL_MIN_PANELS = 4          # Fewer panels render in-process: a pool's startup costs more than it saves
+
 def get_latest_prediction_file():
-    files = list(PREDICTIONS_DIR.glob("*.csv"))
-    if not files:
+    latest_file = get_latest_dataset(PREDICTIONS_DIR)
+    if latest_file is None:
         raise FileNotFoundError("No predictions found. Run scoring_pipeline.py first.")
-    return max(files, key=lambda f: f.stat().st_mtime)
+    return latest_file
+
+def top_positions(scores, k):
+    """Positions of the k highest scores, best first (NaN last)."""
+    keys = np.where(np.isnan(scores), -np.inf, scores)
+    k = min(k, len(keys))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    top = np.argpartition(-keys, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+    return top[np.argsort(-keys[top], kind='stable')]
 
-def create_yield_risk_matrix(df, save_path):
-    """Generates the Quadrant Chart and saves it."""
+def downsample(df, max_points, keep_top=TOP_K, seed=0):
+    """
+    At most max_points rows: the keep_top best deals always stay, the rest is a
+    uniform random sample (seeded, so reruns draw the same chart).
+    """
+    if len(df) <= max_points:
+        return df
+    scores = df['deal_score'].to_numpy(dtype=float)
+    top = top_positions(scores, keep_top)
+    rest = np.setdiff1d(np.arange(len(df)), top)
+    sample = np.random.default_rng(seed).choice(rest, size=max_points - len(top), replace=False)
+    return df.iloc[np.sort(np.concatenate([top, sample]))]
+
+def chart_extent(df):
+    """Shared axis limits (0.5-99.5 percentiles) so outliers don't squash the density."""
+    x = df['maintenance_risk_score'].to_numpy(dtype=float)
+    y = df['rent_to_cost_ratio'].to_numpy(dtype=float)
+    x_low, x_high = np.nanpercentile(x, [0.5, 99.5]) if len(x) else (0.0, 1.0)
+    y_low, y_high = np.nanpercentile(y, [0.5, 99.5]) if len(y) else (0.0, 1.0)
+    x_low, x_high = min(x_low, RISK_THRESHOLD), max(x_high, RISK_THRESHOLD)
+    y_low, y_high = min(y_low, YIELD_THRESHOLD), max(y_high, YIELD_THRESHOLD)
+    x_pad, y_pad = (x_high - x_low) * 0.03 or 1.0, (y_high - y_low) * 0.03 or 0.001
+    return (x_low - x_pad, x_high + x_pad, y_low - y_pad, y_high + y_pad)
+
+def draw_density(ax, x, y, scores, extent, top_k=TOP_K, marker_sizes=(60, 250), gridsize=HEX_GRIDSIZE):
+    """Hexbin density of every listing with the top_k deals overlaid as scored points."""
+    hexes = ax.hexbin(x, y, gridsize=gridsize, bins='log', mincnt=1, cmap='Blues',
+                      extent=extent, linewidths=0)
+    top = top_positions(scores, top_k)
+    points = None
+    if len(top):
+        low, high = np.nanmin(scores[top]), np.nanmax(scores[top])
+        size = marker_sizes[0] + (scores[top] - low) / ((high - low) or 1) * (marker_sizes[1] - marker_sizes[0])
+        points = ax.scatter(x[top], y[top], c=scores[top], cmap='RdYlGn', s=size,
+                            edgecolor='black', alpha=0.9, zorder=3)
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    return hexes, points
+
+def create_yield_risk_matrix(df, save_path, mode="auto", top_k=TOP_K):
+    """
+    Generates the Quadrant Chart and saves it.
+    mode: 'scatter' (every listing as a point), 'density' (hexbin + top_k deals),
+          or 'auto' (density above SCATTER_LIMIT listings).
+    """
+    if mode == "auto":
+        mode = "density" if len(df) > SCATTER_LIMIT else "scatter"
     
     # Setup the plot
     sns.set_theme(style="white")
-    plt.figure(figsize=(12, 8))
+    fig = plt.figure(figsize=(12, 8))
     
-    # Thresholds (Business Logic)
-    RISK_THRESHOLD = 100
-    YIELD_THRESHOLD = 0.012
-
-    # Plot Points
-    sns.scatterplot(
-        data=df,
-        x="maintenance_risk_score",
-        y="rent_to_cost_ratio",
-        hue="deal_score",
-        palette="RdYlGn",
-        size="deal_score",
-        sizes=(200, 600),
-        edgecolor="black",
-        alpha=0.9
-    )
+    if mode == "scatter":
+        # Plot Points
+        sns.scatterplot(
+            data=df,
+            x="maintenance_risk_score",
+            y="rent_to_cost_ratio",
+            hue="deal_score",
+            palette="RdYlGn",
+            size="deal_score",
+            sizes=(200, 600),
+            edgecolor="black",
+            alpha=0.9
+        )
+    else:
+        # Density of the whole market (sampled past MAX_DENSITY_POINTS), best deals on top
+        sample = downsample(df, MAX_DENSITY_POINTS, keep_top=top_k)
+        ax = plt.gca()
+        hexes, points = draw_density(
+            ax, sample['maintenance_risk_score'].to_numpy(dtype=float),
+            sample['rent_to_cost_ratio'].to_numpy(dtype=float),
+            sample['deal_score'].to_numpy(dtype=float), chart_extent(df), top_k
+        )
+        fig.colorbar(hexes, ax=ax, label=f"Listings per cell (log, {len(df):,} total)")
+        if points is not None:
+            fig.colorbar(points, ax=ax, label=f"Deal score (top {top_k})")
     
     # Draw Quadrant Lines
     plt.axvline(x=RISK_THRESHOLD, color='gray', linestyle='--', alpha=0.5)
@@ -50,19 +139,103 @@ def create_yield_risk_matrix(df, save_path):
     
     # Save
     plt.tight_layout()
-    plt.savefig(save_path, dpi=300)
+    plt.savefig(save_path, dpi=300 if mode == "scatter" else 150)
     plt.close() # Close plot to free memory
 
-def run_visualization():
+def render_panel(title, x, y, scores, extent, save_path, top_k=TOP_K):
+    """One small-multiple panel (in-process or in a worker process). Returns save_path."""
+    fig, ax = plt.subplots(figsize=(4, 3))
+    draw_density(ax, x, y, scores, extent, top_k, marker_sizes=(15, 60), gridsize=HEX_GRIDSIZE // 2)
+    ax.axvline(x=RISK_THRESHOLD, color='gray', linestyle='--', alpha=0.5)
+    ax.axhline(y=YIELD_THRESHOLD, color='gray', linestyle='--', alpha=0.5)
+    ax.set_title(title, fontsize=10)
+    ax.tick_params(labelsize=7)
+    fig.tight_layout()
+    fig.savefig(save_path, dpi=100)
+    plt.close(fig)
+    return save_path
+
+def create_small_multiples(df, save_path, by="zipCode", top_k=5, max_workers=None):
+    """
+    One panel per group (the MAX_PANELS largest) on shared axes, then tiled into
+    save_path. From POOL_MIN_PANELS panels (and more than one worker) they are
+    rendered in a process pool, below that in this process. Panels are kept in a folder
+    next to it, whose old panels are replaced, so reusing save_path never piles up files.
+    Returns the list of panel paths (empty if there are fewer than two groups).
+    """
+    codes, names = pd.factorize(df[by].astype(str))
+    counts = np.bincount(codes[codes >= 0], minlength=len(names))
+    largest = np.argsort(-counts, kind='stable')[:MAX_PANELS]
+    if len(largest) < 2:
+        return []
+
+    save_path = Path(save_path)
+    panel_dir = save_path.with_suffix("")
+    panel_dir.mkdir(parents=True, exist_ok=True)
+    for stale in panel_dir.glob(f"{by}=*.png"):  # Panels of groups that are gone since the last run
+        stale.unlink()
+    extent = chart_extent(df)
+    per_panel = max(MAX_DENSITY_POINTS // len(largest), 1000)
+    rows_by_group = np.split(np.argsort(codes, kind='stable'), np.cumsum(np.bincount(codes, minlength=len(names)))[:-1])
+
+    jobs = []
+    for code in largest:
+        name = names[code]
+        group = downsample(df.iloc[rows_by_group[code]], per_panel, keep_top=top_k)
+        jobs.append((
+            f"{name} ({counts[code]:,})", group['maintenance_risk_score'].to_numpy(dtype=float),
+            group['rent_to_cost_ratio'].to_numpy(dtype=float), group['deal_score'].to_numpy(dtype=float),
+            extent, panel_dir / f"{by}={name}.png", top_k
+        ))
+
+    max_workers = max_workers or min(len(jobs), PANEL_WORKERS, os.cpu_count() or 1)
+    if len(jobs) < POOL_MIN_PANELS or max_workers < 2:
+        panels = [render_panel(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(render_panel, *job) for job in jobs]
+            panels = [future.result() for future in futures]
+
+    # Tile the rendered panels (cheap: no re-plotting of the data)
+    cols = min(4, len(panels))
+    rows = -(-len(panels) // cols)
+    fig, axes = plt.subplots(rows, cols, figsize=(4 * cols, 3 * rows))
+    for ax in np.atleast_1d(axes).ravel():
+        ax.axis('off')
+    for ax, panel in zip(np.atleast_1d(axes).ravel(), panels):
+        ax.imshow(plt.imread(panel))
+    fig.suptitle(f"Yield-Risk Matrix by {by}", fontsize=14, fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(save_path, dpi=100)
+    plt.close(fig)
+    return panels
+
+@track_stage("visualization")
+def run_visualization(df=None, stage_cache=None, small_multiples=False):
+    """
+    df: rankings from run_scoring. If None, the latest predictions dataset is used.
+    stage_cache: a StageCache; the previous chart is reused if the rankings and code are unchanged.
+    small_multiples: also draw one panel per market (cross-market rankings) or per zip
+    (opt-in; always written to the same yield_matrix_by_<column> grid and folder, replacing the last one).
+    Returns the path of the saved chart.
+    """
     print("🚀 Starting Visualization Pipeline...")
     
     # Ensure reports/figures folder exists
     FIGURES_DIR.mkdir(parents=True, exist_ok=True)
     
     # Load Data
-    latest_file = get_latest_prediction_file()
-    print(f"📊 Visualizing data from: {latest_file.name}")
-    df = pd.read_csv(latest_file)
+    if df is None:
+        latest_file = get_latest_prediction_file()
+        print(f"📊 Visualizing data from: {latest_file.name}")
+        df = load_dataset(latest_file)
+    
+    if stage_cache is not None:
+        fingerprint = make_fingerprint(frame_digest(df), code_paths=[__file__],
+                                       params={'small_multiples': small_multiples})
+        cached_path = stage_cache.lookup("visualize", fingerprint)
+        if cached_path is not None:
+            return cached_path
     
     # Create Filename
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -73,6 +246,18 @@ def run_visualization():
     
     print(f"✅ Success! Chart saved to:")
     print(f"   {save_path}")
+    
+    # Small multiples: per market for cross-market rankings, otherwise per zip
+    if small_multiples:
+        by = "market" if "market" in df.columns and df["market"].nunique() > 1 else "zipCode"
+        grid_path = FIGURES_DIR / f"yield_matrix_by_{by}.png"
+        if create_small_multiples(df, grid_path, by=by):
+            print(f"   {grid_path}")
+    
+    if stage_cache is not None:
+        stage_cache.record("visualize", fingerprint, save_path)
+    
+    return save_path
 
 if __name__ == "__main__":
     run_visualization()
\ No newline at end of file
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _make_features(n=1000, seed=0, zips=('46901',)):
+    """Synthetic features frame with every column the scorers read."""
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(40000, 250000, n).round()
+    ratio = rng.uniform(0.004, 0.025, n)
+    return pd.DataFrame({
+        'id': [f"L{seed}-{i}" for i in range(n)],
+        'addressLine1': [f"{i} Main St" for i in range(n)],
+        'zipCode': np.asarray(zips)[np.arange(n) % len(zips)],
+        'price': price,
+        'rent_estimate': (ratio * price).round(),
+        'rent_to_cost_ratio': ratio,
+        'maintenance_risk_score': rng.uniform(0, 400, n),
+        'vacancy_adjusted_revenue': ratio * price * 0.92,
+    })
+
+
+@pytest.fixture
+def make_features():
+    return _make_features
@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import artifact_index
+from pipelines.storage import save_dataset, get_latest_dataset, list_recent_datasets
+from pipelines.raw_store import RawSnapshotWriter, get_latest_raw_snapshot
+
+def use_tmp_data_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(artifact_index, "DATA_ROOT", tmp_path)
+    monkeypatch.setattr(artifact_index, "INDEX_PATH", tmp_path / "cache" / "artifacts.sqlite")
+    return artifact_index.get_index()
+
+def listings(prices):
+    return pd.DataFrame({'id': [f"L{i}" for i in range(len(prices))], 'zipCode': '46901', 'price': prices})
+
+# --- TEST 1: Latest / Run Lookups + Dedupe ---
+def test_index_answers_latest_and_run_lookups(monkeypatch, tmp_path):
+    index = use_tmp_data_root(monkeypatch, tmp_path)
+    folder = tmp_path / "03-features" / "market=kokomo-in"
+    first = save_dataset(listings([1.0, 2.0]), folder, "features_kokomo-in_2025-01-01_00-00-00")
+    second = save_dataset(listings([3.0]), folder, "features_kokomo-in_2025-01-02_00-00-00")
+    os.utime(first, (time.time() + 60, time.time() + 60))  # mtime no longer says which is newer
+
+    assert get_latest_dataset(folder) == second
+    assert index.latest_for_stage("features_kokomo-in", "kokomo-in") == second
+
+    rows = index.run_artifacts(artifact_index.METRICS.run_id)
+    assert [r['rows'] for r in rows] == [2, 1]
+    assert rows[0]['schema']['zipCode'] == 'category'
+
+    # Same content again: stored once
+    third = save_dataset(listings([3.0]), folder, "features_kokomo-in_2025-01-03_00-00-00")
+    assert third.samefile(second)
+    assert get_latest_dataset(folder) == third
+    assert list_recent_datasets(folder) == [third, first]  # One per content
+    assert list_recent_datasets(folder, limit=1) == [third]
+
+    # Vanished files fall back to the next snapshot
+    os.remove(third)
+    os.remove(second)
+    assert get_latest_dataset(folder) == first
+
+# --- TEST 2: Raw Snapshots (Order-Independent Hash) ---
+def test_raw_snapshots_are_indexed_and_deduped(monkeypatch, tmp_path):
+    index = use_tmp_data_root(monkeypatch, tmp_path)
+    records = [{'id': 'a', 'price': 1}, {'id': 'b', 'price': 2}]
+    paths = []
+    for i, page in enumerate([records, records[::-1]]):
+        path = tmp_path / "01-raw" / f"raw_listings_Test_2025-01-0{i + 1}_00-00-00.ndjson.gz"
+        with RawSnapshotWriter(path) as writer:
+            writer.write_many(page)
+        paths.append(path)
+
+    assert paths[1].samefile(paths[0])
+    assert get_latest_raw_snapshot(tmp_path / "01-raw") == paths[1]
+    assert len(index) == 2
+
+# --- TEST 3: Retention ---
+def test_prune_keeps_newest_and_indexes_untracked(monkeypatch, tmp_path):
+    index = use_tmp_data_root(monkeypatch, tmp_path)
+    folder = tmp_path / "04-predictions"
+    legacy = folder / "final_rankings_2024-12-31_00-00-00.csv"
+    folder.mkdir(parents=True)
+    listings([9.0]).to_csv(legacy, index=False)
+    os.utime(legacy, (time.time() - 86400, time.time() - 86400))
+    old = save_dataset(listings([1.0]), folder, "final_rankings_2025-01-01_00-00-00", export_csv=True)
+    new = save_dataset(listings([2.0]), folder, "final_rankings_2025-01-02_00-00-00", export_csv=True)
+
+    assert artifact_index.run_prune(keep=2, dry_run=True, index=index) == [legacy]
+    assert legacy.exists()
+
+    removed = artifact_index.run_prune(keep=1, index=index)
+    assert sorted(p.name for p in removed) == sorted([legacy.name, old.name, old.with_suffix(".csv").name])
+    assert new.exists() and new.with_suffix(".csv").exists()
+    assert get_latest_dataset(folder) == new and len(index) == 1
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,47 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add 'src' and 'benchmarks' to path so we can import the actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from synthetic_listings import generate_listings
+from run_benchmarks import compare
+from pipelines.preprocessing_pipeline import normalize_listings, clean_data
+
+# --- TEST 1: Synthetic Schema ---
+def test_synthetic_listings_match_raw_schema():
+    listings = generate_listings(200, seed=1)
+
+    assert len({listing['id'] for listing in listings}) == 200
+    assert all(isinstance(listing['history'], dict) and listing['history'] for listing in listings)
+    assert all(set(listing['listingAgent']) == {'name', 'phone', 'email'} for listing in listings)
+    assert any('hoa' in listing for listing in listings)
+    assert all('bedrooms' not in listing for listing in listings if listing['propertyType'] == 'Land')
+
+    # The pipeline accepts them like a real snapshot
+    df, history = normalize_listings(listings)
+    clean = clean_data(df)
+    assert 0 < len(clean) < len(listings)  # Land / Manufactured are filtered out
+    assert len(history) >= len(listings)
+    assert 'listingAgent.name' in df.columns and not any(c.startswith('history.') for c in df.columns)
+
+# --- TEST 2: Baseline Comparison ---
+def test_compare_flags_regressions_only():
+    baseline = {"results": [
+        {"stage": "features", "size": "100k", "seconds": 1.0, "peak_mb": 50.0},
+        {"stage": "scoring", "size": "100k", "seconds": 0.01, "peak_mb": 10.0},
+    ]}
+    results = [
+        {"stage": "features", "size": "100k", "seconds": 1.5, "peak_mb": 50.0},  # 50% slower
+        {"stage": "scoring", "size": "100k", "seconds": 0.02, "peak_mb": 10.0},  # 2x, but only 10 ms: noise
+        {"stage": "preprocess", "size": "100k", "seconds": 9.0, "peak_mb": 500.0},  # No baseline entry
+    ]
+
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("features @ 100k")
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
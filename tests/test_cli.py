@@ -0,0 +1,61 @@
+import sys
+import json
+import subprocess
+import pytest
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+import main
+
+# Import-time budgets (seconds). Generous on purpose: the module checks are the real guard.
+CLI_IMPORT_BUDGET = 0.5
+SCORE_IMPORT_BUDGET = 3.0
+HEAVY_MODULES = ['pandas', 'numpy', 'requests', 'seaborn', 'matplotlib', 'dotenv']
+# Downstream stages an extraction-only run must not load
+DOWNSTREAM_MODULES = ['pipelines.' + name for name in [
+    'preprocessing_pipeline', 'enrichment_pipeline', 'prescoring', 'rent_model', 'feature_eng_pipeline',
+    'scoring_pipeline', 'market_stats', 'delta_pipeline', 'visualization_pipeline']]
+
+def import_report(code, modules=HEAVY_MODULES):
+    """Runs code in a fresh interpreter; returns {'seconds', 'modules'} (which of modules it loaded)."""
+    script = (
+        "import sys, time, json\n"
+        f"sys.path.insert(0, {str(PROJECT_ROOT)!r})\n"
+        "start = time.perf_counter()\n"
+        f"{code}\n"
+        "seconds = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': seconds, 'modules': [m for m in {list(modules)!r} if m in sys.modules]}}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# --- TEST 1: Subcommands + Backwards-Compatible Flags ---
+def test_parse_args():
+    assert main.parse_args([]).command == "all"
+    args = main.parse_args(["--delta", "--in-memory"])
+    assert args.command == "all" and args.delta and args.in_memory
+    args = main.parse_args(["score", "--market", "kokomo-in"])
+    assert args.command == "score" and args.market == "kokomo-in"
+    assert not main.parse_args([]).small_multiples
+    assert main.parse_args(["visualize", "--small-multiples"]).small_multiples
+
+# --- TEST 2: Import-Time Budget ---
+def test_cli_imports_stay_light():
+    report = import_report("import main")
+    assert report['modules'] == []
+    assert report['seconds'] < CLI_IMPORT_BUDGET
+
+    # A scoring-only run (cron, services) never loads the HTTP or plotting stack
+    report = import_report("import main; main.load_stage('score')")
+    assert not {'requests', 'seaborn', 'matplotlib', 'dotenv'} & set(report['modules'])
+    assert report['seconds'] < SCORE_IMPORT_BUDGET
+
+    # Extraction (even with --delta) never loads the downstream stages or the plotting stack
+    report = import_report("import main; main.load_stage('extract')", HEAVY_MODULES + DOWNSTREAM_MODULES)
+    assert not {'seaborn', 'matplotlib', *DOWNSTREAM_MODULES} & set(report['modules'])
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
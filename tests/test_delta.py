@@ -0,0 +1,128 @@
+import sys
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import (
+    preprocessing_pipeline, enrichment_pipeline, feature_eng_pipeline, scoring_pipeline,
+    delta_pipeline, listing_delta, market_stats, listing_timeseries, rent_model
+)
+from pipelines.listing_delta import compute_listing_delta
+from pipelines.delta_pipeline import merge_results
+
+def listing(listing_id, price, status="Active", seen="2025-12-30"):
+    return {'id': listing_id, 'price': price, 'status': status, 'lastSeenDate': seen}
+
+# --- TEST 1: Added / Changed / Removed ---
+def test_compute_listing_delta():
+    previous = [listing('a', 100), listing('b', 200), listing('c', 300)]
+    current = [listing('a', 100), listing('b', 190), listing('d', 400)]
+
+    changes = compute_listing_delta(previous, current)
+
+    assert [l['id'] for l in changes['added']] == ['d']
+    assert [l['id'] for l in changes['changed']] == ['b']
+    assert changes['removed'] == ['c']
+    assert changes['unchanged'] == 1
+
+# --- TEST 2: Merging Changed Rows Into Previous Results ---
+def test_merge_results_replaces_changed_rows():
+    previous = pd.DataFrame({'id': ['a', 'b', 'c'], 'deal_score': [50.0, 60.0, 70.0]})
+    updated = pd.DataFrame({'id': ['b', 'd'], 'deal_score': [65.0, 80.0]})
+
+    merged = merge_results(previous, updated, drop_ids=['b', 'd', 'c'])
+
+    assert sorted(merged['id']) == ['a', 'b', 'd']
+    assert merged.set_index('id').loc['b', 'deal_score'] == 65.0
+
+def raw_listing(i, price, seen="2025-12-30"):
+    return {
+        'id': f"L{i}", 'formattedAddress': f"{i} Main St, Kokomo, IN 46901", 'addressLine1': f"{i} Main St",
+        'city': 'Kokomo', 'state': 'IN', 'zipCode': '46901', 'propertyType': 'Single Family',
+        'latitude': 40.48 + i * 0.002, 'longitude': -86.13 - i * 0.002,
+        'bedrooms': 2 + i % 3, 'bathrooms': 1 + i % 2, 'squareFootage': 900 + 80 * i, 'yearBuilt': 1940 + 3 * i,
+        'price': price, 'status': 'Active', 'daysOnMarket': 10 + i, 'lastSeenDate': seen,
+    }
+
+def use_data_root(monkeypatch, root):
+    """Points every stage folder (and the API) of this test at root."""
+    for module, names in [
+        (preprocessing_pipeline, ['PROCESSED_DIR', 'HISTORY_DIR']),
+        (enrichment_pipeline, ['PREPROCESSED_DIR', 'ENRICHED_DIR']),
+        (feature_eng_pipeline, ['ENRICHED_DIR', 'FEATURES_DIR']),
+        (scoring_pipeline, ['PREDICTIONS_DIR']),
+        (delta_pipeline, ['PROCESSED_DIR', 'HISTORY_DIR', 'ENRICHED_DIR', 'FEATURES_DIR', 'PREDICTIONS_DIR']),
+        (listing_delta, ['DELTA_DIR']),
+        (market_stats, ['STATS_DIR']),
+        (listing_timeseries, ['TIMESERIES_DIR']),
+    ]:
+        for name in names:
+            folder = getattr(module, name).relative_to(delta_pipeline.PROJECT_ROOT)
+            monkeypatch.setattr(module, name, root / folder)
+
+    def fetch(address, property_type, bedrooms, bathrooms, square_footage, session=None, limiter=None):
+        # One house never gets an API rent, so it is priced from comparables
+        return 0 if address.startswith("9 ") else 400 + 250 * bedrooms + 0.3 * square_footage
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate", fetch)
+    monkeypatch.setattr(enrichment_pipeline, "MAX_CALLS", 50)
+    monkeypatch.setattr(delta_pipeline, "MAX_CALLS", 50)
+    monkeypatch.setattr(rent_model, "MIN_COMPARABLES", 3)  # A ten-house market
+
+def run_full(records):
+    clean = preprocessing_pipeline.run_preprocessing(data=records)
+    enriched = enrichment_pipeline.run_enrichment(clean, concurrent=False, use_cache=False)
+    features = feature_eng_pipeline.run_feature_engineering(enriched, listings=clean)
+    rankings = scoring_pipeline.run_scoring(features)
+    market_stats.update_market_stats(clean, rankings)
+    return rankings
+
+# --- TEST 3: A Delta Run Matches A Full Run On The Same Data ---
+def test_delta_run_matches_full_run(monkeypatch, tmp_path):
+    before = [raw_listing(i, 60000 + 5000 * i) for i in range(9)]
+    for delisted in before[:2]:
+        # Not usable as comparables, so whether their old snapshot is still around doesn't matter
+        delisted.update(latitude=None, longitude=None)
+    after = [raw_listing(i, 60000 + 5000 * i) for i in range(2, 9)]   # L0, L1 delisted
+    after[0] = raw_listing(2, 55000, seen="2026-01-02")                   # L2 price cut
+    after.append(raw_listing(9, 52000, seen="2026-01-02"))                # L9 new, no API rent
+
+    # Full runs: before -> after
+    use_data_root(monkeypatch, tmp_path / "full")
+    run_full(before)
+    full = run_full(after).set_index('id')
+    full_stats = market_stats.load_market_stats().table()
+
+    # Full run on before, then a delta run on the changes
+    monkeypatch.undo()
+    use_data_root(monkeypatch, tmp_path / "delta")
+    run_full(before)
+    changes = compute_listing_delta(before, after)
+    delta_path = tmp_path / "delta.json"
+    delta_path.write_text(json.dumps(changes))
+    delta = delta_pipeline.run_delta_pipeline(delta_path, use_cache=False).set_index('id')
+
+    assert set(delta.columns) == set(full.columns)
+    assert sorted(delta.index) == sorted(full.index)
+    delta = delta.loc[full.index]
+    np.testing.assert_allclose(delta['deal_score'], full['deal_score'])
+    assert delta.loc['L9', 'rent_source'] == 'comps'
+    assert (delta['rent_source'] == full['rent_source']).all()
+    touched = ['L2', 'L9']
+    for col in ['rent_estimate', 'rent_confidence', 'rent_to_cost_ratio', 'price_per_sqft_vs_zip', 'price_change_pct']:
+        np.testing.assert_allclose(delta.loc[touched, col].astype(float), full.loc[touched, col].astype(float))
+
+    # Same live market stats (delisted houses retracted, the price cut moved)
+    pd.testing.assert_frame_equal(market_stats.load_market_stats().table(), full_stats)
+
+    # Only the reprocessed listings were appended to the time series
+    state = listing_timeseries.load_listing_timeseries().state().set_index('id')
+    assert state.loc['L2', 'observations'] == 2 and state.loc['L3', 'observations'] == 1
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
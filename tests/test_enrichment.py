@@ -0,0 +1,107 @@
+import sys
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import enrichment_pipeline
+from pipelines.api_client import get_with_retry, parse_retry_after
+from pipelines.rent_cache import RentCache
+
+def make_listings(n):
+    return pd.DataFrame({
+        'formattedAddress': [f"{i} Main St, Kokomo, IN 46901" for i in range(n)],
+        'addressLine1': [f"{i} Main St" for i in range(n)],
+        'propertyType': 'Single Family',
+        'bedrooms': 3,
+        'bathrooms': 1,
+        'squareFootage': 1200,
+        'price': [100000 - i * 1000 for i in range(n)],
+        'rent_estimate': float('nan')
+    })
+
+def fake_fetch(calls):
+    """Rent = house number * 10; every 3rd house has no data."""
+    def fetch(address, property_type, bedrooms, bathrooms, square_footage, session=None, limiter=None):
+        calls.append(address)
+        number = int(address.split()[0])
+        return 0 if number % 3 == 0 else number * 10
+    return fetch
+
+# --- TEST 1: Concurrent Mode == Serial Mode, Budget Enforced ---
+def test_concurrent_matches_serial(monkeypatch):
+    df = make_listings(40)
+    serial_calls, concurrent_calls = [], []
+
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate", fake_fetch(serial_calls))
+    serial = enrichment_pipeline.enrich_listings(df, max_calls=12, concurrent=False, rate_per_sec=1000)
+
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate", fake_fetch(concurrent_calls))
+    concurrent = enrichment_pipeline.enrich_listings(df, max_calls=12, concurrent=True, rate_per_sec=1000)
+
+    assert len(serial_calls) == 12
+    assert sorted(concurrent_calls) == sorted(serial_calls)
+    pd.testing.assert_frame_equal(serial, concurrent)
+    # Cheapest first, and only rows that got a rent back
+    assert serial['price'].is_monotonic_increasing
+    assert (serial['rent_estimate'] > 0).all()
+
+# --- TEST 2: Cache Hits Are Free ---
+def test_cache_hits_do_not_use_budget(monkeypatch, tmp_path):
+    df = make_listings(30)
+    cache = RentCache(tmp_path / "rent.sqlite")
+
+    first_calls, second_calls = [], []
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate", fake_fetch(first_calls))
+    first = enrichment_pipeline.enrich_listings(df, max_calls=10, rate_per_sec=1000, cache=cache)
+
+    # Warm rerun: the 10 cheapest are cached ('no data' answers too), so the budget moves on
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate", fake_fetch(second_calls))
+    second = enrichment_pipeline.enrich_listings(df, max_calls=10, rate_per_sec=1000, cache=cache)
+
+    assert len(second_calls) == 10
+    assert not set(second_calls) & set(first_calls)
+    assert set(first['formattedAddress']) < set(second['formattedAddress'])
+    assert cache.hits == 10 and cache.negative_hits == 10 - len(first)
+
+    # A failed call (None) is not an answer: it is never cached
+    failed_calls = []
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate",
+                        lambda **kwargs: failed_calls.append(kwargs['address']) or None)
+    enrichment_pipeline.enrich_listings(df, max_calls=5, rate_per_sec=1000, cache=cache)
+    enrichment_pipeline.enrich_listings(df, max_calls=5, rate_per_sec=1000, cache=cache)
+    assert len(failed_calls) == 10 and len(set(failed_calls)) == 5
+    cache.close()
+
+# --- TEST 3: 429 + Retry-After Is Honoured ---
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.calls += 1
+        return FakeResponse(self.statuses.pop(0), {"Retry-After": "0"})
+
+def test_get_with_retry_on_429():
+    session = FakeSession([429, 429, 200])
+    response = get_with_retry(session, "http://example.test")
+
+    assert response.status_code == 200
+    assert session.calls == 3
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after(None) > 0
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,72 @@
+import sys
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import extraction_pipeline
+from pipelines.raw_store import RawSnapshotWriter
+
+def fake_api(sizes, calls):
+    """Serves 'sizes[zip]' listings per zip, one page per call."""
+    def fetch(zip_code, limit, offset, session=None, host_limiter=None):
+        calls.append((zip_code, offset))
+        total = sizes[zip_code]
+        return {"listings": [{"id": f"{zip_code}-{i}"} for i in range(offset, min(offset + limit, total))]}
+    return fetch
+
+# --- TEST 1: Pagination Drains the Whole Zip ---
+def test_fetch_all_listings_drains_every_page(monkeypatch):
+    calls = []
+    monkeypatch.setattr(extraction_pipeline, "fetch_listings", fake_api({"46901": 1234, "46902": 7}, calls))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        big, big_stats = extraction_pipeline.fetch_all_listings("46901", None, None, pool, page_size=100, prefetch=3)
+        small, small_stats = extraction_pipeline.fetch_all_listings("46902", None, None, pool, page_size=100, prefetch=3)
+
+    # Every listing exactly once, in offset order
+    assert [l["id"] for l in big] == [f"46901-{i}" for i in range(1234)]
+    assert big_stats["listings"] == 1234
+
+    # A zip that fits in one page costs exactly one call
+    assert len(small) == 7
+    assert small_stats["pages"] == 1
+    assert [c for c in calls if c[0] == "46902"] == [("46902", 0)]
+
+# --- TEST 2: A Failed Page Never Turns Into Removals ---
+def test_failed_page_marks_zip_incomplete(monkeypatch, tmp_path):
+    sizes = {"46901": 1200, "46902": 30}
+    def flaky(zip_code, limit, offset, session=None, host_limiter=None):
+        if (zip_code, offset) == ("46901", 500):
+            return None  # Second page of 46901 fails
+        return {"listings": [{"id": f"{zip_code}-{i}", "zipCode": zip_code}
+                             for i in range(offset, min(offset + limit, sizes[zip_code]))]}
+    monkeypatch.setattr(extraction_pipeline, "fetch_listings", flaky)
+    monkeypatch.setattr(extraction_pipeline, "RAW_DIR", tmp_path)
+
+    # Previous snapshot: every listing of both zips, plus one 46902 listing that sold since
+    market = {'city': 'Test', 'state': 'IN', 'zip_codes': list(sizes)}
+    previous = [{"id": f"{z}-{i}", "zipCode": z} for z, n in sizes.items() for i in range(n)]
+    with RawSnapshotWriter(tmp_path / "market=test-in" / "raw_listings_Test_2025-01-01_00-00-00.ndjson.gz") as writer:
+        writer.write_many(previous + [{"id": "46902-sold", "zipCode": "46902"}])
+
+    deltas = []
+    monkeypatch.setattr(extraction_pipeline, "save_delta", lambda changes, city, timestamp: deltas.append(changes))
+    report = {}
+    extraction_pipeline.run_extraction(delta=True, keep_listings=False, market=market, report=report)
+    assert report['incomplete_zips'] == ["46901"]
+
+    changes = deltas[0]
+    assert changes['incomplete_zips'] == ["46901"]
+    assert changes['removed'] == ["46902-sold"] and changes['added'] == []
+    assert changes['unchanged'] == 500 + 30
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        _, stats = extraction_pipeline.fetch_all_listings("46901", None, None, pool)
+    assert stats["complete"] is False and stats["listings"] == 500
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -8,7 +8,8 @@ sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
 
 from pipelines.feature_eng_pipeline import (
     calculate_maintenance_risk,
-    calculate_vacancy_adjusted_revenue
+    calculate_vacancy_adjusted_revenue,
+    compute_features
 )
 
 # --- TEST 1: The "1% Rule" Check ---
@@ -82,6 +83,36 @@ def test_vacancy_adjusted_revenue():
     
     assert adjusted_revenue == 900, f"Expected $900, got ${adjusted_revenue}"
 
+# --- TEST 4: Columnar Engine Matches the Row-Wise Helpers ---
+def test_compute_features_matches_scalar():
+    """
+    The vectorized pass must return the same numbers as the scalar helpers,
+    including the 'default' zip fallback and missing yearBuilt / rent.
+    """
+    df = pd.DataFrame({
+        'zipCode': [46901, 46902, 99999, 46901],
+        'yearBuilt': [1920, None, 2005, 1980],
+        'squareFootage': [2000, 1500, 900, 1200],
+        'price': [100000, 0, 80000, 120000],
+        'rent_estimate': [1000, 900, None, 0]
+    })
+
+    market_config = {
+        'markets': {
+            '46901': {'vacancy_rate': 0.08, 'labor_cost_index': 1.2},
+            '46902': {'vacancy_rate': 0.06, 'labor_cost_index': 1.1},
+            'default': {'vacancy_rate': 0.10, 'labor_cost_index': 1.0}
+        }
+    }
+
+    result = compute_features(df, market_config)
+
+    for i, row in enumerate(df.to_dict('records')):
+        expected_ratio = (row['rent_estimate'] / row['price']) if row['price'] > 0 else 0
+        assert result['rent_to_cost_ratio'][i] == pytest.approx(expected_ratio, nan_ok=True)
+        assert result['maintenance_risk_score'][i] == pytest.approx(calculate_maintenance_risk(row, market_config))
+        assert result['vacancy_adjusted_revenue'][i] == pytest.approx(calculate_vacancy_adjusted_revenue(row, market_config))
+
 if __name__ == "__main__":
     # Allow running this file directly
     sys.exit(pytest.main(["-v", __file__]))
\ No newline at end of file
@@ -0,0 +1,74 @@
+import sys
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import extraction_pipeline
+from pipelines.listing_dedup import ListingDeduper, dedupe_listings
+from pipelines.raw_store import RawSnapshotWriter, iter_raw_records, raw_content_hash
+
+def listing(listing_id, address, seen, price=100000):
+    return {'id': listing_id, 'formattedAddress': address, 'lastSeenDate': seen, 'price': price}
+
+# --- TEST 1: Id Index, Address Fallback, Latest Observation Wins ---
+def test_deduper_rules():
+    records = [
+        listing('a', '1 Main St, Kokomo, IN 46901', '2025-01-01'),
+        listing('a', '1 Main St, Kokomo, IN 46901', '2025-01-01', price=1),  # same observation: first copy stays
+        listing(None, '1 MAIN ST.,  Kokomo, IN 46901', '2024-12-01'),        # older, found by address
+        listing('b', '2 Main St, Kokomo, IN 46901', '2025-01-01'),
+        listing('b', '2 Main St, Kokomo, IN 46901', '2025-01-03', price=95000),  # newer: replaces
+    ]
+    deduper = ListingDeduper()
+    kept = deduper.admit(records)
+    assert [(r['id'], r['price']) for r in kept] == [('a', 100000), ('b', 100000), ('b', 95000)]
+    assert deduper.superseded == {1}
+    assert deduper.stats() == {'unique': 2, 'duplicates_by_id': 2, 'duplicates_by_address': 1, 'replaced_by_newer': 1}
+
+    assert [(r['id'], r['price']) for r in dedupe_listings(records)] == [('a', 100000), ('b', 95000)]
+
+# --- TEST 2: Streaming Writer Drops Repeats From The Snapshot ---
+def test_writer_drops_duplicates(tmp_path):
+    path = tmp_path / "raw_listings_Test_1.ndjson.gz"
+    pages = [
+        [listing(f"L{i}", f"{i} Main St", '2025-01-01') for i in range(0, 300)],
+        [listing(f"L{i}", f"{i} Main St", '2025-01-01') for i in range(200, 500)],
+        [listing("L7", "7 Main St", '2025-01-02', price=90000)],
+    ]
+    with RawSnapshotWriter(path, deduper=ListingDeduper()) as writer:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(writer.write_many, pages[:2]))
+        writer.write_many(pages[2])
+
+    records = list(iter_raw_records(path))
+    assert len(records) == writer.count == 500
+    assert len({r['id'] for r in records}) == 500
+    assert next(r for r in records if r['id'] == "L7")['price'] == 90000
+    assert writer.content.hexdigest() == raw_content_hash(path)
+
+# --- TEST 3: Extraction Never Hands Duplicates On ---
+def test_extraction_dedupes_overlapping_zips(monkeypatch, tmp_path):
+    # Zip 46902's query also returns the border listings of 46901
+    listings = {
+        "46901": [listing(f"A{i}", f"{i} North St", '2025-01-01') for i in range(10)],
+        "46902": [listing(f"A{i}", f"{i} North St", '2025-01-01') for i in range(8, 10)]
+                 + [listing(f"B{i}", f"{i} South St", '2025-01-01') for i in range(5)],
+    }
+    def fetch(zip_code, limit, offset, session=None, host_limiter=None):
+        return {"listings": listings[zip_code][offset:offset + limit]}
+    monkeypatch.setattr(extraction_pipeline, "fetch_listings", fetch)
+    monkeypatch.setattr(extraction_pipeline, "RAW_DIR", tmp_path)
+
+    market = {'city': 'Test', 'state': 'IN', 'zip_codes': ["46901", "46902"]}
+    kept = extraction_pipeline.run_extraction(keep_listings=True, market=market)
+    assert sorted(r['id'] for r in kept) == sorted([f"A{i}" for i in range(10)] + [f"B{i}" for i in range(5)])
+
+    path = extraction_pipeline.run_extraction(keep_listings=False, market=market)
+    assert len(list(iter_raw_records(path))) == 15
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,72 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.listing_timeseries import load_listing_timeseries, CHANGE_COLUMNS
+
+def rankings(prices, scores, status='Active'):
+    return pd.DataFrame({
+        'id': ['a', 'b', 'c'],
+        'price': prices,
+        'status': status,
+        'daysOnMarket': [10.0, 20.0, 30.0],
+        'rent_estimate': [900.0, 1000.0, 1100.0],
+        'deal_score': scores,
+        'addressLine1': ['1 Main', '2 Main', '3 Main'],
+    })
+
+def fill_week(series):
+    series.append(rankings([100000.0, 80000.0, 60000.0], [50.0, 60.0, 70.0]), observed_at="2025-01-01 09:00")
+    series.append(rankings([100000.0, 75000.0, 60000.0], [52.0, 66.0, 70.0]), observed_at="2025-01-04 09:00")
+    series.append(rankings([94000.0, 75000.0, 61000.0], [58.0, 66.0, 69.0]).iloc[:2], observed_at="2025-01-08 09:00")
+
+# --- TEST 1: Partitioned Appends + Id / Date-Range Queries ---
+def test_append_and_query(tmp_path):
+    series = load_listing_timeseries(timeseries_dir=tmp_path)
+    fill_week(series)
+
+    assert [p.name for p in series.partitions()] == ["date=2025-01-01", "date=2025-01-04", "date=2025-01-08"]
+    assert [p.name for p in series.partitions("2025-01-02", "2025-01-05")] == ["date=2025-01-04"]
+
+    everything = series.read()
+    assert len(everything) == 8
+    assert list(everything.columns) == ['id', 'observed_at', 'price', 'status', 'daysOnMarket', 'rent_estimate',
+                                        'deal_score']
+
+    # By id: only the days listing 'c' was seen are opened
+    c = series.read(ids=['c'])
+    assert c['price'].tolist() == [60000.0, 60000.0]
+
+    # Date range (a bare end date covers that whole day)
+    window = series.read("2025-01-04", "2025-01-08", columns=['price'])
+    assert len(window) == 5 and list(window.columns) == ['id', 'observed_at', 'price']
+
+    # "Which listings dropped price by more than 5% this week?"
+    changes = series.changes("2025-01-01", "2025-01-08")
+    dropped = changes[changes['change_pct'] <= -0.05]
+    assert dropped['id'].tolist() == ['a', 'b']
+
+# --- TEST 2: Change Features From The State Table ---
+def test_change_features(tmp_path):
+    series = load_listing_timeseries(timeseries_dir=tmp_path)
+    fill_week(series)
+
+    state = series.state().set_index('id')
+    assert state.loc['a', 'observations'] == 3 and state.loc['c', 'observations'] == 2
+    assert state.loc['a', 'first_price'] == 100000.0 and state.loc['a', 'last_price'] == 94000.0
+
+    current = pd.DataFrame({'id': ['a', 'c', 'new'], 'price': [89300.0, 60000.0, 50000.0]}, index=[7, 8, 9])
+    features = series.change_features(current)
+    assert list(features.columns) == CHANGE_COLUMNS and list(features.index) == [7, 8, 9]
+    np.testing.assert_allclose(features['price_change_pct'], [-0.05, 0.0, np.nan])
+    np.testing.assert_allclose(features['price_change_total_pct'], [-0.107, 0.0, np.nan])
+    np.testing.assert_allclose(features['score_change'], [6.0, 0.0, np.nan])
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,99 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.market_stats import QuantileSketch, MarketStats, RELATIVE_ACCURACY
+from pipelines.scoring_pipeline import market_yield_targets, calculate_scores
+
+def make_snapshot(ids, zip_code, price_per_sqft, days=30):
+    return pd.DataFrame({
+        'id': ids,
+        'zipCode': zip_code,
+        'price': np.asarray(price_per_sqft, dtype=float) * 1000,
+        'squareFootage': 1000,
+        'daysOnMarket': days,
+    })
+
+# --- TEST 1: Sketch Quantiles Within The Relative Error ---
+def test_sketch_quantiles_and_merge():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(4, 1, 20000)
+    whole = QuantileSketch().add(values)
+    merged = QuantileSketch().add(values[:7000]).merge(QuantileSketch().add(values[7000:]))
+
+    assert merged.bins == whole.bins and merged.count == 20000
+    for q in (0.1, 0.5, 0.9):
+        exact = np.quantile(values, q)
+        assert abs(whole.quantile(q) - exact) / exact < RELATIVE_ACCURACY + 0.005
+
+    restored = QuantileSketch.from_dict(whole.to_dict())
+    assert restored.quantile(0.5) == whole.quantile(0.5)
+
+# --- TEST 2: Updates Follow The Live Market ---
+def test_incremental_snapshots(tmp_path):
+    path = tmp_path / "market_stats.sqlite"
+    stats = MarketStats(path)
+    assert stats.update_listings(make_snapshot(['a', 'b', 'c'], '46901', [50, 60, 70])) == {'observed': 3,
+                                                                                             'retracted': 0}
+
+    # Next run (fresh process): 'a' sold, 'b' unchanged, 'c' cut its price, 'd' is new, and everything aged
+    stats = MarketStats(path)
+    counts = stats.update_listings(make_snapshot(['b', 'c', 'd'], '46901', [60, 40, 80], days=[30, 45, 45]))
+    assert counts == {'observed': 2, 'retracted': 1}
+
+    row = MarketStats(path).lookup('46901')
+    assert row['listing_count'] == 3
+    assert abs(row['median_price_per_sqft'] - 60) / 60 < 0.02   # Of 40, 60, 80 -- not the stale 70 / sold 50
+    assert abs(row['median_days_on_market'] - 45) / 45 < 0.02
+    assert stats.lookup('99999') is None
+
+    # Re-reading the same snapshot changes nothing; a partial snapshot retracts nothing
+    assert stats.update_listings(make_snapshot(['b'], '46901', [60]), complete=False) == {'observed': 0,
+                                                                                           'retracted': 0}
+    assert stats.lookup('46901')['listing_count'] == 3
+
+    # A zip whose fetch failed part-way keeps its missing listings; other zips still retract
+    stats.update_listings(pd.concat([make_snapshot(['b', 'c', 'd'], '46901', [60, 40, 80]),
+                                     make_snapshot(['x', 'y'], '46902', [90, 100])]))
+    counts = stats.update_listings(make_snapshot(['c'], '46901', [40]), incomplete_zips=['46901'])
+    assert counts == {'observed': 0, 'retracted': 2}
+    assert stats.lookup('46901')['listing_count'] == 3 and stats.lookup('46902') is None
+
+    # Rents of delisted houses leave the rent-to-cost quantiles too
+    stats.update_rents(make_snapshot(['b', 'c'], '46901', [60, 40]).assign(rent_to_cost_ratio=[0.01, 0.02]))
+    assert stats.lookup('46901')['rent_count'] == 2
+    assert stats.update_rents(make_snapshot([], '46901', []).assign(rent_to_cost_ratio=[]),
+                              live_ids=['b', 'd'])['retracted'] == 1
+    assert MarketStats(path).lookup('46901')['rent_count'] == 1
+
+# --- TEST 3: Scoring Against Live Zip Quantiles ---
+def test_market_yield_targets(tmp_path):
+    stats = MarketStats(tmp_path / "market_stats.sqlite")
+    ids = [f"r{i}" for i in range(30)]
+    rents = make_snapshot(ids, '46901', np.full(30, 50.0)).assign(rent_to_cost_ratio=0.02)
+    stats.update_rents(rents)
+    stats.update_rents(make_snapshot(['x'], '46902', [50]).assign(rent_to_cost_ratio=0.01))
+
+    config = {'weights': {'rent_to_cost': 1.0, 'maintenance_risk': 0.0, 'vacancy_adjusted': 0.0},
+              'scaling': {'max_risk_score': 200, 'target_yield': 0.015, 'yield_target': 'market',
+                          'market_yield_quantile': 0.75, 'min_zip_rents': 20}}
+    targets = market_yield_targets(pd.Series(['46901', '46902', '10001']), config, stats)
+    assert abs(targets[0] - 0.02) / 0.02 < 0.02
+    assert targets[1] == targets[2] == 0.015  # Too few rents / unknown zip: static target
+
+    df = pd.DataFrame({'rent_to_cost_ratio': [0.015, 0.015], 'maintenance_risk_score': 0,
+                       'vacancy_adjusted_revenue': 0, 'price': 100000})
+    scores = calculate_scores(df, config, targets[:2])
+    assert scores[0] < scores[1] == 100.0  # 1.5% is below par in the hot zip
+
+    config['scaling']['yield_target'] = 'static'
+    assert market_yield_targets(pd.Series(['46901']), config, stats) is None
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
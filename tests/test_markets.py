@@ -0,0 +1,54 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.markets import load_target_markets, market_slug, partition_dir
+from pipelines.feature_eng_pipeline import get_market_info, lookup_market_arrays, listing_markets
+
+KOKOMO = {'city': 'Kokomo', 'state': 'IN', 'zip_codes': ['46901']}
+
+# --- TEST 1: Profile Formats ---
+def test_load_target_markets_accepts_both_formats():
+    legacy = {'target_market': KOKOMO}
+    listed = {'target_markets': [KOKOMO, {'city': 'Fort Wayne', 'state': 'IN', 'zip_codes': ['46802']}]}
+
+    assert load_target_markets(legacy) == [KOKOMO]
+    assert [market_slug(m) for m in load_target_markets(listed)] == ['kokomo-in', 'fort-wayne-in']
+
+# --- TEST 2: Partitions ---
+def test_partition_dir():
+    assert partition_dir("data/01-raw") == Path("data/01-raw")
+    assert partition_dir("data/01-raw", KOKOMO) == Path("data/01-raw/market=kokomo-in")
+
+# --- TEST 3: Market Fallback ---
+def test_market_defaults_fallback():
+    market_data = {
+        'markets': {
+            '46901': {'vacancy_rate': 0.06, 'labor_cost_index': 1.1},
+            'default': {'vacancy_rate': 0.10, 'labor_cost_index': 1.0}
+        },
+        'market_defaults': {'kokomo-in': {'vacancy_rate': 0.08, 'labor_cost_index': 1.2},
+                            'springfield-mo': {'vacancy_rate': 0.05, 'labor_cost_index': 0.9}}
+    }
+
+    assert get_market_info('46901', market_data, 'kokomo-in')['vacancy_rate'] == 0.06  # Zip wins
+    assert get_market_info('46999', market_data, 'kokomo-in')['vacancy_rate'] == 0.08  # Market default
+    assert get_market_info('46999', market_data, 'elsewhere-in')['vacancy_rate'] == 0.10  # Global default
+
+    # Same city name, different states: only Springfield MO has a market default
+    listings = pd.DataFrame({'zipCode': ['46901', '46999', '62701', '65801', '46999'],
+                             'city': ['Kokomo', 'Kokomo', 'Springfield', 'Springfield', None],
+                             'state': ['IN', 'IN', 'IL', 'MO', 'IN']})
+    assert list(listing_markets(listings)) == ['kokomo-in', 'kokomo-in', 'springfield-il', 'springfield-mo', None]
+    labor, vacancy = lookup_market_arrays(listings['zipCode'], market_data, listing_markets(listings))
+    np.testing.assert_allclose(vacancy, [0.06, 0.08, 0.10, 0.05, 0.10])
+    np.testing.assert_allclose(labor, [1.1, 1.2, 1.0, 0.9, 1.0])
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,63 @@
+import sys
+import json
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.metrics import METRICS, LatencyHistogram, track_stage
+from pipelines.api_client import get_with_retry
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {"Retry-After": "0"}
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        return FakeResponse(self.statuses.pop(0))
+
+# --- TEST 1: Latency Histogram ---
+def test_latency_histogram_buckets():
+    histogram = LatencyHistogram(buckets=[100, 1000])
+    for ms in [10, 20, 30, 500, 5000]:
+        histogram.add(ms)
+
+    summary = histogram.to_dict()
+    assert summary["buckets"] == {"<=100": 3, "<=1000": 1, ">1000": 1}
+    assert summary["p50_ms_le"] == 100
+    assert summary["max_ms"] == 5000
+
+# --- TEST 2: Stage + API Metrics In The Run Report ---
+def test_run_report_has_stage_and_api_lines(tmp_path):
+    METRICS.reset()
+
+    @track_stage("double")
+    def run_double(df):
+        return pd.concat([df, df], ignore_index=True)
+
+    run_double(pd.DataFrame({'a': [1, 2, 3]}))
+    get_with_retry(FakeSession([429, 200]), "http://api.test/v1/avm/rent/long-term")
+    get_with_retry(FakeSession([500]), "http://api.test/v1/avm/rent/long-term")
+
+    report_path = METRICS.write_report(tmp_path)
+    lines = [json.loads(line) for line in report_path.read_text().splitlines()]
+    stage, api, run = lines
+
+    assert stage["type"] == "stage" and stage["stage"] == "double"
+    assert (stage["rows_in"], stage["rows_out"], stage["columns"]) == (3, 6, 1)
+    # Process high-water mark, never reset: no stage reports more than the run
+    assert 0 <= stage["peak_rss_growth_mb"] <= stage["peak_rss_mb"] <= run["peak_rss_mb"]
+    assert api["endpoint"] == "/v1/avm/rent/long-term"
+    assert api["status_codes"] == {"200": 1, "500": 1}
+    assert (api["retries"], api["errors"], api["latency"]["count"]) == (1, 1, 2)
+    assert run["type"] == "run" and run["api_calls"] == 2
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
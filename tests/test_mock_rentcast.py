@@ -0,0 +1,62 @@
+import sys
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add 'src' and 'benchmarks' to path so we can import the actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from mock_rentcast import MockConfig, start_server, mock_rent
+from pipelines.api_client import api_url, create_session, HostConcurrencyLimiter
+from pipelines.extraction_pipeline import fetch_all_listings
+from pipelines.enrichment_pipeline import fetch_rent_estimate
+
+# --- TEST 1: Configurable Base URL ---
+def test_api_url_uses_base_url(monkeypatch):
+    monkeypatch.delenv("RENTCAST_BASE_URL", raising=False)
+    assert api_url("/v1/listings/sale") == "https://api.rentcast.io/v1/listings/sale"
+
+    monkeypatch.setenv("RENTCAST_BASE_URL", "http://127.0.0.1:8765/")
+    assert api_url("/v1/listings/sale") == "http://127.0.0.1:8765/v1/listings/sale"
+
+# --- TEST 2: Pagination + AVM Against The Mock ---
+def test_client_paths_against_mock_server(monkeypatch):
+    server = start_server(MockConfig(listings_per_zip=1100))
+    monkeypatch.setenv("RENTCAST_BASE_URL", server.base_url)
+    session = create_session()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as page_pool:
+            listings, stats = fetch_all_listings("46901", session, HostConcurrencyLimiter(2), page_pool)
+        assert len(listings) == 1100 and len({l['id'] for l in listings}) == 1100
+        assert stats["pages"] == 3  # 500 + 500 + 100
+
+        params = dict(address="1 Main St", property_type="Single Family", bedrooms=3, bathrooms=1,
+                      square_footage=1200)
+        rent = fetch_rent_estimate(**params, session=session)
+        expected = mock_rent({"address": "1 Main St", "propertyType": "Single Family",
+                              "bedrooms": 3, "bathrooms": 1, "squareFootage": 1200})
+        assert rent == expected
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+
+# --- TEST 3: Simulated Rate Limit ---
+def test_mock_server_answers_429_with_retry_after():
+    server = start_server(MockConfig(rate_limit=1, retry_after=2))
+    session = create_session()
+    try:
+        url = f"{server.base_url}/v1/avm/rent/long-term"
+        first = session.get(url, params={"address": "1 Main St"})
+        second = session.get(url, params={"address": "1 Main St"})
+        assert first.status_code == 200
+        assert second.status_code == 429 and second.headers["Retry-After"] == "2"
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,45 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.preprocessing_pipeline import clean_data, join_history, normalize_listings
+
+def raw_listing(listing_id, history):
+    return {
+        'id': listing_id, 'propertyType': 'Single Family', 'price': 90000,
+        'squareFootage': 1200, 'yearBuilt': 1950, 'bedrooms': 3, 'bathrooms': 1,
+        'listingAgent': {'name': 'Agent'},
+        'history': history
+    }
+
+# --- TEST 1: History Goes to a Long Table, Schema Stays Narrow ---
+def test_history_is_split_into_long_table():
+    records = [
+        raw_listing('a', {
+            '2024-01-31': {'event': 'Sale Listing', 'price': 95000, 'daysOnMarket': 10},
+            '2024-07-29': {'event': 'Sale Listing', 'price': 90000, 'daysOnMarket': 40}
+        }),
+        raw_listing('b', {
+            '2025-02-04': {'event': 'Sale Listing', 'price': 120000, 'daysOnMarket': 5}
+        })
+    ]
+
+    df, history = normalize_listings(records)
+    clean = clean_data(df)
+
+    # No 'history.YYYY-MM-DD.*' columns, no matter how many event dates exist
+    assert not [c for c in clean.columns if c.startswith('history')]
+    assert list(history.columns) == ['id', 'date', 'event', 'price', 'daysOnMarket']
+    assert len(history) == 3
+    assert history.loc[history['id'] == 'a', 'price'].tolist() == [95000, 90000]
+
+    joined = join_history(clean, history)
+    assert len(joined) == 3
+    assert set(joined['id']) == {'a', 'b'}
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,100 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import enrichment_pipeline
+from pipelines.prescoring import prescore, fit_rent_prior, select_top_k
+
+PRIOR = {'base': 450, 'per_bedroom': 150, 'per_bathroom': 100, 'per_sqft': 0.25, 'uncertainty': 0.25}
+
+def make_listings():
+    """Cheap-but-ancient houses first, slightly pricier newer houses after."""
+    old = pd.DataFrame({
+        'formattedAddress': [f"{i} Old St, Kokomo, IN 46901" for i in range(5)],
+        'price': [40000 + i * 1000 for i in range(5)],
+        'yearBuilt': 1880,
+        'squareFootage': 2400,
+    })
+    new = pd.DataFrame({
+        'formattedAddress': [f"{i} New St, Kokomo, IN 46901" for i in range(5)],
+        'price': [60000 + i * 1000 for i in range(5)],
+        'yearBuilt': 2005,
+        'squareFootage': 1200,
+    })
+    df = pd.concat([old, new], ignore_index=True)
+    df['addressLine1'] = df['formattedAddress'].str.split(',').str[0]
+    df['zipCode'] = '46901'
+    df['propertyType'] = 'Single Family'
+    df['bedrooms'] = 3
+    df['bathrooms'] = 1
+    df['rent_estimate'] = np.nan
+    return df
+
+# --- TEST 1: Heap Top-K ---
+def test_select_top_k():
+    priority = np.array([5.0, np.nan, 9.0, 7.0, 9.0])
+    assert select_top_k(range(5), priority, 3) == [2, 4, 3]  # Ties keep the earlier position
+    assert select_top_k([0, 1, 3], priority, 2) == [3, 0]
+    assert select_top_k(range(5), priority, 0) == []
+
+# --- TEST 2: Pre-Score Penalizes Risk Without Knowing Rent ---
+def test_prescore_prefers_safer_houses():
+    scores = prescore(make_listings(), rent_params=PRIOR)
+
+    assert scores.loc[:4, 'expected_deal_score'].max() < scores.loc[5:, 'expected_deal_score'].min()
+    assert (scores['upper_deal_score'] >= scores['expected_deal_score']).all()
+    assert scores.loc[0, 'price_per_sqft'] == 40000 / 2400
+
+# --- TEST 3: Budget Goes To The Best Pre-Scores ---
+def test_enrichment_budget_follows_prescore(monkeypatch):
+    calls = []
+    def fake_fetch(address, property_type, bedrooms, bathrooms, square_footage, session=None, limiter=None):
+        calls.append(address)
+        return 1000
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate", fake_fetch)
+
+    df = make_listings()
+    enrichment_pipeline.enrich_listings(df, max_calls=3, rate_per_sec=1000, strategy='expected', rent_params=PRIOR)
+    assert all('New St' in address for address in calls)
+
+    calls.clear()
+    enrichment_pipeline.enrich_listings(df, max_calls=3, rate_per_sec=1000, strategy='cheapest')
+    assert all('Old St' in address for address in calls)
+
+# --- TEST 4: No Budget, No Calls ---
+def test_zero_budget_makes_no_calls(monkeypatch):
+    calls = []
+    def fake_fetch(address, property_type, bedrooms, bathrooms, square_footage, session=None, limiter=None):
+        calls.append(address)
+        return 1000
+    monkeypatch.setattr(enrichment_pipeline, "fetch_rent_estimate", fake_fetch)
+
+    df = make_listings()
+    assert enrichment_pipeline.pick_paid_calls(df, list(range(len(df))), 0, 'expected', PRIOR) == set()
+    assert enrichment_pipeline.pick_paid_calls(df, [], 3, 'expected', PRIOR) == set()
+    enriched = enrichment_pipeline.enrich_listings(df, max_calls=0, strategy='expected', rent_params=PRIOR)
+    assert enriched.empty and not calls
+
+# --- TEST 5: Prior Refit From Enriched Listings ---
+def test_fit_rent_prior_recovers_linear_rents():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'bedrooms': rng.integers(1, 5, 50),
+        'bathrooms': rng.integers(1, 3, 50),
+        'squareFootage': rng.integers(700, 2500, 50),
+    })
+    df['rent_estimate'] = 300 + 120 * df['bedrooms'] + 80 * df['bathrooms'] + 0.3 * df['squareFootage']
+
+    params = fit_rent_prior(df, PRIOR)
+    assert abs(params['per_sqft'] - 0.3) < 1e-6 and abs(params['base'] - 300) < 1e-6
+    assert params['uncertainty'] < 1e-6
+    assert fit_rent_prior(df.head(5), PRIOR) == PRIOR  # Too few estimates: keep the defaults
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
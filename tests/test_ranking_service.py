@@ -0,0 +1,59 @@
+import sys
+import os
+import time
+import requests
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.ranking_service import RankingService, start_service
+from pipelines.scoring_pipeline import calculate_scores, load_config
+from pipelines.storage import save_dataset
+
+# --- TEST 1: Queries Match Batch Scoring ---
+def test_top_query_matches_scoring(tmp_path, make_features):
+    df = make_features(zips=('46901', '46902'))
+    save_dataset(df, tmp_path, "features_kokomo-in_2025-01-01_00-00-00")
+    service = RankingService(features_dir=tmp_path)
+    service.reload()
+
+    params = {'n': '5', 'zips': '46901', 'max_price': '120000', 'rent_to_cost': '0.7', 'maintenance_risk': '0.1'}
+    response = service.query(params)
+
+    config = load_config()
+    config['weights'].update(rent_to_cost=0.7, maintenance_risk=0.1)
+    expected = df[(df['zipCode'] == '46901') & (df['price'] <= 120000)]
+    expected = expected.assign(deal_score=calculate_scores(expected, config))
+    expected = expected.sort_values('deal_score', ascending=False, kind='stable').head(5)
+
+    assert [r['id'] for r in response['results']] == expected['id'].tolist()
+    assert [r['deal_score'] for r in response['results']] == expected['deal_score'].tolist()
+    assert all(r['zipCode'] == '46901' and r['price'] <= 120000 for r in response['results'])
+
+# --- TEST 2: HTTP API + Hot Reload ---
+def test_http_service_hot_reloads(tmp_path, make_features):
+    old = save_dataset(make_features(seed=1), tmp_path, "features_kokomo-in_2025-01-01_00-00-00")
+    server, stop = start_service(RankingService(features_dir=tmp_path), reload_interval=0.05)
+    try:
+        top = requests.get(f"{server.base_url}/top", params={'n': 3}).json()
+        assert top['file'] == old.name and len(top['results']) == 3
+        assert requests.get(f"{server.base_url}/top", params={'n': 'many'}).status_code == 400
+
+        new = save_dataset(make_features(seed=2), tmp_path, "features_kokomo-in_2025-01-02_00-00-00")
+        os.utime(new, (time.time() + 5, time.time() + 5))  # Strictly newer than the first file
+        deadline = time.time() + 5
+        while requests.get(f"{server.base_url}/health").json()['file'] != new.name and time.time() < deadline:
+            time.sleep(0.05)
+
+        top = requests.get(f"{server.base_url}/top", params={'n': 3}).json()
+        assert top['file'] == new.name and top['results'][0]['id'].startswith("L2-")
+    finally:
+        stop.set()
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
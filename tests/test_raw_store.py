@@ -0,0 +1,39 @@
+import sys
+import json
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.raw_store import RawSnapshotWriter, iter_raw_chunks, iter_raw_records, get_latest_raw_snapshot
+
+def listings(start, stop):
+    return [{'id': f"listing-{i}", 'price': 1000 * i, 'history': {'2024-01-01': {'event': 'Sale Listing'}}}
+            for i in range(start, stop)]
+
+# --- TEST 1: NDJSON Round Trip in Bounded Chunks ---
+def test_ndjson_round_trip_in_chunks(tmp_path):
+    path = tmp_path / "raw_listings_Test_1.ndjson.gz"
+    with RawSnapshotWriter(path) as writer:
+        writer.write_many(listings(0, 7))
+        writer.write_many(listings(7, 10))
+
+    chunks = list(iter_raw_chunks(path, chunk_size=4))
+
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert [r['id'] for c in chunks for r in c] == [f"listing-{i}" for i in range(10)]
+    assert chunks[0][0]['history'] == {'2024-01-01': {'event': 'Sale Listing'}}
+
+# --- TEST 2: Legacy JSON Snapshots Still Load ---
+def test_legacy_json_snapshot(tmp_path):
+    legacy = tmp_path / "raw_listings_Test_0.json"
+    legacy.write_text(json.dumps(listings(0, 3), indent=4))
+
+    assert get_latest_raw_snapshot(tmp_path) == legacy
+    assert len(list(iter_raw_records(legacy))) == 3
+    assert get_latest_raw_snapshot(tmp_path / "missing") is None
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,62 @@
+import sys
+import time
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.rent_cache import RentCache, make_cache_key
+
+# --- TEST 1: Key Normalization ---
+def test_cache_key_is_normalized():
+    a = make_cache_key("710 N. Lindsay St,  Kokomo, IN 46901", "Single Family", 2, 1.0, 1075)
+    b = make_cache_key("710 n lindsay st kokomo in 46901", "single family", 2.0, "1", 1075.0)
+    c = make_cache_key("710 N Lindsay St, Kokomo, IN 46901", "Single Family", 3, 1, 1075)
+    assert a == b
+    assert a != c
+
+# --- TEST 2: Hits, Misses and TTL ---
+def test_hits_misses_and_ttl(tmp_path):
+    cache = RentCache(tmp_path / "rent.sqlite", ttl_days=1)
+    cache.put("a", 1100)
+
+    assert cache.get("a") == 1100
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Age the entry past its TTL
+    cache.conn.execute("UPDATE rent_cache SET fetched_at = ?", (time.time() - 2 * 86400,))
+    assert cache.get("a") is None
+    cache.close()
+
+# --- TEST 4: "No Data" Answers Are Negative Hits With Their Own TTL ---
+def test_negative_entries(tmp_path):
+    cache = RentCache(tmp_path / "rent.sqlite", ttl_days=30, negative_ttl_days=7)
+    cache.put_many({"rented": 1100, "unknown": 0})
+    assert cache.get_many(["rented", "unknown"]) == {"rented": 1100, "unknown": 0}
+    assert (cache.hits, cache.negative_hits) == (2, 1)
+
+    # Ten days later the estimate is still fresh, the negative answer is not
+    cache.conn.execute("UPDATE rent_cache SET fetched_at = ?", (time.time() - 10 * 86400,))
+    assert cache.get_many(["rented", "unknown"]) == {"rented": 1100}
+    cache.put("other", 900)  # Eviction drops the expired negative entry
+    assert len(cache) == 2
+    cache.close()
+
+# --- TEST 3: Size-Bounded Eviction (Least Recently Used) ---
+def test_lru_eviction(tmp_path):
+    cache = RentCache(tmp_path / "rent.sqlite", max_entries=2)
+    cache.put("old", 900)
+    cache.put("new", 1000)
+    cache.conn.execute("UPDATE rent_cache SET accessed_at = 0 WHERE key = 'old'")
+    cache.put("newest", 1200)
+
+    assert len(cache) == 2
+    assert cache.get("old") is None
+    assert cache.get("newest") == 1200
+    cache.close()
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
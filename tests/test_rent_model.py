@@ -0,0 +1,108 @@
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import rent_model
+from pipelines.rent_model import ComparableRentModel, estimate_missing_rents, load_comparables
+from pipelines.storage import save_dataset
+
+def make_market(n, seed=0):
+    """Two neighbourhoods ~10 km apart; the east side rents for $400 more."""
+    rng = np.random.default_rng(seed)
+    east = rng.random(n) < 0.5
+    df = pd.DataFrame({
+        'id': [f"L{i}" for i in range(n)],
+        'formattedAddress': [f"{i} Main St, Kokomo, IN 46901" for i in range(n)],
+        'latitude': 40.48 + rng.normal(0, 0.005, n),
+        'longitude': np.where(east, -86.02, -86.14) + rng.normal(0, 0.005, n),
+        'bedrooms': rng.integers(2, 5, n),
+        'bathrooms': rng.integers(1, 3, n),
+        'squareFootage': rng.integers(900, 2200, n),
+    })
+    df['rent_estimate'] = 500 + 150 * df['bedrooms'] + 0.2 * df['squareFootage'] + np.where(east, 400, 0)
+    return df
+
+# --- TEST 1: Comparables Recover Local Rents ---
+def test_estimates_follow_neighbourhood_and_size():
+    market = make_market(400)
+    model = ComparableRentModel().fit(market.iloc[:300])
+    rent, confidence = model.estimate(market.iloc[300:])
+
+    truth = market['rent_estimate'].iloc[300:].to_numpy()
+    assert np.median(np.abs(rent - truth) / truth) < 0.08
+    assert ((confidence > 0) & (confidence <= 1)).all()
+
+# --- TEST 2: Confidence Drops Far From The Comparables ---
+def test_confidence_reflects_distance():
+    market = make_market(200)
+    model = ComparableRentModel().fit(market)
+    near = market.head(1)
+    far = near.assign(latitude=near['latitude'] + 0.5)  # ~55 km away
+    assert model.estimate(far)[1][0] < model.estimate(near)[1][0]
+
+# --- TEST 3: Fallback Search Matches The Exact Nearest Neighbours ---
+def test_brute_force_neighbours_are_exact(monkeypatch):
+    monkeypatch.setattr(rent_model, "BRUTE_FORCE_BLOCK", 7)  # Several blocks
+    market = make_market(120)
+    model = ComparableRentModel(k=5).fit(market)
+    model.tree = None
+    X = model._matrix(market.head(20))
+
+    distances, indices = model._neighbors(X)
+    full = np.sqrt(((X[:, None, :] - model.points[None, :, :]) ** 2).sum(axis=2))
+    np.testing.assert_allclose(distances, np.sort(full, axis=1)[:, :5], atol=1e-6)
+    assert (indices[:, 0] == np.arange(20)).all()  # Every listing is its own nearest comparable
+
+# --- TEST 4: Whole Market Ranked Without API Calls ---
+def test_estimate_missing_rents_fills_the_market(tmp_path):
+    market = make_market(5000)
+    enriched = market.head(200)
+    listings = market.drop(columns='rent_estimate')
+
+    save_dataset(market.iloc[200:400], tmp_path, "enriched_old")
+    comparables = load_comparables(tmp_path, extra=enriched)
+    assert len(comparables) == 400
+
+    start = time.perf_counter()
+    out = estimate_missing_rents(listings, enriched, comparables)
+    assert time.perf_counter() - start < 1.0
+
+    assert len(out) == 5000 and out['rent_estimate'].notna().all()
+    assert (out['rent_source'] == 'api').sum() == 200
+    assert (out.loc[out['rent_source'] == 'api', 'rent_confidence'] == 1.0).all()
+
+    # Too few comparables: only the enriched rows come back
+    few = enriched.head(rent_model.MIN_COMPARABLES - 1)
+    assert len(estimate_missing_rents(listings, few, few)) == len(few)
+
+# --- TEST 5: Comparables Come From Recent, Distinct Snapshots Only ---
+def test_load_comparables_bounded_lookback(tmp_path):
+    market = make_market(300)
+    stale = save_dataset(market.iloc[:100], tmp_path, "enriched_listings_2024-01-01_00-00-00")
+    ages_ago = time.time() - 400 * 86400
+    os.utime(stale, (ages_ago, ages_ago))
+    recent = save_dataset(market.iloc[100:200].assign(rent_estimate=1.0), tmp_path,
+                          "enriched_listings_2025-01-01_00-00-00", export_csv=True)
+    newest = save_dataset(market.iloc[100:200], tmp_path, "enriched_listings_2025-01-02_00-00-00")
+    link = tmp_path / "enriched_listings_2025-01-03_00-00-00.parquet"
+    os.link(newest, link)  # A deduplicated copy of the newest snapshot
+
+    names = [f.name for f in rent_model.list_recent_datasets(tmp_path)]
+    assert names[0] in (newest.name, link.name) and names[1:] == [recent.name, stale.name]
+    assert len(rent_model.list_recent_datasets(tmp_path, max_age_days=90)) == 2
+
+    comparables = load_comparables(tmp_path)
+    assert sorted(comparables['id']) == sorted(market['id'].iloc[100:200])  # The stale snapshot is out of range
+    assert (comparables['rent_estimate'] > 1.0).all()                       # The newer observation wins
+    assert len(load_comparables(tmp_path, max_snapshots=1)) == 100
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
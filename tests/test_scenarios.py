@@ -0,0 +1,54 @@
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines.scenario_pipeline import (
+    build_scenarios, score_matrix, rank_matrix, run_scenarios
+)
+from pipelines.scoring_pipeline import score_arrays, load_config
+
+# --- TEST 1: Matrix Rows Match The Single-Config Scorer ---
+def test_score_matrix_matches_score_arrays(make_features):
+    df = make_features(2000)
+    base = load_config()
+    scenarios = build_scenarios(base, {
+        'scenarios': [{'name': 'base'}, {'name': 'yield', 'scaling': {'target_yield': 0.02}}],
+        'grid': {'weights.rent_to_cost': [0.2, 0.6], 'scaling.max_risk_score': [100, 300]},
+    })
+    assert len(scenarios) == 6 and scenarios[2][0] == "rent_to_cost=0.2,max_risk_score=100"
+
+    configs = [config for _, config in scenarios]
+    scores = score_matrix(df, configs, block=4)  # Two blocks
+    for i, config in enumerate(configs):
+        expected = score_arrays(df['rent_to_cost_ratio'], df['maintenance_risk_score'],
+                                df['vacancy_adjusted_revenue'], df['price'], config)
+        np.testing.assert_array_equal(scores[i], expected)
+
+# --- TEST 2: Ranks Per Scenario ---
+def test_rank_matrix():
+    scores = np.array([[10.0, np.nan, 30.0, 30.0], [1.0, 2.0, 3.0, 4.0]])
+    order, ranks = rank_matrix(scores)
+    assert order[0].tolist() == [2, 3, 0, 1]  # Ties keep input order, NaN last
+    assert ranks[1].tolist() == [4, 3, 2, 1]
+
+# --- TEST 3: Rank Tables And Stability ---
+def test_run_scenarios_outputs(make_features):
+    df = make_features(500)
+    grid = {'weights.rent_to_cost': [0.3, 0.4, 0.5], 'weights.maintenance_risk': [0.3, 0.4]}
+    ranked, stability, summary = run_scenarios(
+        df, {'scenarios': [{'name': 'base'}], 'grid': grid, 'top_n': 10}, save=False
+    )
+
+    assert len(summary) == 7 and len(ranked) == 70
+    assert summary.loc[0, 'spearman_vs_base'] == 1.0 and summary.loc[0, 'top_n_overlap_vs_base'] == 1.0
+    assert (ranked.groupby('scenario')['deal_score'].apply(lambda s: s.is_monotonic_decreasing)).all()
+    assert stability['top_n_share'].between(0, 1).all() and stability['top_n_share'].iloc[0] > 0
+    assert (stability['best_rank'] <= 10).all()
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,81 @@
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import scoring_pipeline
+from pipelines.scoring_pipeline import (
+    calculate_score,
+    calculate_scores,
+    round_scores,
+    top_n_deals
+)
+from pipelines.stage_cache import StageCache
+from pipelines.listing_timeseries import load_listing_timeseries
+
+CONFIG = {
+    'weights': {'rent_to_cost': 0.40, 'maintenance_risk': 0.40, 'vacancy_adjusted': 0.20},
+    'scaling': {'max_risk_score': 200, 'target_yield': 0.015}
+}
+
+# --- TEST 1: Batch Kernel Matches the Row-Wise Score ---
+def test_batch_scores_match_calculate_score(make_features):
+    df = make_features(2000)
+    df.loc[:2, 'price'] = [0, np.nan, 50000]  # Free, unpriced and ordinary listings
+
+    expected = [calculate_score(row, CONFIG) for row in df.to_dict('records')]
+    result = calculate_scores(df, CONFIG)
+
+    np.testing.assert_array_equal(result.to_numpy(), np.array(expected))
+
+# --- TEST 2: Rounding Ties Follow Python's round() ---
+def test_round_scores_ties():
+    values = np.array([0.35, 2.675, 35.05, 84.25, 12.0])
+    assert round_scores(values, 1).tolist() == [round(v, 1) for v in values]
+
+# --- TEST 3: Top-N Uses the Same Order as a Full Sort ---
+def test_top_n_deals_matches_full_sort(make_features):
+    df = make_features(500)
+    df['deal_score'] = calculate_scores(df, CONFIG)
+    df.loc[df.index[10], 'deal_score'] = np.nan
+
+    top = top_n_deals(df, 5)
+    expected = df.sort_values(by='deal_score', ascending=False).head(5)
+
+    assert top['deal_score'].tolist() == expected['deal_score'].tolist()
+    assert len(top_n_deals(df, 10000)) == len(df)
+
+# --- TEST 4: A Cached Ranking Is Not Observed Twice ---
+def test_cache_hit_does_not_append_to_timeseries(monkeypatch, tmp_path, make_features):
+    monkeypatch.setattr(scoring_pipeline, "PREDICTIONS_DIR", tmp_path / "predictions")
+    monkeypatch.setattr(scoring_pipeline, "load_listing_timeseries",
+                        lambda market=None: load_listing_timeseries(market, timeseries_dir=tmp_path / "timeseries"))
+    df = make_features(20)
+
+    scoring_pipeline.run_scoring(df, stage_cache=StageCache(cache_dir=tmp_path / "cache"))
+    cache = StageCache(cache_dir=tmp_path / "cache")
+    scoring_pipeline.run_scoring(df, stage_cache=cache)
+
+    assert [status for _, status, _ in cache.results] == ["hit"]
+    series = load_listing_timeseries(timeseries_dir=tmp_path / "timeseries")
+    assert len(series.read()) == 20
+    assert (series.state()['observations'] == 1).all()
+
+# --- TEST 5: Weakly Supported Comparable Rents Are Discounted ---
+def test_low_confidence_rents_rank_below_api_rents(make_features):
+    df = make_features(1).iloc[[0, 0, 0]].reset_index(drop=True)
+    df['rent_source'] = ['api', 'comps', 'comps']
+    df['rent_confidence'] = [1.0, 0.9, 0.3]
+    scores = calculate_scores(df, CONFIG).to_numpy()
+
+    # Same features: full points for the API rent, fewer the weaker the comparables
+    assert scores[0] == calculate_scores(df.drop(columns='rent_confidence'), CONFIG)[0]
+    assert scores[0] > scores[1] > scores[2]
+    assert top_n_deals(df.assign(deal_score=scores), 1)['rent_source'].tolist() == ['api']
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,91 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+from datetime import datetime
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import feature_eng_pipeline, market_stats, listing_timeseries
+from pipelines.storage import save_dataset
+from pipelines.stage_cache import StageCache, frame_digest, raw_digest, make_fingerprint
+
+def sample_frame():
+    return pd.DataFrame({
+        'id': ['a', 'b', 'c'],
+        'zipCode': ['46901', '46902', '46901'],
+        'bedrooms': [3.0, 2.0, None],
+        'price': [68900.0, 120000.0, 95000.0]
+    })
+
+# --- TEST 1: Content Hashing ---
+def test_frame_digest_ignores_order_but_not_content():
+    df = sample_frame()
+    shuffled = df.iloc[[2, 0, 1]][['price', 'id', 'bedrooms', 'zipCode']]
+    changed = df.assign(price=[68900.0, 120000.0, 95001.0])
+
+    assert frame_digest(df) == frame_digest(shuffled)
+    assert frame_digest(df) != frame_digest(changed)
+    assert raw_digest([{'id': 'a'}, {'id': 'b'}]) == raw_digest([{'id': 'b'}, {'id': 'a'}])
+
+# --- TEST 2: Hit / Miss / Force ---
+def test_stage_cache_hit_miss_and_force(tmp_path):
+    df = sample_frame()
+    config = tmp_path / "model_params.yaml"
+    config.write_text("weights: 1\n")
+    fingerprint = make_fingerprint(frame_digest(df), config_paths=[config])
+
+    cache = StageCache(cache_dir=tmp_path)
+    assert cache.load("score", fingerprint) is None
+    cache.record("score", fingerprint, None, df)  # save=False (--in-memory): nothing is written
+
+    cache = StageCache(cache_dir=tmp_path)
+    assert cache.load("score", fingerprint) is None
+    assert not (tmp_path / "stages").exists()
+    cache.record("score", fingerprint, save_dataset(df, tmp_path / "out", "rankings"), df)
+
+    cache = StageCache(cache_dir=tmp_path)
+    cached = cache.load("score", fingerprint)
+    assert cached is not None and len(cached) == 3
+    assert [status for _, status, _ in cache.results] == ["hit"]
+
+    # Editing the config changes the fingerprint
+    config.write_text("weights: 2\n")
+    assert make_fingerprint(frame_digest(df), config_paths=[config]) != fingerprint
+
+    forced = StageCache(cache_dir=tmp_path, force=True)
+    assert forced.load("score", fingerprint) is None
+
+# --- TEST 3: A New Year Recomputes The Features ---
+def test_features_fingerprint_includes_year(monkeypatch, tmp_path):
+    monkeypatch.setattr(feature_eng_pipeline, "FEATURES_DIR", tmp_path / "features")
+    monkeypatch.setattr(market_stats, "STATS_DIR", tmp_path / "stats")
+    monkeypatch.setattr(listing_timeseries, "TIMESERIES_DIR", tmp_path / "timeseries")
+    df = sample_frame().assign(city='Kokomo', addressLine1=['1 Main', '2 Main', '3 Main'], squareFootage=1000.0,
+                               yearBuilt=[1950.0, 1990.0, None], rent_estimate=[900.0, 1000.0, 950.0])
+
+    def run(year):
+        class Clock(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime(year, 1, 2, 9, 0, 0)
+        monkeypatch.setattr(feature_eng_pipeline, "datetime", Clock)
+        cache = StageCache(cache_dir=tmp_path / "cache")
+        features = feature_eng_pipeline.run_feature_engineering(df, stage_cache=cache)
+        return features, [status for _, status, _ in cache.results]
+
+    features, statuses = run(2025)
+    assert statuses == ["miss"]
+    assert run(2025)[1] == ["hit"]
+
+    # Same input and code on January 1st: the house built in 1950 is a year older
+    aged, statuses = run(2026)
+    assert statuses == ["miss"]
+    np.testing.assert_allclose(aged['maintenance_risk_score'].iloc[0],
+                               features['maintenance_risk_score'].iloc[0] * 76 / 75)
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
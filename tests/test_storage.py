@@ -0,0 +1,45 @@
+import sys
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import storage
+
+def sample_frame():
+    return pd.DataFrame({
+        'id': ['a', 'b'],
+        'zipCode': [46901, 46902],
+        'propertyType': ['Single Family', 'Condo'],
+        'bedrooms': [3, None],
+        'price': [68900.0, 120000.0]
+    })
+
+# --- TEST 1: Pinned Schema ---
+def test_apply_schema():
+    df = storage.apply_schema(sample_frame())
+
+    assert isinstance(df['zipCode'].dtype, pd.CategoricalDtype)
+    assert df['zipCode'].astype(str).tolist() == ['46901', '46902']
+    assert df['bedrooms'].dtype == 'float32'
+    assert df['price'].dtype == 'float64'
+
+# --- TEST 2: Round Trip + Latest Lookup Prefers the Typed Copy ---
+@pytest.mark.parametrize("fmt", ["parquet", "csv"])
+def test_round_trip_and_latest(tmp_path, fmt):
+    if fmt != "csv" and not storage.HAS_PYARROW:
+        pytest.skip("pyarrow not installed")
+
+    path = storage.save_dataset(sample_frame(), tmp_path, "final_rankings_1", fmt=fmt, export_csv=True)
+    loaded = storage.load_dataset(path)
+
+    assert loaded['id'].tolist() == ['a', 'b']
+    assert loaded['zipCode'].astype(str).tolist() == ['46901', '46902']
+    assert storage.get_latest_dataset(tmp_path) == path
+    assert storage.get_latest_dataset(tmp_path / "missing") is None
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))
@@ -0,0 +1,79 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Add 'src' to path so we can import your actual code
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from pipelines import visualization_pipeline
+from pipelines.visualization_pipeline import (
+    downsample, top_positions, create_yield_risk_matrix, create_small_multiples
+)
+
+def make_rankings(n=5000, seed=0, zips=('46901', '46902', '46903')):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'maintenance_risk_score': rng.gamma(2, 50, n),
+        'rent_to_cost_ratio': rng.normal(0.012, 0.003, n),
+        'deal_score': rng.uniform(0, 100, n).round(1),
+        'zipCode': rng.choice(list(zips), n),
+    })
+
+# --- TEST 1: Downsampling Keeps The Best Deals ---
+def test_downsample_keeps_top_k():
+    df = make_rankings()
+    sample = downsample(df, 500, keep_top=25)
+    assert len(sample) == 500
+    best = df.index[top_positions(df['deal_score'].to_numpy(), 25)]
+    assert set(best) <= set(sample.index)
+    assert downsample(df, 10000) is df
+
+# --- TEST 2: Density Mode + Small Multiples ---
+def test_density_chart_and_small_multiples(tmp_path):
+    df = make_rankings()
+    create_yield_risk_matrix(df, tmp_path / "matrix.png")  # 5k rows -> density mode
+    assert (tmp_path / "matrix.png").stat().st_size > 0
+
+    panels = create_small_multiples(df, tmp_path / "by_zip.png", max_workers=2)
+    assert sorted(p.name for p in panels) == ["zipCode=46901.png", "zipCode=46902.png", "zipCode=46903.png"]
+    assert (tmp_path / "by_zip.png").exists()
+    assert create_small_multiples(df.assign(zipCode='46901'), tmp_path / "one.png") == []
+
+# --- TEST 3: Process Pool Only For Many Panels ---
+def test_small_multiples_pool_threshold(tmp_path, monkeypatch):
+    pools = []
+
+    class RecordingPool(visualization_pipeline.ProcessPoolExecutor):
+        def __init__(self, max_workers=None):
+            pools.append(max_workers)
+            super().__init__(max_workers=max_workers)
+    monkeypatch.setattr(visualization_pipeline, "ProcessPoolExecutor", RecordingPool)
+
+    # 3 panels: rendered in this process
+    assert len(create_small_multiples(make_rankings(1000), tmp_path / "few.png", max_workers=2)) == 3
+    assert pools == []
+
+    many = make_rankings(1000, zips=[str(46901 + i) for i in range(5)])
+    assert len(create_small_multiples(many, tmp_path / "many.png", max_workers=2)) == 5
+    assert pools == [2]
+
+# --- TEST 4: Small Multiples Are Opt-In And Never Pile Up ---
+def test_small_multiples_opt_in_and_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(visualization_pipeline, "FIGURES_DIR", tmp_path)
+    df = make_rankings(1000)
+
+    visualization_pipeline.run_visualization(df)
+    assert len(list(tmp_path.iterdir())) == 1  # Just the chart
+
+    visualization_pipeline.run_visualization(df, small_multiples=True)
+    visualization_pipeline.run_visualization(df[df['zipCode'] != '46903'], small_multiples=True)
+    # One grid + one panel folder, overwritten: the panel of the zip that left is gone
+    assert sorted(p.name for p in tmp_path.glob("*_by_*")) == ["yield_matrix_by_zipCode", "yield_matrix_by_zipCode.png"]
+    panels = sorted(p.name for p in (tmp_path / "yield_matrix_by_zipCode").iterdir())
+    assert panels == ["zipCode=46901.png", "zipCode=46902.png"]
+
+if __name__ == "__main__":
+    # Allow running this file directly
+    sys.exit(pytest.main(["-v", __file__]))